@@ -0,0 +1,26 @@
+"""composite indexes for paginated client/policy listings
+
+Revision ID: 20261019_0004
+Revises: 993d20339d96
+Create Date: 2026-10-19
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_0004'
+down_revision: Union[str, None] = '993d20339d96'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_clients_owner_created', 'clients', ['owner_id', 'created_at'], unique=False)
+    op.create_index('ix_policies_client_created', 'policies', ['client_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_policies_client_created', table_name='policies')
+    op.drop_index('ix_clients_owner_created', table_name='clients')
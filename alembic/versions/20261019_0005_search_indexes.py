@@ -0,0 +1,92 @@
+"""full-text search indexes for clients and policies
+
+PostgreSQL: extension unaccent + wrapper IMMUTABLE + index GIN d'expression tsvector.
+SQLite: tables virtuelles FTS5 (contenu externe) synchronisées par triggers.
+
+Revision ID: 20261019_0005
+Revises: 20261019_0004
+Create Date: 2026-10-19
+"""
+from collections.abc import Sequence
+from typing import Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_0005'
+down_revision: Union[str, None] = '20261019_0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Doivent rester identiques à backend/app/services/search.py (PG_CLIENT_VECTOR / PG_POLICY_VECTOR)
+_PG_CLIENT_VECTOR = (
+    "to_tsvector('simple', immutable_unaccent("
+    "coalesce(first_name, '') || ' ' || coalesce(last_name, '') || ' ' || "
+    "coalesce(email, '') || ' ' || coalesce(phone, '')))"
+)
+_PG_POLICY_VECTOR = (
+    "to_tsvector('simple', immutable_unaccent("
+    "coalesce(policy_number, '') || ' ' || coalesce(product_name, '')))"
+)
+
+_SQLITE_FTS = {
+    "search_clients_fts": ("clients", ["first_name", "last_name", "email", "phone"]),
+    "search_policies_fts": ("policies", ["policy_number", "product_name"]),
+}
+
+
+def _upgrade_postgres() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() est STABLE: un wrapper IMMUTABLE est requis pour un index d'expression
+    op.execute(
+        "CREATE OR REPLACE FUNCTION immutable_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    )
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_clients_search ON clients USING GIN ({_PG_CLIENT_VECTOR})")
+    op.execute(f"CREATE INDEX IF NOT EXISTS ix_policies_search ON policies USING GIN ({_PG_POLICY_VECTOR})")
+
+
+def _upgrade_sqlite() -> None:
+    for fts, (table, cols) in _SQLITE_FTS.items():
+        col_list = ", ".join(cols)
+        new_vals = ", ".join(f"new.{c}" for c in cols)
+        old_vals = ", ".join(f"old.{c}" for c in cols)
+        op.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({col_list}, content='{table}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals}); END"
+        )
+        op.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {col_list}) VALUES ('delete', old.id, {old_vals}); "
+            f"INSERT INTO {fts}(rowid, {col_list}) VALUES (new.id, {new_vals}); END"
+        )
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        _upgrade_postgres()
+    elif dialect == "sqlite":
+        _upgrade_sqlite()
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_policies_search")
+        op.execute("DROP INDEX IF EXISTS ix_clients_search")
+        op.execute("DROP FUNCTION IF EXISTS immutable_unaccent(text)")
+    elif dialect == "sqlite":
+        for fts in _SQLITE_FTS:
+            for suffix in ("ai", "ad", "au"):
+                op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+            op.execute(f"DROP TABLE IF EXISTS {fts}")
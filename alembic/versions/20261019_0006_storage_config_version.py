@@ -0,0 +1,28 @@
+"""add version counter to storage_config
+
+Revision ID: 20261019_0006
+Revises: 20261019_0005
+Create Date: 2026-10-19
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_0006'
+down_revision: Union[str, None] = '20261019_0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('storage_config') as batch:
+        batch.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default=sa.text('1')))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('storage_config') as batch:
+        batch.drop_column('version')
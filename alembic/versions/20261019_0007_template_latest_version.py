@@ -0,0 +1,32 @@
+"""add latest_version pointer to templates
+
+Revision ID: 20261019_0007
+Revises: 20261019_0006
+Create Date: 2026-10-19
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_0007'
+down_revision: Union[str, None] = '20261019_0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('templates') as batch:
+        batch.add_column(sa.Column('latest_version', sa.Integer(), nullable=False, server_default=sa.text('0')))
+    op.execute(
+        "UPDATE templates SET latest_version = COALESCE("
+        "(SELECT MAX(tv.version) FROM template_versions tv WHERE tv.template_id = templates.id), 0)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('templates') as batch:
+        batch.drop_column('latest_version')
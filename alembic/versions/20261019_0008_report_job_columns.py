@@ -0,0 +1,97 @@
+"""dedicated celery_task_id / queue / progress / result columns on report_jobs
+
+Revision ID: 20261019_0008
+Revises: 20261019_0007
+Create Date: 2026-10-19
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_0008'
+down_revision: Union[str, None] = '20261019_0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 1000
+# clés de params déplacées vers des colonnes (errors/error: rapport d'import, échec de purge -> result)
+MOVED_KEYS = ('celery_task_id', 'queue', 'progress', 'result', 'errors', 'error')
+
+report_jobs = sa.table(
+    'report_jobs',
+    sa.column('id', sa.Integer),
+    sa.column('params', sa.JSON),
+    sa.column('celery_task_id', sa.String),
+    sa.column('queue', sa.String),
+    sa.column('progress', sa.JSON),
+    sa.column('result', sa.JSON),
+)
+
+
+def _split(params: dict) -> dict:
+    result = params.get('result')
+    for key in ('errors', 'error'):
+        if key in params:
+            result = {**(result or {}), key: params[key]}
+    return {
+        'celery_task_id': params.get('celery_task_id'),
+        'queue': params.get('queue'),
+        'progress': params.get('progress'),
+        'result': result,
+        'params': {k: v for k, v in params.items() if k not in MOVED_KEYS},
+    }
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('report_jobs') as batch:
+        batch.add_column(sa.Column('celery_task_id', sa.String(length=155), nullable=True))
+        batch.add_column(sa.Column('queue', sa.String(length=30), nullable=True))
+        batch.add_column(sa.Column('progress', sa.JSON(), nullable=True))
+        batch.add_column(sa.Column('result', sa.JSON(), nullable=True))
+    op.create_index('ix_report_jobs_celery_task_id', 'report_jobs', ['celery_task_id'], unique=False)
+
+    # Backfill par lots (parcours par id), portable SQLite / PostgreSQL
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(report_jobs.c.id, report_jobs.c.params)
+            .where(report_jobs.c.id > last_id, report_jobs.c.params.isnot(None))
+            .order_by(report_jobs.c.id)
+            .limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        for row_id, params in rows:
+            if isinstance(params, dict) and any(k in params for k in MOVED_KEYS):
+                bind.execute(report_jobs.update().where(report_jobs.c.id == row_id).values(**_split(params)))
+        last_id = rows[-1][0]
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(report_jobs.c.id, report_jobs.c.params, report_jobs.c.celery_task_id, report_jobs.c.queue, report_jobs.c.progress, report_jobs.c.result)
+    ).all()
+    for row_id, params, task_id, queue, progress, result in rows:
+        merged = dict(params or {})
+        for key, value in (('celery_task_id', task_id), ('queue', queue), ('progress', progress)):
+            if value is not None:
+                merged[key] = value
+        if isinstance(result, dict):
+            for key in ('errors', 'error'):
+                if key in result:
+                    merged[key] = result.pop(key)
+        if result:
+            merged['result'] = result
+        bind.execute(report_jobs.update().where(report_jobs.c.id == row_id).values(params=merged))
+    op.drop_index('ix_report_jobs_celery_task_id', table_name='report_jobs')
+    with op.batch_alter_table('report_jobs') as batch:
+        batch.drop_column('result')
+        batch.drop_column('progress')
+        batch.drop_column('queue')
+        batch.drop_column('celery_task_id')
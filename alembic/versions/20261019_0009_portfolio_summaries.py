@@ -0,0 +1,57 @@
+"""portfolio_summaries / portfolio_expiries summary tables
+
+Tables remplies par la tâche monitoring_tasks.reconcile_portfolio_summaries (beat, ou à
+lancer une fois après la migration), puis tenues à jour par les routes des polices.
+
+Revision ID: 20261019_0009
+Revises: 20261019_0008
+Create Date: 2026-10-19
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_0009'
+down_revision: Union[str, None] = '20261019_0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('portfolio_summaries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=30), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('policies', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('premium_total', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'company_id', 'status', 'currency', name='uq_portfolio_summary_key')
+    )
+    op.create_index('ix_portfolio_summaries_company', 'portfolio_summaries', ['company_id'], unique=False)
+    op.create_table('portfolio_expiries',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('company_id', sa.Integer(), nullable=False),
+    sa.Column('expiry_month', sa.String(length=7), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('policies', sa.Integer(), server_default=sa.text('0'), nullable=False),
+    sa.Column('premium_total', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('owner_id', 'company_id', 'expiry_month', 'currency', name='uq_portfolio_expiry_key')
+    )
+    op.create_index('ix_portfolio_expiries_company_month', 'portfolio_expiries', ['company_id', 'expiry_month'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_portfolio_expiries_company_month', table_name='portfolio_expiries')
+    op.drop_table('portfolio_expiries')
+    op.drop_index('ix_portfolio_summaries_company', table_name='portfolio_summaries')
+    op.drop_table('portfolio_summaries')
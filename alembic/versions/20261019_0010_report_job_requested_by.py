@@ -0,0 +1,32 @@
+"""report_jobs.requested_by (part équitable des rapports lourds par utilisateur)
+
+Revision ID: 20261019_0010
+Revises: 20261019_0009
+Create Date: 2026-10-19
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_0010'
+down_revision: Union[str, None] = '20261019_0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('report_jobs') as batch:
+        batch.add_column(sa.Column('requested_by', sa.Integer(), nullable=True))
+        batch.create_foreign_key('fk_report_jobs_requested_by_users', 'users', ['requested_by'], ['id'], ondelete='SET NULL')
+    op.create_index('ix_report_jobs_requested_by_status', 'report_jobs', ['requested_by', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_report_jobs_requested_by_status', table_name='report_jobs')
+    with op.batch_alter_table('report_jobs') as batch:
+        batch.drop_constraint('fk_report_jobs_requested_by_users', type_='foreignkey')
+        batch.drop_column('requested_by')
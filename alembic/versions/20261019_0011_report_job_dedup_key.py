@@ -0,0 +1,30 @@
+"""report_jobs.dedup_key (regroupement des demandes de rapport identiques)
+
+Revision ID: 20261019_0011
+Revises: 20261019_0010
+Create Date: 2026-10-19
+"""
+from collections.abc import Sequence
+from typing import Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '20261019_0011'
+down_revision: Union[str, None] = '20261019_0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('report_jobs') as batch:
+        batch.add_column(sa.Column('dedup_key', sa.String(length=64), nullable=True))
+    op.create_index('ix_report_jobs_dedup_key', 'report_jobs', ['dedup_key'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_report_jobs_dedup_key', table_name='report_jobs')
+    with op.batch_alter_table('report_jobs') as batch:
+        batch.drop_column('dedup_key')
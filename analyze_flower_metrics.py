@@ -75,7 +75,7 @@ def analyze_redis_metrics():
         
         # Queues Celery
         queue_lengths = {}
-        for queue in ['reports', 'documents', 'notifications', 'celery']:
+        for queue in ['reports_high', 'reports', 'reports_low', 'documents', 'notifications', 'celery']:
             length = r.llen(queue)
             queue_lengths[queue] = length
             
@@ -0,0 +1,71 @@
+"""Pagination par curseur (keyset) partagée par les listings volumineux.
+
+Le curseur est opaque côté client: base64 url-safe de "<created_at ISO>|<id>" du
+dernier élément renvoyé. La page suivante filtre sur (created_at, id) strictement
+inférieurs, ce qui s'appuie sur les index composites (owner_id|client_id, created_at)
+au lieu d'un OFFSET qui relit toutes les lignes précédentes.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, TypeVar
+
+from fastapi import HTTPException
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import InstrumentedAttribute, Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+T = TypeVar("T")
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Décode un curseur; lève HTTP 400 si le format est invalide."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        ts_part, id_part = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(ts_part), int(id_part)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide") from None
+
+
+def apply_keyset(
+    query: Query[T],
+    created_col: InstrumentedAttribute[Any],
+    id_col: InstrumentedAttribute[Any],
+    cursor: str | None,
+) -> Query[T]:
+    """Applique l'ordre (created_at DESC, id DESC) et la borne du curseur éventuel.
+
+    La borne temporelle est relue depuis la ligne d'ancrage (id du curseur) afin de
+    comparer colonne à colonne: SQLite stocke CURRENT_TIMESTAMP sans microsecondes
+    et une comparaison avec un paramètre datetime serait faussée. Si l'ancre a été
+    supprimée entre deux pages, on retombe sur l'horodatage encodé dans le curseur.
+    """
+    if cursor:
+        ts, last_id = decode_cursor(cursor)
+        anchor = select(created_col).where(id_col == last_id).scalar_subquery()
+        boundary = func.coalesce(anchor, ts)
+        query = query.filter(or_(created_col < boundary, and_(created_col == boundary, id_col < last_id)))
+    return query.order_by(created_col.desc(), id_col.desc())
+
+
+def paginate(query: Query[T], limit: int) -> tuple[list[T], str | None]:
+    """Récupère limit+1 lignes et renvoie (items, next_cursor).
+
+    next_cursor vaut None lorsque la dernière page est atteinte.
+    """
+    rows = query.limit(limit + 1).all()
+    items = rows[:limit]
+    if len(rows) <= limit or not items:
+        return items, None
+    last: Any = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
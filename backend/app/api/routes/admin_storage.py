@@ -51,6 +51,7 @@ def update_storage_config(payload: StorageConfigUpdate, db: Session = Depends(ge
     cfg.s3_bucket = payload.s3_bucket
     cfg.s3_region = payload.s3_region
     cfg.s3_endpoint_url = payload.s3_endpoint_url
+    cfg.version = models.StorageConfig.version + 1  # incrément atomique, clé du cache des backends
     db.add(cfg)
     db.commit()
     db.refresh(cfg)
@@ -0,0 +1,82 @@
+"""Indicateurs agrégés du portefeuille (calculs vectorisés, services.analytics).
+
+Périmètre: polices des clients de l'utilisateur authentifié, tout le portefeuille pour un
+admin. Une requête SQL par appel; 503 si NumPy n'est pas installé.
+
+GET /analytics/summary (page d'accueil des agents) est servi par les tables de synthèse
+(services.portfolio_summary), sans NumPy ni lecture des polices.
+"""
+from datetime import UTC, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import ColumnElement
+from sqlalchemy.orm import Session
+
+from backend.app.api.deps import get_current_user, get_db_session
+from backend.app.db import models
+from backend.app.schemas.analytics import (
+    AnalyticsGroupTotals,
+    ExpiryPipeline,
+    PortfolioSummary,
+    PremiumPercentiles,
+)
+from backend.app.services import analytics, portfolio_summary
+from backend.app.services.report_engine import ReportFilters, policy_criteria
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+def portfolio_scope(
+    company_id: int | None = Query(None),
+    status: str | None = Query(None, description="Statut des polices"),
+    period_start: datetime | None = Query(None, description="Date d'effet minimale (incluse)"),
+    period_end: datetime | None = Query(None, description="Date d'effet maximale (exclue)"),
+    user: models.User = Depends(get_current_user),
+) -> list[ColumnElement[bool]]:
+    if not analytics.NUMPY_AVAILABLE:
+        raise HTTPException(status_code=503, detail="Analytique indisponible (NumPy requis)")
+    criteria = policy_criteria(ReportFilters(company_id=company_id, status=status, period_start=period_start, period_end=period_end))
+    if user.role != models.UserRole.ADMIN:
+        criteria.append(models.Client.owner_id == user.id)
+    return criteria
+
+
+@router.get("/premiums", response_model=AnalyticsGroupTotals)
+def premiums(
+    group_by: str = Query("company", pattern="^(company|status|currency|month|agent)$"),
+    criteria: list[ColumnElement[bool]] = Depends(portfolio_scope),
+    db: Session = Depends(get_db_session),
+) -> dict[str, object]:
+    frame = analytics.load_policy_frame(db, criteria)
+    return {"group_by": group_by, "rows": analytics.group_totals(frame, group_by)}
+
+
+@router.get("/expiries", response_model=ExpiryPipeline)
+def expiries(criteria: list[ColumnElement[bool]] = Depends(portfolio_scope), db: Session = Depends(get_db_session)) -> dict[str, object]:
+    frame = analytics.load_policy_frame(db, criteria)
+    return {"rows": analytics.expiry_pipeline(frame, datetime.now(UTC))}
+
+
+@router.get("/percentiles", response_model=PremiumPercentiles)
+def percentiles(
+    quantiles: list[float] = Query([50, 90, 99]),
+    criteria: list[ColumnElement[bool]] = Depends(portfolio_scope),
+    db: Session = Depends(get_db_session),
+) -> dict[str, object]:
+    if any(not 0 <= q <= 100 for q in quantiles):
+        raise HTTPException(status_code=400, detail="Quantiles attendus entre 0 et 100")
+    frame = analytics.load_policy_frame(db, criteria)
+    return {"quantiles": quantiles, "by_currency": analytics.premium_percentiles(frame, quantiles)}
+
+
+@router.get("/summary", response_model=PortfolioSummary)
+def summary(
+    months: int = Query(3, ge=1, le=24, description="Fenêtre de l'échéancier (mois, mois courant inclus)"),
+    owner_id: int | None = Query(None, description="Agent (admin uniquement; sinon l'utilisateur courant)"),
+    company_id: int | None = Query(None, description="Compagnie (0: polices sans compagnie)"),
+    db: Session = Depends(get_db_session),
+    user: models.User = Depends(get_current_user),
+) -> dict[str, object]:
+    if user.role != models.UserRole.ADMIN:
+        owner_id = user.id
+    return portfolio_summary.read_summary(db, owner_id=owner_id, company_id=company_id, months=months)
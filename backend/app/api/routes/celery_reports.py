@@ -4,7 +4,9 @@ Migration de RQ vers Celery pour une gestion plus robuste des tâches asynchrone
 """
 from __future__ import annotations
 
+from datetime import datetime
 from typing import TYPE_CHECKING
+from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
@@ -16,14 +18,17 @@ from backend.app.schemas.report_jobs import (
     ReportJobLaunchResponse,
     ReportJobStatusResponse,
 )
+from backend.app.services.job_events import publish_job_event
 
 # Import conditionnel pour support Celery et compatibilité RQ
 try:
+    from backend.app.services import report_dedup
     from backend.app.services.celery_report_tasks import (
         generate_dummy_report,
         generate_heavy_report,
         get_task_status,
     )
+    from backend.app.services.report_scheduling import QUICK_QUEUE, ReportQuotaExceeded, plan_heavy_report
     CELERY_AVAILABLE = True
 except ImportError:
     # Fallback vers l'ancien système RQ
@@ -61,24 +66,39 @@ def launch_dummy(
     """Lance un rapport factice (démo/test) avec Celery ou RQ fallback."""
     require_admin(current_user)
     
-    # Créer enregistrement report_jobs (status pending)
-    rj = models.ReportJob(job_type="dummy", status="pending", params={"report_id": report_id})
+    params = {"report_id": report_id}
+    # Demande identique en cours ou récente: rattachée au job existant (services.report_dedup)
+    key = report_dedup.dedup_key("dummy", params) if CELERY_AVAILABLE else None
+    if key and (existing := report_dedup.find_reusable_job(db, key)):
+        return ReportJobLaunchResponse(**report_dedup.attached_response(existing))
+    # Créer enregistrement report_jobs (status pending), tâche Celery pré-identifiée
+    task_id = str(uuid4())
+    rj = models.ReportJob(
+        job_type="dummy", status="pending", params=params, requested_by=current_user.id,
+        celery_task_id=task_id if CELERY_AVAILABLE else None, dedup_key=key,
+    )
     db.add(rj)
     db.commit()
     db.refresh(rj)
+    if key and (existing := report_dedup.claim(db, key, task_id)):
+        db.delete(rj)
+        db.commit()
+        return ReportJobLaunchResponse(**report_dedup.attached_response(existing))
     
     if CELERY_AVAILABLE:
         # Utilisation de Celery (nouveau système)
-        task = generate_dummy_report.delay(report_id, rj.id)
+        task = generate_dummy_report.apply_async((report_id, rj.id), queue=QUICK_QUEUE, task_id=task_id)
         rj.status = "queued"
-        rj.params = {**(rj.params or {}), "celery_task_id": task.id}
+        rj.celery_task_id = task.id
+        rj.queue = QUICK_QUEUE
         db.add(rj)
         db.commit()
         
         return ReportJobLaunchResponse(
             job_id=task.id, 
             status="queued", 
-            report_job_id=rj.id
+            report_job_id=rj.id,
+            queue=QUICK_QUEUE
         )
     else:
         # Fallback vers RQ (ancien système)
@@ -99,12 +119,17 @@ def launch_dummy(
 @router.post("/heavy", response_model=ReportJobLaunchResponse)
 def launch_heavy_report(
     report_type: str = Query(..., description="Type de rapport: pdf, excel, analysis"),
-    pages: int = Query(10, description="Nombre de pages (pour PDF)"),
-    processing_time: int = Query(10, description="Temps de traitement simulé (secondes)"),
+    pages: int = Query(10, ge=0, description="Pages de détail des polices (PDF, 0 = synthèse seule)"),
+    company_id: int | None = Query(None, description="Filtre compagnie"),
+    status: str | None = Query(None, description="Filtre statut des polices"),
+    period_start: datetime | None = Query(None, description="Date d'effet minimale (incluse)"),
+    period_end: datetime | None = Query(None, description="Date d'effet maximale (exclue)"),
+    priority: str = Query("normal", pattern="^(high|normal|low)$", description="Priorité demandée (ajustée selon le coût estimé)"),
+    force: bool = Query(False, description="Nouveau rapport même si un rapport identique est en cours ou récent"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> ReportJobLaunchResponse:
-    """Lance un rapport lourd avec Celery."""
+    """Lance un rapport lourd avec Celery (demandes identiques regroupées, sauf avec force)."""
     require_admin(current_user)
     
     if not CELERY_AVAILABLE:
@@ -124,29 +149,50 @@ def launch_heavy_report(
     params = {
         "report_type": report_type,
         "pages": pages,
-        "processing_time": processing_time
+        "company_id": company_id,
+        "status": status,
+        "period_start": period_start.isoformat() if period_start else None,
+        "period_end": period_end.isoformat() if period_end else None,
     }
+    key = None if force else report_dedup.dedup_key("heavy", params)
+    if key and (existing := report_dedup.find_reusable_job(db, key)):
+        return ReportJobLaunchResponse(**report_dedup.attached_response(existing))
+    try:
+        queue, _ = plan_heavy_report(db, current_user.id, priority, params)
+    except ReportQuotaExceeded as exc:
+        raise HTTPException(status_code=429, detail=f"Trop de rapports en cours: {exc}")
     
+    task_id = str(uuid4())
     rj = models.ReportJob(
         job_type="heavy", 
         status="pending", 
-        params=params
+        params=params,
+        requested_by=current_user.id,
+        celery_task_id=task_id,
+        dedup_key=key,
     )
     db.add(rj)
     db.commit()
     db.refresh(rj)
+    # Demande identique simultanée: la première à réserver l'empreinte lance la tâche
+    if key and (existing := report_dedup.claim(db, key, task_id)):
+        db.delete(rj)
+        db.commit()
+        return ReportJobLaunchResponse(**report_dedup.attached_response(existing))
     
     # Lancer la tâche Celery
-    task = generate_heavy_report.delay(report_type, params, rj.id)
+    task = generate_heavy_report.apply_async((report_type, params, rj.id), queue=queue, task_id=task_id)
     rj.status = "queued"
-    rj.params = {**(rj.params or {}), "celery_task_id": task.id}
+    rj.celery_task_id = task.id
+    rj.queue = queue
     db.add(rj)
     db.commit()
     
     return ReportJobLaunchResponse(
         job_id=task.id,
         status="queued",
-        report_job_id=rj.id
+        report_job_id=rj.id,
+        queue=queue
     )
 
 
@@ -177,7 +223,7 @@ def job_status(
             # Rechercher le job correspondant en base
             rj = (
                 db.query(models.ReportJob)
-                .filter(models.ReportJob.params.op("->>")('"celery_task_id"') == job_id)
+                .filter(models.ReportJob.celery_task_id == job_id)  # index ix_report_jobs_celery_task_id
                 .first()
             )
             
@@ -292,7 +338,7 @@ def cancel_job(
         # Mettre à jour le statut en base
         rj = (
             db.query(models.ReportJob)
-            .filter(models.ReportJob.params.op("->>")('"celery_task_id"') == job_id)
+            .filter(models.ReportJob.celery_task_id == job_id)  # index ix_report_jobs_celery_task_id
             .first()
         )
         
@@ -302,6 +348,8 @@ def cancel_job(
             rj.finished_at = datetime.now(UTC)
             db.add(rj)
             db.commit()
+        # Ferme les flux SSE ouverts sur le job (GET /reports/jobs/{id}/events)
+        publish_job_event(job_id, {"status": "cancelled"})
         
         return {"message": f"Job {job_id} annulé avec succès"}
         
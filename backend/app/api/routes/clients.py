@@ -2,12 +2,14 @@
 
 Chaque client est attaché via owner_id; isolation stricte par utilisateur.
 """
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from backend.app.api.deps import get_current_user, get_db_session
+from backend.app.api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_keyset, paginate
 from backend.app.db import models
-from backend.app.schemas.client import ClientCreate, ClientRead, ClientUpdate
+from backend.app.schemas.client import ClientCreate, ClientList, ClientRead, ClientUpdate
 
 router = APIRouter(prefix="/clients", tags=["clients"])
 
@@ -19,10 +21,30 @@ def create_client(payload: ClientCreate, db: Session = Depends(get_db_session),
     db.refresh(client)
     return client
 
-@router.get("", response_model=list[ClientRead])
-def list_clients(db: Session = Depends(get_db_session), user: models.User = Depends(get_current_user)) -> list[models.Client]:
-    q = db.query(models.Client).filter(models.Client.owner_id == user.id)
-    return q.order_by(models.Client.created_at.desc()).all()
+@router.get("", response_model=ClientList)
+def list_clients(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="Curseur opaque renvoyé par la page précédente"),
+    q: str | None = Query(None, description="Recherche partielle (nom, prénom, email, téléphone)"),
+    db: Session = Depends(get_db_session),
+    user: models.User = Depends(get_current_user),
+) -> dict[str, object]:
+    """Liste paginée (curseur) des clients de l'utilisateur, du plus récent au plus ancien.
+
+    S'appuie sur l'index (owner_id, created_at); la taille de page est bornée à MAX_PAGE_SIZE.
+    """
+    query = db.query(models.Client).filter(models.Client.owner_id == user.id)
+    if q:
+        pattern = f"%{q}%"
+        query = query.filter(or_(
+            models.Client.first_name.ilike(pattern),
+            models.Client.last_name.ilike(pattern),
+            models.Client.email.ilike(pattern),
+            models.Client.phone.ilike(pattern),
+        ))
+    query = apply_keyset(query, models.Client.created_at, models.Client.id, cursor)
+    items, next_cursor = paginate(query, limit)
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.get("/{client_id}", response_model=ClientRead)
 def get_client(client_id: int, db: Session = Depends(get_db_session), user: models.User = Depends(get_current_user)) -> models.Client:
@@ -1,16 +1,25 @@
 """CRUD des compagnies (entités globales).
 
 Accès en écriture restreint aux rôles MANAGER/ADMIN (delete: ADMIN).
+La liste est servie depuis le cache du catalogue (ETag / If-None-Match -> 304),
+invalidé par chaque écriture.
 """
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
 from backend.app.api.deps import get_db_session, require_role
+from backend.app.core.config import get_settings
 from backend.app.db import models
 from backend.app.schemas.company import CompanyCreate, CompanyRead, CompanyUpdate
+from backend.app.services.company_cache import get_catalogue, invalidate_catalogue
 
 router = APIRouter(prefix="/companies", tags=["companies"])
 
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # Comparaison faible (RFC 9110 §13.1.2): le préfixe W/ est ignoré
+    tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
 @router.post("", response_model=CompanyRead, status_code=201)
 def create_company(payload: CompanyCreate, db: Session = Depends(get_db_session), user: models.User = Depends(require_role([models.UserRole.ADMIN, models.UserRole.MANAGER]))) -> models.Company:
     if db.query(models.Company).filter((models.Company.name == payload.name) | (models.Company.code == payload.code)).first():
@@ -18,12 +27,17 @@ def create_company(payload: CompanyCreate, db: Session = Depends(get_db_session)
     company = models.Company(**payload.model_dump())
     db.add(company)
     db.commit()
+    invalidate_catalogue()
     db.refresh(company)
     return company
 
 @router.get("", response_model=list[CompanyRead])
-def list_companies(db: Session = Depends(get_db_session)) -> list[models.Company]:
-    return db.query(models.Company).order_by(models.Company.created_at.desc()).all()
+def list_companies(db: Session = Depends(get_db_session), if_none_match: str | None = Header(None)) -> Response:
+    cat = get_catalogue(db)
+    headers = {"ETag": cat.etag, "Cache-Control": f"public, max-age={get_settings().companies_cache_max_age}"}
+    if if_none_match and _etag_matches(if_none_match, cat.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cat.body, media_type="application/json", headers=headers)
 
 @router.get("/{company_id}", response_model=CompanyRead)
 def get_company(company_id: int, db: Session = Depends(get_db_session)) -> models.Company:
@@ -40,6 +54,7 @@ def update_company(company_id: int, payload: CompanyUpdate, db: Session = Depend
     for k, v in payload.model_dump(exclude_unset=True).items():
         setattr(company, k, v)
     db.commit()
+    invalidate_catalogue()
     db.refresh(company)
     return company
 
@@ -50,4 +65,5 @@ def delete_company(company_id: int, db: Session = Depends(get_db_session), user:
         raise HTTPException(status_code=404, detail="Company introuvable")
     db.delete(company)
     db.commit()
+    invalidate_catalogue()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -5,10 +5,12 @@ from __future__ import annotations
 Ce module couvre:
  - Génération multi-format (HTML, PDF, XLSX)
  - Signature d'URL avec rotation de clés (kid) et expiration TTL
- - Téléchargement sécurisé avec contrôle RBAC + ownership
+ - Stockage via le backend configuré (local réparti par préfixe de hash, S3, Google Drive)
+ - Téléchargement sécurisé avec contrôle RBAC + ownership (redirection vers URL présignée
+   S3, sinon lecture en flux depuis le backend)
  - Rate limiting (Redis + fallback mémoire) pour limiter abus (spécifique aux téléchargements)
  - Compression (zlib) & chiffrement (Fernet) optionnels, métadonnées enregistrées
- - Purge de fichiers orphelins sur disque
+ - Purge des documents orphelins du backend de stockage (tâche Celery incrémentale, reprenable)
  - Audit logging systématique (génération, téléchargement, purge)
 """
 import base64
@@ -16,13 +18,15 @@ import hashlib
 import hmac
 import time
 import zlib
-from pathlib import Path
+from pathlib import PurePosixPath
+from uuid import uuid4
 
 from cryptography.fernet import Fernet
 from fastapi import APIRouter, Depends, HTTPException, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from jinja2.exceptions import SecurityError
 from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
 from backend.app.api.deps import get_current_user, get_db
 from backend.app.core.config import get_settings
@@ -33,12 +37,20 @@ from backend.app.schemas.generated_document import (
     DocumentGenerateRequest,
     GeneratedDocumentList,
     GeneratedDocumentRead,
+    PurgeLaunchResponse,
+    PurgeProgress,
+    PurgeStatusResponse,
 )
-from backend.app.services.document_renderer import OUTPUT_DIR, render_template, store_output
+from backend.app.services.document_renderer import RenderLimitError, render_template, store_output
+from backend.app.services.document_storage import resolve_document_path
+from backend.app.services.document_tasks import purge_orphan_documents
+from backend.app.services.storage_provider import get_document_storage, get_storage
+from backend.app.services.template_versions import resolve_version
 
 router = APIRouter(prefix="/documents", tags=["documents"])  # Regroupe tous les endpoints liés aux documents
 
 ALLOWED_DOWNLOADS_PER_MINUTE = 3
+PURGE_JOB_TYPE = "purge_orphans"
 _mem_counts: dict[str, tuple[int, int]] = {}  # key -> (minute_bucket, count)
 
 def _rate_limit(key: str, limit: int = ALLOWED_DOWNLOADS_PER_MINUTE) -> None:
@@ -117,15 +129,20 @@ def generate_document(payload: DocumentGenerateRequest, db: Session = Depends(ge
     can_generate(current_user)
     template_version = None
     if payload.template_version_id:
-        template_version = db.query(models.TemplateVersion).filter(models.TemplateVersion.id == payload.template_version_id).first()
+        # Version résolue et compilée via le cache en mémoire: aucune requête template si déjà connue
+        template_version = resolve_version(db, payload.template_version_id)
         if not template_version:
             raise HTTPException(status_code=404, detail="Template version introuvable")
-    fmt = payload.output_format or (template_version.template.format if template_version and template_version.template and template_version.template.format else "html")  # type: ignore
+    fmt = payload.output_format or (template_version.format if template_version and template_version.format else "html")
     if fmt not in {"html", "pdf", "xlsx"}:
         raise HTTPException(status_code=400, detail="Format non supporté")
-    content_source = template_version.content if template_version and template_version.content else "{{ inline_context | default('') }}"
+    content_source = template_version.compiled() if template_version and template_version.content else "{{ inline_context | default('') }}"
     ctx = {"inline_context": payload.inline_context or {}}
-    rendered = render_template(content_source, ctx , fmt)  # Production binaire du document
+    try:
+        # Production binaire du document (sandbox bornée en temps et en taille)
+        rendered = render_template(content_source, ctx, fmt, profile_key=f"v{template_version.id}" if template_version else None)
+    except (RenderLimitError, SecurityError) as exc:
+        raise HTTPException(status_code=422, detail=f"Rendu du template refusé: {exc}") from None
     original_size = len(rendered)
     compress = bool(payload.inline_context and payload.inline_context.get("_compress"))
     encrypt = bool(payload.inline_context and payload.inline_context.get("_encrypt"))
@@ -139,7 +156,8 @@ def generate_document(payload: DocumentGenerateRequest, db: Session = Depends(ge
         f = Fernet(fkey)
         rendered = f.encrypt(rendered)
         encryption_key_id = kid
-    result = store_output(rendered, fmt)
+    storage = get_storage(db)
+    result = store_output(rendered, fmt, storage)
     doc = models.GeneratedDocument(
         document_type=payload.document_type,
         policy_id=payload.policy_id,
@@ -154,7 +172,8 @@ def generate_document(payload: DocumentGenerateRequest, db: Session = Depends(ge
             "compressed": compress,
             "encrypted": encrypt,
             "orig_size": original_size,
-            "enc_kid": encryption_key_id
+            "enc_kid": encryption_key_id,
+            "storage": storage.name,
         },
     )
     db.add(doc)
@@ -194,7 +213,7 @@ def create_signed_download_url(doc_id: int, ttl_seconds: int = 300, db: Session
     return {"url": f"/api/v1/documents/{doc_id}/download?exp={expires}&sig={sig}", "expires": expires}
 
 @router.get("/{doc_id}/download")
-def download_document(request: Request, doc_id: int, exp: int | None = None, sig: str | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> FileResponse:
+def download_document(request: Request, doc_id: int, exp: int | None = None, sig: str | None = None, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> Response:
     # Si signature présente, on autorise sans rôle supplémentaire sinon contrôle standard
     if sig and exp:
         if not _verify_signature(doc_id, exp, sig):
@@ -209,48 +228,89 @@ def download_document(request: Request, doc_id: int, exp: int | None = None, sig
         raise HTTPException(status_code=404, detail="Document introuvable")
     # Ownership check via policy -> client.owner
     if doc.policy_id and not sig:
-        pol = db.query(models.Policy).filter(models.Policy.id == doc.policy_id).first()
+        pol = db.query(models.Policy).options(joinedload(models.Policy.client)).filter(models.Policy.id == doc.policy_id).first()
         if pol and pol.client and pol.client.owner_id and pol.client.owner_id != current_user.id and current_user.role not in {UserRole.ADMIN, UserRole.MANAGER}:
             raise HTTPException(status_code=403, detail="Accès restreint au propriétaire")
     if not doc.file_path:
         raise HTTPException(status_code=404, detail="Fichier non disponible")
-    file_path = Path(doc.file_path)  # Chemin sur disque; on revalide confinement répertoire OUTPUT_DIR
-    try:
-        if not file_path.resolve().is_relative_to(Path(OUTPUT_DIR).resolve()):
+    storage = get_document_storage(db, (doc.doc_metadata or {}).get("storage"))
+    media_type = doc.mime_type or "application/octet-stream"
+    filename = PurePosixPath(doc.file_path).name
+    headers = {
+        "X-Doc-Id": str(doc.id),
+        "X-Checksum": (doc.doc_metadata or {}).get("checksum", ""),
+        "X-Signed": "1" if sig else "0"
+    }
+    response: Response
+    if storage.name == "local":
+        # Chemin sur disque; on revalide confinement répertoire OUTPUT_DIR
+        try:
+            file_path = resolve_document_path(doc.file_path)
+        except ValueError:
             raise HTTPException(status_code=400, detail="Chemin invalide")
-    except AttributeError:
-        root = str(Path(OUTPUT_DIR).resolve())
-        if not str(file_path.resolve()).startswith(root):
-            raise HTTPException(status_code=400, detail="Chemin invalide")
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Fichier introuvable sur disque")
+        if not file_path.exists():
+            raise HTTPException(status_code=404, detail="Fichier introuvable sur disque")
+        response = FileResponse(path=str(file_path), media_type=media_type, filename=filename, headers=headers)
+    elif url := storage.document_url(doc.file_path, filename, media_type, get_settings().document_url_ttl):
+        # Téléchargement direct depuis S3: l'API ne relaie pas les octets
+        response = RedirectResponse(url, status_code=307, headers=headers)
+    else:
+        try:
+            chunks = storage.open_document(doc.file_path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Fichier introuvable dans le stockage")
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response = StreamingResponse(chunks, media_type=media_type, headers=headers)
     # Audit
     db.add(models.AuditLog(user_id=current_user.id if not sig else None, action="download_document", object_type="GeneratedDocument", object_id=str(doc.id), audit_metadata={"signed": bool(sig)}))
     db.commit()
-    return FileResponse(
-        path=str(file_path),
-        media_type=doc.mime_type or "application/octet-stream",
-        filename=file_path.name,
-        headers={
-            "X-Doc-Id": str(doc.id),
-            "X-Checksum": (doc.doc_metadata or {}).get("checksum", ""),
-            "X-Signed": "1" if sig else "0"
-        },
-    )
+    return response
+
+@router.post("/purge-orphans", response_model=PurgeLaunchResponse, status_code=202)
+def launch_purge_orphans(dry_run: bool = False, resume: bool = True, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> PurgeLaunchResponse:
+    """Lance la purge des documents orphelins en tâche Celery (lots triés, délai de grâce).
 
-@router.post("/purge-orphans")
-def purge_orphans(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> dict[str, int | list[str]]:
+    resume: reprend après le dernier lot traité par la dernière purge si elle a échoué.
+    """
     can_superadmin(current_user)
-    existing_paths = {Path(p[0]).resolve() for p in db.query(models.GeneratedDocument.file_path).filter(models.GeneratedDocument.file_path.isnot(None)).all()}
-    root = Path(OUTPUT_DIR).resolve()
-    removed = []
-    for f in root.glob("doc_*"):
-        if f.resolve() not in existing_paths:
-            try:
-                f.unlink()
-                removed.append(f.name)
-            except OSError:
-                pass
-    db.add(models.AuditLog(user_id=current_user.id, action="purge_orphans", object_type="GeneratedDocument", object_id="*", audit_metadata={"removed": len(removed)}))
+    cursor = None
+    if resume:
+        last = db.query(models.ReportJob).filter(models.ReportJob.job_type == PURGE_JOB_TYPE).order_by(models.ReportJob.id.desc()).first()
+        if last and last.status == "failed":
+            cursor = (last.progress or {}).get("cursor") or (last.params or {}).get("cursor")
+    # Id de tâche pré-généré: le job est "queued" avant l'envoi
+    task_id = uuid4().hex
+    rj = models.ReportJob(
+        job_type=PURGE_JOB_TYPE,
+        status="queued",
+        params={"user_id": current_user.id, "dry_run": dry_run, "cursor": cursor},
+        celery_task_id=task_id,
+        queue="documents",
+    )
+    db.add(rj)
+    db.add(models.AuditLog(user_id=current_user.id, action="purge_orphans", object_type="GeneratedDocument", object_id="*", audit_metadata={"dry_run": dry_run, "cursor": cursor}))
     db.commit()
-    return {"removed": removed, "count": len(removed)}
+    db.refresh(rj)
+    try:
+        purge_orphan_documents.apply_async(args=(rj.id,), task_id=task_id)
+    except Exception:
+        rj.status = "failed"
+        rj.result = {"error": "broker indisponible"}
+        db.commit()
+        raise HTTPException(status_code=503, detail="Service indisponible - Celery requis pour la purge (Redis non disponible)") from None
+    return PurgeLaunchResponse(job_id=task_id, status="queued", report_job_id=rj.id, dry_run=dry_run, cursor=cursor)
+
+@router.get("/purge-orphans/{report_job_id}", response_model=PurgeStatusResponse)
+def purge_orphans_status(report_job_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> PurgeStatusResponse:
+    can_superadmin(current_user)
+    rj = db.get(models.ReportJob, report_job_id)
+    if not rj or rj.job_type != PURGE_JOB_TYPE:
+        raise HTTPException(status_code=404, detail="Purge introuvable")
+    params = rj.params or {}
+    return PurgeStatusResponse(
+        report_job_id=rj.id,
+        status=rj.status,
+        dry_run=bool(params.get("dry_run")),
+        progress=PurgeProgress(**(rj.progress or {"cursor": params.get("cursor")})),
+        error=(rj.result or {}).get("error"),
+    )
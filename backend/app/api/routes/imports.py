@@ -0,0 +1,97 @@
+"""Import en masse de clients / polices (CSV ou XLSX) via la queue Celery "imports".
+
+Le fichier est recopié en flux sur disque (pas de lecture complète en mémoire),
+puis traité par lots par la tâche import_portfolio. La progression et le rapport
+d'erreurs par ligne sont consultables via GET /imports/{report_job_id}.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+
+from backend.app.api.deps import get_current_user, get_db
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.db.models.user import User
+from backend.app.schemas.imports import ImportLaunchResponse, ImportProgress, ImportStatusResponse
+from backend.app.services.bulk_import import ALLOWED_EXTENSIONS, IMPORT_KINDS, IMPORTS_DIR
+from backend.app.services.import_tasks import import_portfolio
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+
+_COPY_CHUNK = 1024 * 1024
+
+
+def _save_upload(file: UploadFile) -> Path:
+    """Recopie l'upload par blocs de 1 Mo en refusant les fichiers trop volumineux."""
+    ext = Path(file.filename or "").suffix.lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail="Format non supporté (CSV ou XLSX attendu)")
+    max_bytes = get_settings().import_max_upload_mb * 1024 * 1024
+    dest = IMPORTS_DIR / f"import_{uuid4().hex}{ext}"
+    written = 0
+    with open(dest, "wb") as out:
+        while chunk := file.file.read(_COPY_CHUNK):
+            written += len(chunk)
+            if written > max_bytes:
+                out.close()
+                dest.unlink(missing_ok=True)
+                raise HTTPException(status_code=413, detail="Fichier d'import trop volumineux")
+            out.write(chunk)
+    return dest
+
+
+@router.post("/{kind}", response_model=ImportLaunchResponse, status_code=status.HTTP_202_ACCEPTED)
+def launch_import(
+    kind: str,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> ImportLaunchResponse:
+    if kind not in IMPORT_KINDS:
+        raise HTTPException(status_code=404, detail="Type d'import inconnu (clients ou policies)")
+    path = _save_upload(file)
+    # Id de tâche pré-généré: le job est "queued" avant l'envoi, un worker rapide
+    # ne peut donc pas voir son statut final écrasé par la route
+    task_id = uuid4().hex
+    rj = models.ReportJob(
+        job_type=f"import_{kind}",
+        status="queued",
+        params={"owner_id": current_user.id, "filename": file.filename},
+        celery_task_id=task_id,
+        queue="imports",
+    )
+    db.add(rj)
+    db.commit()
+    db.refresh(rj)
+    try:
+        import_portfolio.apply_async(args=(rj.id, kind, str(path), current_user.id), task_id=task_id)
+    except Exception:
+        # Broker indisponible: nettoyer job et fichier
+        path.unlink(missing_ok=True)
+        db.delete(rj)
+        db.commit()
+        raise HTTPException(status_code=503, detail="Service indisponible - Celery requis pour les imports (Redis non disponible)") from None
+    return ImportLaunchResponse(job_id=task_id, status="queued", report_job_id=rj.id, kind=kind)
+
+
+@router.get("/{report_job_id}", response_model=ImportStatusResponse)
+def import_status(
+    report_job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> ImportStatusResponse:
+    rj = db.get(models.ReportJob, report_job_id)
+    params = (rj.params or {}) if rj else {}
+    if not rj or not (rj.job_type or "").startswith("import_") or params.get("owner_id") != current_user.id:
+        raise HTTPException(status_code=404, detail="Import introuvable")
+    return ImportStatusResponse(
+        report_job_id=rj.id,
+        kind=(rj.job_type or "").removeprefix("import_"),
+        status=rj.status,
+        progress=ImportProgress(**(rj.progress or {})),
+        errors=(rj.result or {}).get("errors", []),
+    )
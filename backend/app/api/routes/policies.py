@@ -1,13 +1,20 @@
 """CRUD des polices d'assurance.
 
-Filtré par ownership via le client.owner_id de l'utilisateur authentifié.
+Filtré par ownership via le client.owner_id de l'utilisateur authentifié. Chaque écriture
+met à jour les tables de synthèse du portefeuille dans la même transaction
+(services.portfolio_summary).
 """
-from fastapi import APIRouter, Depends, HTTPException, Response, status
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from backend.app.api.deps import get_current_user, get_db_session
+from backend.app.api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, apply_keyset, paginate
 from backend.app.db import models
-from backend.app.schemas.policy import PolicyCreate, PolicyRead, PolicyUpdate
+from backend.app.schemas.policy import PolicyCreate, PolicyList, PolicyRead, PolicyUpdate
+from backend.app.services import portfolio_summary
 
 router = APIRouter(prefix="/policies", tags=["policies"])
 
@@ -25,18 +32,53 @@ def create_policy(payload: PolicyCreate, db: Session = Depends(get_db_session),
             raise HTTPException(status_code=404, detail="Company introuvable")
     policy = models.Policy(**payload.model_dump())
     db.add(policy)
+    portfolio_summary.apply_delta(db, added=[portfolio_summary.policy_contribution(policy, client.owner_id)])
     db.commit()
     db.refresh(policy)
     return policy
 
-@router.get("", response_model=list[PolicyRead])
-def list_policies(db: Session = Depends(get_db_session), user: models.User = Depends(get_current_user)) -> list[models.Policy]:
+@router.get("", response_model=PolicyList)
+def list_policies(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = Query(None, description="Curseur opaque renvoyé par la page précédente"),
+    status: str | None = Query(None, description="Filtrer par statut (active, expired, cancelled...)"),
+    client_id: int | None = None,
+    company_id: int | None = None,
+    expiry_from: datetime | None = None,
+    expiry_to: datetime | None = None,
+    q: str | None = Query(None, description="Recherche partielle (numéro de police, produit, nom du client)"),
+    db: Session = Depends(get_db_session),
+    user: models.User = Depends(get_current_user),
+) -> dict[str, object]:
+    """Liste paginée (curseur) des polices des clients de l'utilisateur.
+
+    Filtres combinables (AND); tri created_at DESC appuyé sur l'index (client_id, created_at).
+    """
     # Limiter aux policies des clients de l'utilisateur
-    return (db.query(models.Policy)
-              .join(models.Client)
-              .filter(models.Client.owner_id == user.id)
-              .order_by(models.Policy.created_at.desc())
-              .all())
+    query = (db.query(models.Policy)
+               .join(models.Client)
+               .filter(models.Client.owner_id == user.id))
+    if status:
+        query = query.filter(models.Policy.status == status)
+    if client_id is not None:
+        query = query.filter(models.Policy.client_id == client_id)
+    if company_id is not None:
+        query = query.filter(models.Policy.company_id == company_id)
+    if expiry_from:
+        query = query.filter(models.Policy.expiry_date >= expiry_from)
+    if expiry_to:
+        query = query.filter(models.Policy.expiry_date <= expiry_to)
+    if q:
+        pattern = f"%{q}%"
+        query = query.filter(or_(
+            models.Policy.policy_number.ilike(pattern),
+            models.Policy.product_name.ilike(pattern),
+            models.Client.first_name.ilike(pattern),
+            models.Client.last_name.ilike(pattern),
+        ))
+    query = apply_keyset(query, models.Policy.created_at, models.Policy.id, cursor)
+    items, next_cursor = paginate(query, limit)
+    return {"items": items, "next_cursor": next_cursor}
 
 @router.get("/{policy_id}", response_model=PolicyRead)
 def get_policy(policy_id: int, db: Session = Depends(get_db_session), user: models.User = Depends(get_current_user)) -> models.Policy:
@@ -56,8 +98,10 @@ def update_policy(policy_id: int, payload: PolicyUpdate, db: Session = Depends(g
                 .first())
     if not policy:
         raise HTTPException(status_code=404, detail="Police introuvable")
+    before = portfolio_summary.policy_contribution(policy, user.id)
     for k, v in payload.model_dump(exclude_unset=True).items():
         setattr(policy, k, v)
+    portfolio_summary.apply_delta(db, removed=[before], added=[portfolio_summary.policy_contribution(policy, user.id)])
     db.commit()
     db.refresh(policy)
     return policy
@@ -70,6 +114,7 @@ def delete_policy(policy_id: int, db: Session = Depends(get_db_session), user: m
                 .first())
     if not policy:
         raise HTTPException(status_code=404, detail="Police introuvable")
+    portfolio_summary.apply_delta(db, removed=[portfolio_summary.policy_contribution(policy, user.id)])
     db.delete(policy)
     db.commit()
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,23 +1,36 @@
 from __future__ import annotations
 
+from datetime import datetime
 from typing import TYPE_CHECKING
+from uuid import uuid4
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from backend.app.api.deps import get_current_user, get_db
 from backend.app.db import models
 from backend.app.db.models.user import User, UserRole
 from backend.app.schemas.report_jobs import (
+    ReportJobBulkStatusRequest,
+    ReportJobBulkStatusResponse,
     ReportJobLaunchResponse,
+    ReportJobStatusEntry,
     ReportJobStatusResponse,
 )
+from backend.app.services import report_dedup
+from backend.app.services.job_events import stream_job_events
+from backend.app.services.report_scheduling import QUICK_QUEUE, ReportQuotaExceeded, plan_heavy_report
 from backend.app.services.report_tasks import generate_dummy_report
 
 # Support Celery hybride
 try:
     from backend.app.services.celery_report_tasks import generate_dummy_report as celery_generate_dummy_report
-    from backend.app.services.celery_report_tasks import generate_heavy_report, get_task_status
+    from backend.app.services.celery_report_tasks import (
+        generate_heavy_report,
+        get_task_status,
+        get_task_statuses,
+    )
     CELERY_AVAILABLE = True
 except ImportError:
     CELERY_AVAILABLE = False
@@ -44,24 +57,40 @@ def require_admin(user: User) -> None:
 @router.post("/dummy", response_model=ReportJobLaunchResponse)
 def launch_dummy(report_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> ReportJobLaunchResponse:
     require_admin(current_user)
-    # Créer enregistrement report_jobs (status pending)
-    rj = models.ReportJob(job_type="dummy", status="pending", params={"report_id": report_id})
+    params = {"report_id": report_id}
+    # Demande identique en cours ou récente: rattachée au job existant (services.report_dedup)
+    key = report_dedup.dedup_key("dummy", params) if CELERY_AVAILABLE else None
+    if key and (existing := report_dedup.find_reusable_job(db, key)):
+        return ReportJobLaunchResponse(**report_dedup.attached_response(existing))
+    # Créer enregistrement report_jobs (status pending), tâche Celery pré-identifiée
+    task_id = str(uuid4())
+    rj = models.ReportJob(
+        job_type="dummy", status="pending", params=params, requested_by=current_user.id,
+        celery_task_id=task_id if CELERY_AVAILABLE else None, dedup_key=key,
+    )
     db.add(rj)
     db.commit()
     db.refresh(rj)
+    if key and (existing := report_dedup.claim(db, key, task_id)):
+        db.delete(rj)
+        db.commit()
+        return ReportJobLaunchResponse(**report_dedup.attached_response(existing))
     
     # Utiliser Celery si disponible, sinon fallback RQ
     if CELERY_AVAILABLE:
         try:
-            task = celery_generate_dummy_report.delay(report_id, rj.id)
+            # Rapport court: voie rapide
+            task = celery_generate_dummy_report.apply_async((report_id, rj.id), queue=QUICK_QUEUE, task_id=task_id)
             rj.status = "queued"
-            rj.params = {**(rj.params or {}), "celery_task_id": task.id}
+            rj.celery_task_id = task.id
+            rj.queue = QUICK_QUEUE
             db.add(rj)
             db.commit()
-            return ReportJobLaunchResponse(job_id=task.id, status="queued", report_job_id=rj.id)
+            return ReportJobLaunchResponse(job_id=task.id, status="queued", report_job_id=rj.id, queue=QUICK_QUEUE)
         except Exception:
-            # Fallback vers RQ si Celery échoue (pas de Redis par exemple)
-            pass
+            # Fallback vers RQ si Celery échoue (pas de Redis par exemple): job non partageable
+            rj.celery_task_id = None
+            rj.dedup_key = None
     
     # Fallback RQ (ancien système) ou si Celery a échoué
     job = generate_dummy_report.delay(report_id)  # type: ignore[attr-defined]
@@ -80,12 +109,24 @@ def launch_dummy(report_id: str, current_user: User = Depends(get_current_user),
 @router.post("/heavy", response_model=ReportJobLaunchResponse)
 def launch_heavy_report(
     report_type: str = Query(..., description="Type de rapport: pdf, excel, analysis"),
-    pages: int = Query(10, description="Nombre de pages (pour PDF)"),
-    processing_time: int = Query(10, description="Temps de traitement simulé (secondes)"),
+    pages: int = Query(10, ge=0, description="Pages de détail des polices (PDF, 0 = synthèse seule)"),
+    company_id: int | None = Query(None, description="Filtre compagnie"),
+    status: str | None = Query(None, description="Filtre statut des polices"),
+    period_start: datetime | None = Query(None, description="Date d'effet minimale (incluse)"),
+    period_end: datetime | None = Query(None, description="Date d'effet maximale (exclue)"),
+    priority: str = Query("normal", pattern="^(high|normal|low)$", description="Priorité demandée (ajustée selon le coût estimé)"),
+    force: bool = Query(False, description="Nouveau rapport même si un rapport identique est en cours ou récent"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ) -> ReportJobLaunchResponse:
-    """Lance un rapport lourd avec Celery."""
+    """Lance un rapport lourd avec Celery.
+
+    Une demande identique (même type, mêmes paramètres) à un rapport en cours ou terminé
+    depuis moins de REPORT_DEDUP_TTL secondes est rattachée à celui-ci (deduplicated, et
+    document_id s'il est terminé), sauf avec force.
+    La file (voie high / normal / low) dépend de la priorité demandée, du nombre de polices
+    couvertes et des rapports lourds déjà en cours de l'utilisateur (429 au-delà du plafond).
+    """
     require_admin(current_user)
     
     if not CELERY_AVAILABLE:
@@ -105,30 +146,51 @@ def launch_heavy_report(
     params = {
         "report_type": report_type,
         "pages": pages,
-        "processing_time": processing_time
+        "company_id": company_id,
+        "status": status,
+        "period_start": period_start.isoformat() if period_start else None,
+        "period_end": period_end.isoformat() if period_end else None,
     }
+    key = None if force else report_dedup.dedup_key("heavy", params)
+    if key and (existing := report_dedup.find_reusable_job(db, key)):
+        return ReportJobLaunchResponse(**report_dedup.attached_response(existing))
+    try:
+        queue, _ = plan_heavy_report(db, current_user.id, priority, params)
+    except ReportQuotaExceeded as exc:
+        raise HTTPException(status_code=429, detail=f"Trop de rapports en cours: {exc}")
     
+    task_id = str(uuid4())
     rj = models.ReportJob(
         job_type="heavy", 
         status="pending", 
-        params=params
+        params=params,
+        requested_by=current_user.id,
+        celery_task_id=task_id,
+        dedup_key=key,
     )
     db.add(rj)
     db.commit()
     db.refresh(rj)
+    # Demande identique simultanée: la première à réserver l'empreinte lance la tâche
+    if key and (existing := report_dedup.claim(db, key, task_id)):
+        db.delete(rj)
+        db.commit()
+        return ReportJobLaunchResponse(**report_dedup.attached_response(existing))
     
     # Lancer la tâche Celery
     try:
-        task = generate_heavy_report.delay(report_type, params, rj.id)
+        task = generate_heavy_report.apply_async((report_type, params, rj.id), queue=queue, task_id=task_id)
         rj.status = "queued"
-        rj.params = {**(rj.params or {}), "celery_task_id": task.id}
+        rj.celery_task_id = task.id
+        rj.queue = queue
         db.add(rj)
         db.commit()
         
         return ReportJobLaunchResponse(
             job_id=task.id,
             status="queued",
-            report_job_id=rj.id
+            report_job_id=rj.id,
+            queue=queue
         )
     except Exception:
         # Si Celery échoue (pas de Redis), nettoyer et retourner erreur 503
@@ -140,6 +202,34 @@ def launch_heavy_report(
         )
 
 
+@router.post("/jobs/status", response_model=ReportJobBulkStatusResponse, response_model_exclude_none=True)
+def bulk_job_status(payload: ReportJobBulkStatusRequest, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> ReportJobBulkStatusResponse:
+    """Statuts d'un lot de jobs (tableaux de bord): un MGET Redis + une requête IN.
+
+    Lecture seule: l'état Celery prime; à défaut (meta expirée ou Redis indisponible),
+    le statut enregistré dans report_jobs est renvoyé, "unknown" pour un id inconnu.
+    """
+    require_admin(current_user)
+    job_ids = list(dict.fromkeys(payload.job_ids))
+    rows = db.query(models.ReportJob.celery_task_id, models.ReportJob.id, models.ReportJob.status).filter(models.ReportJob.celery_task_id.in_(job_ids)).all()
+    jobs = {task_id: (pk, status) for task_id, pk, status in rows}
+    try:
+        tasks = get_task_statuses(job_ids) if CELERY_AVAILABLE else {}
+    except Exception:
+        tasks = {}
+    entries: dict[str, ReportJobStatusEntry] = {}
+    for job_id in job_ids:
+        pk, db_status = jobs.get(job_id, (None, None))
+        task = tasks.get(job_id)
+        entries[job_id] = ReportJobStatusEntry(
+            status=task["status"] if task else (db_status or "unknown"),
+            report_job_id=pk,
+            progress=task.get("progress") if task else None,
+            error=task.get("error") if task else None,
+        )
+    return ReportJobBulkStatusResponse(jobs=entries)
+
+
 @router.get("/jobs/{job_id}", response_model=ReportJobStatusResponse)
 def job_status(job_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> ReportJobStatusResponse:
     """Récupère le statut d'un job avec support Celery et RQ."""
@@ -163,7 +253,7 @@ def job_status(job_id: str, current_user: User = Depends(get_current_user), db:
             # Rechercher le job correspondant en base
             rj = (
                 db.query(models.ReportJob)
-                .filter(models.ReportJob.params.op("->>")('"celery_task_id"') == job_id)
+                .filter(models.ReportJob.celery_task_id == job_id)  # index ix_report_jobs_celery_task_id
                 .first()
             )
             
@@ -179,7 +269,11 @@ def job_status(job_id: str, current_user: User = Depends(get_current_user), db:
             return ReportJobStatusResponse(
                 job_id=job_id,
                 status=task_info["status"],
-                report_job_id=rj.id if rj else None
+                report_job_id=rj.id if rj else None,
+                progress=task_info.get("progress"),
+                estimated_completion=task_info.get("estimated_completion"),
+                result=task_info.get("result") if isinstance(task_info.get("result"), dict) else None,
+                error=task_info.get("error"),
             )
             
         except Exception:
@@ -213,3 +307,28 @@ def job_status(job_id: str, current_user: User = Depends(get_current_user), db:
             )
         except Exception:  # pragma: no cover
             return ReportJobStatusResponse(job_id=job_id, status="unknown", report_job_id=None)
+
+
+@router.get("/jobs/{job_id}/events")
+def job_events(job_id: str, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)) -> StreamingResponse:
+    """Flux Server-Sent Events de la progression d'un job Celery (remplace le polling).
+
+    Premier message: état courant; ensuite un message par événement publié par la tâche
+    (started, progress avec estimated_completion, retry, completed/failed avec résultat),
+    le flux se fermant sur un état terminal.
+    """
+    require_admin(current_user)
+    rj = db.query(models.ReportJob).filter(models.ReportJob.celery_task_id == job_id).first()
+    if not rj:
+        raise HTTPException(status_code=404, detail="Job introuvable")
+    snapshot = {
+        "status": rj.status,
+        "report_job_id": rj.id,
+        "progress": 100 if rj.status == "completed" else None,
+        "result": rj.result,
+    }
+    return StreamingResponse(
+        stream_job_events(job_id, snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,24 @@
+"""Recherche plein texte sur les clients et polices de l'utilisateur authentifié.
+
+Classement par pertinence (tsvector PostgreSQL / FTS5 SQLite), pagination skip/limit.
+"""
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from backend.app.api.deps import get_current_user, get_db_session
+from backend.app.db import models
+from backend.app.schemas.search import SearchResults
+from backend.app.services.search import search as run_search
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+@router.get("", response_model=SearchResults)
+def search(
+    q: str = Query(..., min_length=1, max_length=200, description="Termes recherchés (préfixes, insensible aux accents)"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_db_session),
+    user: models.User = Depends(get_current_user),
+) -> dict[str, object]:
+    hits = run_search(db, owner_id=user.id, q=q, limit=limit, skip=skip)
+    return {"items": hits, "skip": skip, "limit": limit}
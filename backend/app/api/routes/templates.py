@@ -5,14 +5,22 @@ from __future__ import annotations
 Règles:
  - Seuls ADMIN et MANAGER peuvent manipuler les templates.
  - Création d'une première version (v1) facultative lors du create si contenu fourni.
- - Numérotation des versions incrémentale et immuable.
+ - Numérotation des versions incrémentale et immuable, attribuée par incrément atomique de
+   templates.latest_version (pas de lecture de MAX(version), sans course entre créations).
+ - Upload et prévisualisations sont async: les E/S de stockage sont attendues (astore_stream,
+   aread_text) sans occuper un thread du pool; seuls les accès base et le rendu, brefs,
+   passent par run_in_threadpool.
 """
+from collections.abc import AsyncIterator
 from hashlib import sha256
+from typing import Any
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile, status
 from fastapi.responses import HTMLResponse
 from fastapi.responses import Response as FastAPIResponse
-from sqlalchemy.orm import Session
+from jinja2.exceptions import SecurityError
+from sqlalchemy.orm import Session, joinedload
+from starlette.concurrency import run_in_threadpool
 
 from backend.app.api.deps import get_current_user, get_db
 from backend.app.db import models
@@ -20,14 +28,23 @@ from backend.app.db.models.user import User, UserRole
 from backend.app.schemas.template import (
     TemplateCreate,
     TemplateRead,
+    TemplateRenderProfile,
     TemplateUpdate,
     TemplateVersionCreate,
     TemplateVersionRead,
     TemplateWithVersions,
 )
-from backend.app.services.document_renderer import render_template
-from backend.app.services.storage_provider import get_storage
-from backend.app.services.template_storage import sha256_hex
+from backend.app.services.document_renderer import RenderLimitError, render_template
+from backend.app.services.storage_provider import LocalStorageBackend, get_storage
+from backend.app.services.template_cache import aread_cached_text
+from backend.app.services.template_profile import get_profile
+from backend.app.services.template_storage import STREAM_CHUNK_SIZE, ChecksumMismatchError
+from backend.app.services.template_versions import (
+    ResolvedVersion,
+    allocate_version,
+    invalidate_template,
+    resolve_version_number,
+)
 
 router = APIRouter(prefix="/templates", tags=["templates"])
 
@@ -37,6 +54,39 @@ def ensure_admin_or_manager(user: User) -> None:
     if user.role not in {UserRole.ADMIN, UserRole.MANAGER}:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès refusé")
 
+async def _read_file_content(db: Session, ver: ResolvedVersion) -> str:
+    """Contenu d'une version stockée hors base, via le cache à niveaux indexé par checksum."""
+    storage = await run_in_threadpool(get_storage, db)
+    assert ver.file_path is not None
+    return await aread_cached_text(storage, ver.file_path, ver.checksum, use_disk=not isinstance(storage, LocalStorageBackend))
+
+async def _version_content(db: Session, template_id: int, version: int) -> Any:
+    """Contenu d'une version (template compilé si en base, texte si fichier); lève 404/400 comme les prévisualisations.
+
+    Version résolue via le cache en mémoire: aucune requête si elle est déjà connue.
+    """
+    ver = await run_in_threadpool(resolve_version_number, db, template_id, version)
+    if not ver:
+        raise HTTPException(status_code=404, detail="Version not found")
+    if ver.content:
+        return ver.compiled()
+    if ver.file_path:
+        try:
+            return await _read_file_content(db, ver)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Fichier de template illisible")
+    raise HTTPException(status_code=400, detail="Aucun contenu")
+
+async def _render_preview(raw: Any, ctx: dict[str, Any], fmt: str) -> bytes:
+    try:
+        return await run_in_threadpool(render_template, raw, ctx, fmt)
+    except (RenderLimitError, SecurityError) as exc:
+        raise HTTPException(status_code=422, detail=f"Rendu du template refusé: {exc}") from None
+
+async def _upload_chunks(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(STREAM_CHUNK_SIZE):
+        yield chunk
+
 @router.post("/", response_model=TemplateRead, status_code=status.HTTP_201_CREATED)
 def create_template(payload: TemplateCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> models.Template:
     ensure_admin_or_manager(current_user)
@@ -48,16 +98,16 @@ def create_template(payload: TemplateCreate, db: Session = Depends(get_db), curr
         is_active=payload.is_active if payload.is_active is not None else True,
         created_by=current_user.id,
     )
+    if payload.content is not None:
+        # Template neuf: personne d'autre ne peut encore lui attribuer de version
+        tpl.latest_version = 1
     db.add(tpl)
     db.flush()  # pour obtenir l'ID avant de créer éventuellement la version
     if payload.content is not None:
-        # Calcule version initiale (devrait être 1 mais on sécurise en cas de race condition)
-        last_version = db.query(models.TemplateVersion).filter(models.TemplateVersion.template_id == tpl.id).order_by(models.TemplateVersion.version.desc()).first()
-        next_version = 1 if not last_version else last_version.version + 1
         checksum = sha256(payload.content.encode("utf-8")).hexdigest()
         version = models.TemplateVersion(
             template_id=tpl.id,
-            version=next_version,
+            version=1,
             storage_backend=payload.storage_backend,
             content=payload.content,
             checksum=checksum,
@@ -78,12 +128,10 @@ def list_templates(skip: int = 0, limit: int = 100, active: bool | None = None,
 @router.get("/{template_id}", response_model=TemplateWithVersions)
 def get_template(template_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> models.Template:
     ensure_admin_or_manager(current_user)
-    tpl = db.query(models.Template).filter(models.Template.id == template_id).first()
+    # Template + versions en une seule requête (JOIN), ordonnées par la relation
+    tpl = db.query(models.Template).options(joinedload(models.Template.versions)).filter(models.Template.id == template_id).first()
     if not tpl:
         raise HTTPException(status_code=404, detail="Template not found")
-    versions = db.query(models.TemplateVersion).filter(models.TemplateVersion.template_id == tpl.id).order_by(models.TemplateVersion.version).all()
-    # attache dynamiquement l'attribut pour la réponse enrichie
-    tpl.versions = versions
     return tpl
 
 @router.patch("/{template_id}", response_model=TemplateRead)
@@ -96,17 +144,17 @@ def update_template(template_id: int, payload: TemplateUpdate, db: Session = Dep
     for k, v in data.items():
         setattr(tpl, k, v)
     db.commit()
+    invalidate_template(template_id)
     db.refresh(tpl)
     return tpl
 
 @router.post("/{template_id}/versions", response_model=TemplateVersionRead, status_code=status.HTTP_201_CREATED)
 def add_template_version(template_id: int, payload: TemplateVersionCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> models.TemplateVersion:
     ensure_admin_or_manager(current_user)
-    tpl = db.query(models.Template).filter(models.Template.id == template_id).first()
-    if not tpl:
+    # Incrément atomique de templates.latest_version: la ligne reste verrouillée jusqu'au commit
+    new_version_number = allocate_version(db, template_id)
+    if new_version_number is None:
         raise HTTPException(status_code=404, detail="Template not found")
-    last_version = db.query(models.TemplateVersion).filter(models.TemplateVersion.template_id == template_id).order_by(models.TemplateVersion.version.desc()).first()  # Récupère dernière version pour incrément
-    new_version_number = 1 if not last_version else last_version.version + 1
     checksum = None
     if payload.content:
         checksum = sha256(payload.content.encode("utf-8")).hexdigest()
@@ -120,6 +168,7 @@ def add_template_version(template_id: int, payload: TemplateVersionCreate, db: S
     )
     db.add(version)
     db.commit()
+    invalidate_template(template_id)
     db.refresh(version)
     return version
 
@@ -131,19 +180,32 @@ def get_template_version(template_id: int, version: int, db: Session = Depends(g
         raise HTTPException(status_code=404, detail="Version not found")
     return ver
 
+@router.get("/{template_id}/versions/{version}/profile", response_model=TemplateRenderProfile)
+def get_template_version_profile(template_id: int, version: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> TemplateRenderProfile:
+    """Profil de coût des rendus de la version (temps, taille de sortie), pour la planification de capacité."""
+    ensure_admin_or_manager(current_user)
+    ver = resolve_version_number(db, template_id, version)
+    if not ver:
+        raise HTTPException(status_code=404, detail="Version not found")
+    return TemplateRenderProfile(template_id=template_id, version=version, **(get_profile(f"v{ver.id}") or {}))
+
 @router.delete("/{template_id}", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
 def delete_template(template_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)) -> Response:
     ensure_admin_or_manager(current_user)
     tpl = db.query(models.Template).filter(models.Template.id == template_id).first()
     if not tpl:
         raise HTTPException(status_code=404, detail="Template not found")
+    # Versions supprimées explicitement (passive_deletes: SQLite sans clés étrangères actives les
+    # conserverait, et un template recréé sous le même id heurterait leurs numéros)
+    db.query(models.TemplateVersion).filter(models.TemplateVersion.template_id == template_id).delete(synchronize_session=False)
     db.delete(tpl)
     db.commit()
+    invalidate_template(template_id)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.post("/{template_id}/upload", response_model=TemplateVersionRead, status_code=status.HTTP_201_CREATED)
-def upload_template_file(
+async def upload_template_file(
     template_id: int,
     file: UploadFile = File(...),
     checksum: str | None = Form(None),
@@ -152,37 +214,43 @@ def upload_template_file(
 ) -> models.TemplateVersion:
     """Upload binaire sécurisé d'un template. Stocke sur disque et crée une nouvelle version.
 
-    Si un checksum (sha256 hex) est fourni, il est validé côté serveur.
+    Si un checksum (sha256 hex) est fourni, il est validé côté serveur avant que le
+    fichier ne devienne visible dans le stockage.
     """
     ensure_admin_or_manager(current_user)
-    tpl = db.query(models.Template).filter(models.Template.id == template_id).first()
+    tpl = await run_in_threadpool(lambda: db.query(models.Template).filter(models.Template.id == template_id).first())
     if not tpl:
         raise HTTPException(status_code=404, detail="Template not found")
-    data = file.file.read()
-    if checksum:
-        calc = sha256_hex(data)
-        if calc != checksum:
-            raise HTTPException(status_code=400, detail="Checksum mismatch")
-    storage = get_storage(db)
-    stored_path = storage.store_bytes(data, filename=file.filename, content_type=file.content_type)
-    last_version = db.query(models.TemplateVersion).filter(models.TemplateVersion.template_id == template_id).order_by(models.TemplateVersion.version.desc()).first()
-    new_version_number = 1 if not last_version else last_version.version + 1
-    version = models.TemplateVersion(
-        template_id=template_id,
-        version=new_version_number,
-        storage_backend="file",
-        content=None,
-        file_path=stored_path,
-        checksum=sha256_hex(data),
-    )
-    db.add(version)
-    db.commit()
-    db.refresh(version)
-    return version
+    storage = await run_in_threadpool(get_storage, db)
+    # Envoi en flux (pas de lecture complète en mémoire), checksum calculé pendant l'envoi
+    try:
+        stored = await storage.astore_stream(_upload_chunks(file), filename=file.filename, content_type=file.content_type, expected_sha256=checksum)
+    except ChecksumMismatchError:
+        raise HTTPException(status_code=400, detail="Checksum mismatch") from None
+
+    def _create_version() -> models.TemplateVersion:
+        new_version_number = allocate_version(db, template_id)
+        if new_version_number is None:  # template supprimé pendant l'envoi
+            raise HTTPException(status_code=404, detail="Template not found")
+        version = models.TemplateVersion(
+            template_id=template_id,
+            version=new_version_number,
+            storage_backend="file",
+            content=None,
+            file_path=stored.path,
+            checksum=stored.checksum,
+        )
+        db.add(version)
+        db.commit()
+        invalidate_template(template_id)
+        db.refresh(version)
+        return version
+
+    return await run_in_threadpool(_create_version)
 
 
 @router.get("/{template_id}/versions/{version}/preview", response_class=HTMLResponse)
-def preview_template(
+async def preview_template(
     template_id: int,
     version: int,
     db: Session = Depends(get_db),
@@ -194,28 +262,15 @@ def preview_template(
     - Si stocké fichier, on lit le fichier et on renvoie le rendu HTML.
     """
     ensure_admin_or_manager(current_user)
-    ver = db.query(models.TemplateVersion).filter(models.TemplateVersion.template_id == template_id, models.TemplateVersion.version == version).first()
-    if not ver:
-        raise HTTPException(status_code=404, detail="Version not found")
-    # Détermine le contenu brut
-    if ver.content:
-        raw = ver.content
-    elif ver.file_path:
-        try:
-            storage = get_storage(db)
-            raw = storage.read_text(ver.file_path)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Fichier de template illisible")
-    else:
-        raise HTTPException(status_code=400, detail="Aucun contenu")
+    raw = await _version_content(db, template_id, version)
     # Construit un mini contexte
     ctx = {"inline_context": {"example": "Aperçu"}}
-    html_bytes = render_template(raw, ctx, "html")
+    html_bytes = await _render_preview(raw, ctx, "html")
     return HTMLResponse(content=html_bytes.decode("utf-8"))
 
 
 @router.get("/{template_id}/versions/{version}/preview.pdf")
-def preview_template_pdf(
+async def preview_template_pdf(
     template_id: int,
     version: int,
     db: Session = Depends(get_db),
@@ -226,19 +281,7 @@ def preview_template_pdf(
     Lit le contenu (DB ou fichier), puis rend en PDF via le moteur existant.
     """
     ensure_admin_or_manager(current_user)
-    ver = db.query(models.TemplateVersion).filter(models.TemplateVersion.template_id == template_id, models.TemplateVersion.version == version).first()
-    if not ver:
-        raise HTTPException(status_code=404, detail="Version not found")
-    if ver.content:
-        raw = ver.content
-    elif ver.file_path:
-        try:
-            storage = get_storage(db)
-            raw = storage.read_text(ver.file_path)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Fichier de template illisible")
-    else:
-        raise HTTPException(status_code=400, detail="Aucun contenu")
+    raw = await _version_content(db, template_id, version)
     ctx = {"inline_context": {"example": "Aperçu"}}
-    pdf_bytes = render_template(raw, ctx, "pdf")
+    pdf_bytes = await _render_preview(raw, ctx, "pdf")
     return FastAPIResponse(content=pdf_bytes, media_type="application/pdf")
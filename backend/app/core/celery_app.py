@@ -8,7 +8,8 @@ from __future__ import annotations
 import os
 
 from celery import Celery
-from celery.signals import worker_ready
+from celery.signals import task_postrun, worker_process_init, worker_process_shutdown, worker_ready
+from kombu import Queue
 
 from backend.app.core.config import get_settings
 
@@ -38,7 +39,8 @@ celery_app = Celery(
         "backend.app.services.celery_report_tasks",
         "backend.app.services.document_tasks",
         "backend.app.services.notification_tasks",
-        "backend.app.services.monitoring_tasks"
+        "backend.app.services.monitoring_tasks",
+        "backend.app.services.import_tasks",
     ]
 )
 
@@ -65,6 +67,7 @@ celery_app.conf.update(
         "backend.app.services.report_tasks.*": {"queue": "reports"},
         "backend.app.services.document_tasks.*": {"queue": "documents"},
         "backend.app.services.notification_tasks.*": {"queue": "notifications"},
+        "backend.app.services.import_tasks.*": {"queue": "imports"},
     },
     
     # Limits par tâche
@@ -93,9 +96,20 @@ celery_app.conf.update(
             'task': 'backend.app.services.monitoring_tasks.system_health_check',
             'schedule': 300.0,  # Toutes les 5 minutes
         },
+        'reconcile-portfolio-summaries': {
+            'task': 'backend.app.services.monitoring_tasks.reconcile_portfolio_summaries',
+            'schedule': settings.portfolio_summary_reconcile_interval,
+        },
     },
 )
 
+# Statuts de jobs regroupés: écriture périodique du tampon, inutile sans regroupement
+if settings.job_status_coalesce:
+    celery_app.conf.beat_schedule['flush-job-status'] = {
+        'task': 'backend.app.services.celery_report_tasks.flush_job_status_buffer',
+        'schedule': settings.job_status_flush_interval,
+    }
+
 # Configuration spécifique par environnement
 if settings.environment == "development":
     celery_app.conf.update(
@@ -118,32 +132,78 @@ elif settings.environment == "production":
 @worker_ready.connect
 def worker_ready_handler(sender=None, **kwargs):
     """Signal envoyé quand un worker est prêt."""
+    from backend.app.services.template_warmup import warm_up_templates
+    # Pools solo/threads: les tâches tournent dans ce process
+    warm_up_templates("worker")
     print(f"Celery worker {sender} is ready")
 
 
-# Création des queues
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs):
+    """Pool prefork: pool de connexions propre au process enfant, puis préchargement des templates."""
+    from backend.app.db.session import reset_engine_after_fork
+    from backend.app.services.template_warmup import warm_up_templates
+    reset_engine_after_fork()
+    warm_up_templates("worker_child")
+
+
+@worker_process_shutdown.connect
+def worker_process_shutdown_handler(**kwargs):
+    """Arrêt d'un process worker: écrit les statuts regroupés restants et libère les connexions."""
+    from backend.app.db.session import engine, worker_session
+    from backend.app.services.job_status_buffer import flush_all
+    try:
+        if settings.job_status_coalesce:
+            flush_all(worker_session())
+    except Exception as exc:
+        print(f"Flush des statuts de jobs à l'arrêt impossible: {exc}")
+    finally:
+        worker_session.remove()
+        engine.dispose()
+
+
+@task_postrun.connect
+def task_postrun_handler(**kwargs):
+    """Fin de tâche: la session du worker est libérée (état ORM non conservé entre tâches)."""
+    from backend.app.db.session import worker_session
+    worker_session.remove()
+
+
+# Files déclarées (consommées selon --queues de chaque worker, voir docker-compose.celery.yml).
+# Les rapports sont répartis en trois voies choisies au lancement selon la priorité
+# demandée, le coût estimé et la part équitable par utilisateur (services.report_scheduling).
 CELERY_QUEUES = {
+    "reports_high": {
+        "routing_key": "reports_high",
+        "description": "Rapports courts et prioritaires (worker dédié)"
+    },
     "reports": {
         "routing_key": "reports",
-        "priority": 5,
-        "description": "Génération de rapports lourds"
+        "description": "Génération de rapports lourds (voie normale)"
+    },
+    "reports_low": {
+        "routing_key": "reports_low",
+        "description": "Rapports volumineux ou au-delà de la part équitable de l'utilisateur"
     },
     "documents": {
         "routing_key": "documents", 
-        "priority": 7,
         "description": "Traitement de documents"
     },
     "notifications": {
         "routing_key": "notifications",
-        "priority": 3,
         "description": "Envoi de notifications"
     },
+    "imports": {
+        "routing_key": "imports",
+        "description": "Imports en masse (clients, polices)"
+    },
     "celery": {
         "routing_key": "celery",
-        "priority": 6,
         "description": "Tâches système par défaut"
     }
 }
+celery_app.conf.task_queues = tuple(Queue(name, routing_key=conf["routing_key"]) for name, conf in CELERY_QUEUES.items())
+celery_app.conf.task_default_queue = "celery"
 
 # Auto-discovery des tâches
 celery_app.autodiscover_tasks()
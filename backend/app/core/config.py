@@ -50,6 +50,77 @@ class Settings(BaseSettings):
     login_attempts_enabled: bool = True
     login_attempts_ip_per_minute: int = 30
     login_attempts_account_per_minute: int = 10
+    # Import en masse (CSV/XLSX)
+    import_batch_size: int = 1000
+    import_max_upload_mb: int = 200
+    # Backend de stockage: relecture de storage_config au plus toutes les N secondes
+    # (invalidation immédiate via Redis pub/sub quand disponible)
+    storage_cache_ttl: int = 60
+    # S3: upload multipart au-delà d'une part (5 Mo minimum), parts envoyées en parallèle
+    s3_multipart_part_mb: int = 8
+    s3_multipart_concurrency: int = 4
+    # Google Drive: blocs d'upload résumable / plages de téléchargement (Mo), plages lues en
+    # parallèle, nouveaux essais (backoff exponentiel) sur 429 / rateLimitExceeded / 5xx
+    gdrive_chunk_mb: int = 8
+    gdrive_download_workers: int = 4
+    gdrive_max_retries: int = 5
+    gdrive_http_timeout: int = 60
+    # Documents générés: durée de validité des URL présignées S3 de téléchargement (s)
+    document_url_ttl: int = 300
+    # Purge des documents orphelins: taille des lots (requête IN par lot) et délai de grâce
+    # protégeant les écritures dont la ligne generated_documents n'est pas encore commitée (s)
+    purge_batch_size: int = 500
+    purge_grace_seconds: int = 3600
+    # Cache des contenus de templates (par checksum): mémoire puis disque local
+    template_cache_dir: str = "template_cache"
+    template_cache_memory_mb: int = 32
+    template_cache_disk_mb: int = 512
+    # Cache de résolution des versions de template (id / (template, version) -> version compilée)
+    template_version_cache_size: int = 1024
+    template_version_cache_ttl: int = 300
+    # Préchargement au démarrage (API + workers Celery): bundle de templates compilés en modules
+    template_warmup_enabled: bool = True
+    template_bundle_dir: str = "template_cache/bundles"
+    # Rendu des templates (sandbox Jinja2): budget de temps par rendu (s, 0 = illimité), taille
+    # maximale de sortie (Mo), longueur maximale de range()
+    render_timeout_seconds: float = 10.0
+    render_max_output_mb: int = 10
+    render_max_range: int = 100_000
+    # Flux SSE de progression des jobs (GET /reports/jobs/{id}/events): intervalle du keep-alive (s)
+    job_events_heartbeat: float = 15.0
+    # Durée de vie maximale d'un flux SSE (s): un événement terminal perdu ne retient pas la
+    # connexion indéfiniment (EventSource se reconnecte et relit l'état en base)
+    job_events_max_stream: float = 3600.0
+    # Statuts des report_jobs écrits par les workers: regroupement des transitions intermédiaires
+    # dans Redis, écrites par lots de JOB_STATUS_FLUSH_SIZE et au moins toutes les
+    # JOB_STATUS_FLUSH_INTERVAL secondes (tâche beat)
+    job_status_coalesce: bool = False
+    job_status_flush_size: int = 100
+    job_status_flush_interval: float = 2.0
+    # Rapports lourds (services.report_engine): taille des lots de lecture en flux, nombre
+    # maximal de polices détaillées dans un classeur XLSX
+    report_stream_batch: int = 1000
+    report_max_detail_rows: int = 100_000
+    # Agrégation découpée en sous-tâches Celery (map / reduce) au-delà de REPORT_CHUNK_SIZE
+    # polices (0 = jamais); nouveaux essais par morceau
+    report_chunk_size: int = 50_000
+    report_chunk_max_retries: int = 3
+    # Voies de priorité des rapports (services.report_scheduling): au plus REPORT_QUICK_ROWS
+    # polices -> voie rapide, au-delà de REPORT_HEAVY_ROWS -> une voie plus bas; rapports
+    # lourds en cours par utilisateur avant relégation en voie basse / refus (0 = sans limite)
+    report_quick_rows: int = 5_000
+    report_heavy_rows: int = 100_000
+    report_user_fair_share: int = 2
+    report_user_max_active: int = 10
+    # Demandes de rapport identiques (même type, mêmes paramètres) rattachées au job en cours
+    # ou au document produit depuis moins de REPORT_DEDUP_TTL secondes (0 = désactivé)
+    report_dedup_ttl: int = 600
+    # Tables de synthèse du portefeuille (services.portfolio_summary): intervalle de la
+    # réconciliation périodique (s)
+    portfolio_summary_reconcile_interval: float = 3600.0
+    # Catalogue des compagnies (GET /companies)
+    companies_cache_local_ttl: int = 5  # revalidation mémoire -> Redis (s)
+    companies_cache_max_age: int = 60  # Cache-Control côté client (s)
 
 @lru_cache(maxsize=1)
 def get_settings() -> Settings:
@@ -8,6 +8,7 @@ from .declaration_item import DeclarationItem
 from .generated_document import GeneratedDocument
 from .integration_config import IntegrationConfig
 from .policy import Policy
+from .portfolio_summary import PortfolioExpiry, PortfolioSummary
 from .refresh_token import RefreshToken
 from .report_job import ReportJob
 from .storage_config import StorageConfig
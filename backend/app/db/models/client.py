@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, String, Text, text
+from sqlalchemy import DateTime, ForeignKey, Index, String, Text, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.app.db.base import Base
@@ -17,6 +17,8 @@ class Client(Base):
     """Client final rattaché à un utilisateur propriétaire."""
 
     __tablename__ = "clients"
+    # Listing paginé par propriétaire (keyset sur created_at)
+    __table_args__ = (Index("ix_clients_owner_created", "owner_id", "created_at"),)
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     first_name: Mapped[str] = mapped_column(String(100), nullable=False)
     last_name: Mapped[str] = mapped_column(String(100), nullable=False)
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import DateTime, ForeignKey, Integer, String, text
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.app.db.base import Base
@@ -17,6 +17,8 @@ class Policy(Base):
     """Police d'assurance (lien client + compagnie)."""
 
     __tablename__ = "policies"
+    # Listing paginé via la jointure client (keyset sur created_at)
+    __table_args__ = (Index("ix_policies_client_created", "client_id", "created_at"),)
     id: Mapped[int] = mapped_column(primary_key=True)
     policy_number: Mapped[str] = mapped_column(String(100), unique=True, index=True)
     client_id: Mapped[int] = mapped_column(ForeignKey("clients.id", ondelete="CASCADE"), nullable=False)
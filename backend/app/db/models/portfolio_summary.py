@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Index, Integer, String, UniqueConstraint, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.app.db.base import Base
+
+
+class PortfolioSummary(Base):
+    """Totaux des polices par agent, compagnie, statut et devise (services.portfolio_summary).
+
+    owner_id / company_id valent 0 pour les polices sans propriétaire / sans compagnie
+    (clé d'unicité sans NULL, nécessaire aux upserts).
+    """
+
+    __tablename__ = "portfolio_summaries"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "company_id", "status", "currency", name="uq_portfolio_summary_key"),
+        Index("ix_portfolio_summaries_company", "company_id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    owner_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    company_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    status: Mapped[str] = mapped_column(String(30), nullable=False)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)
+    policies: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    premium_total: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
+
+
+class PortfolioExpiry(Base):
+    """Polices actives par agent, compagnie, mois d'expiration (AAAA-MM) et devise."""
+
+    __tablename__ = "portfolio_expiries"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "company_id", "expiry_month", "currency", name="uq_portfolio_expiry_key"),
+        Index("ix_portfolio_expiries_company_month", "company_id", "expiry_month"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    owner_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    company_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    expiry_month: Mapped[str] = mapped_column(String(7), nullable=False)
+    currency: Mapped[str] = mapped_column(String(3), nullable=False)
+    policies: Mapped[int] = mapped_column(Integer, nullable=False, server_default=text("0"))
+    premium_total: Mapped[int] = mapped_column(BigInteger, nullable=False, server_default=text("0"))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, String, text
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, String, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from backend.app.db.base import Base
@@ -10,11 +10,21 @@ class ReportJob(Base):
     """Job de génération de rapports (pour future exécution asynchrone)."""
 
     __tablename__ = "report_jobs"
+    # Rapports en cours d'un utilisateur (part équitable, services.report_scheduling)
+    __table_args__ = (Index("ix_report_jobs_requested_by_status", "requested_by", "status"),)
     id: Mapped[int] = mapped_column(primary_key=True)
     job_type: Mapped[str | None] = mapped_column(String(30))
     scheduled_for: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     status: Mapped[str | None] = mapped_column(String(20))
-    params: Mapped[dict | None] = mapped_column(JSON)
+    params: Mapped[dict | None] = mapped_column(JSON)  # paramètres d'entrée du job
+    # Id de tâche Celery: clé des consultations de statut (index, pas de recherche dans le JSON)
+    celery_task_id: Mapped[str | None] = mapped_column(String(155), index=True)
+    queue: Mapped[str | None] = mapped_column(String(30))
+    progress: Mapped[dict | None] = mapped_column(JSON)
+    result: Mapped[dict | None] = mapped_column(JSON)
+    requested_by: Mapped[int | None] = mapped_column(ForeignKey("users.id", ondelete="SET NULL"))
+    # Empreinte (type + paramètres normalisés) des demandes identiques (services.report_dedup)
+    dedup_key: Mapped[str | None] = mapped_column(String(64), index=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, server_default=text("CURRENT_TIMESTAMP"))
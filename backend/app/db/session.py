@@ -5,7 +5,7 @@ SQLite: create_all automatique pour dev/tests (Alembic pour prod/PostgreSQL).
 from collections.abc import Generator
 
 from sqlalchemy import create_engine, event
-from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 
 from backend.app.core.config import get_settings
 from backend.app.db.base import Base
@@ -69,6 +69,17 @@ if settings.database_url.startswith("sqlite"):
     Base.metadata.create_all(bind=engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, class_=Session)
 
+# Workers Celery: session par thread réutilisée d'une tâche à l'autre (libérée en fin de tâche,
+# signal task_postrun); la connexion revient au pool du process à chaque commit.
+worker_session = scoped_session(SessionLocal)
+
+
+def reset_engine_after_fork() -> None:
+    """Process enfant (prefork): abandonne, sans les fermer, les connexions héritées du parent."""
+    worker_session.remove()
+    engine.dispose(close=False)
+
+
 def get_db() -> Generator[Session, None, None]:
     db: Session = SessionLocal()
     try:
@@ -1,4 +1,5 @@
 """Application FastAPI principale (wiring des routes et middlewares)."""
+import asyncio
 from collections.abc import AsyncIterator, Awaitable
 from contextlib import asynccontextmanager
 from typing import Callable
@@ -10,13 +11,16 @@ from sqlalchemy import text
 
 from backend.app.api.routes import (
     admin_storage,
+    analytics,
     audit_logs,
     auth,
     clients,
     companies,
     documents,
+    imports,
     policies,
     reports,
+    search,
     templates,
 )
 from backend.app.core.config import get_settings
@@ -55,6 +59,9 @@ async def lifespan(app: FastAPI) -> AsyncIterator[None]:
                     conn.execute(text('DROP TABLE policies'))
                     Base.metadata.tables['policies'].create(bind=conn)
     # (Backfills SQLite retirés; s'appuyer sur Alembic pour tout schéma)
+    # Préchargement des templates actifs avant de servir (évite les compilations au premier passage)
+    from backend.app.services.template_warmup import warm_up_templates
+    await asyncio.to_thread(warm_up_templates, "api")
     yield
     # Shutdown: rien pour l'instant
 
@@ -151,6 +158,9 @@ app.include_router(documents.router, prefix="/api/v1")
 app.include_router(templates.router, prefix="/api/v1")
 app.include_router(admin_storage.router, prefix="/api/v1")
 app.include_router(audit_logs.router, prefix="/api/v1")
+app.include_router(search.router, prefix="/api/v1")
+app.include_router(imports.router, prefix="/api/v1")
+app.include_router(analytics.router, prefix="/api/v1")
 
 # Import et ajout du router seed
 from backend.app.api.v1.seed import router as seed_router
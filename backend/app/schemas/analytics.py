@@ -0,0 +1,53 @@
+from pydantic import BaseModel
+
+
+class AnalyticsGroupRow(BaseModel):
+    key: int | str  # id de compagnie / d'agent (-1: aucun), statut, devise ou mois (AAAA-MM)
+    label: str | None = None  # nom de la compagnie (group_by=company)
+    currency: str
+    policies: int
+    premium_total: int
+
+
+class AnalyticsGroupTotals(BaseModel):
+    group_by: str
+    rows: list[AnalyticsGroupRow]
+
+
+class ExpiryPipelineRow(BaseModel):
+    bucket: str  # expired, 0-30, 31-60, 61-90, >90 (jours)
+    currency: str
+    policies: int
+    premium_total: int
+
+
+class ExpiryPipeline(BaseModel):
+    rows: list[ExpiryPipelineRow]
+
+
+class PremiumPercentiles(BaseModel):
+    quantiles: list[float]
+    by_currency: dict[str, dict[str, float]]  # devise -> {"p50": ..., "p90": ...}
+
+
+class SummaryStatusRow(BaseModel):
+    status: str
+    currency: str
+    policies: int
+    premium_total: int
+
+
+class SummaryExpiryRow(BaseModel):
+    month: str  # AAAA-MM
+    currency: str
+    policies: int
+    premium_total: int
+
+
+class PortfolioSummary(BaseModel):
+    owner_id: int | None = None  # agent (None: tous les agents)
+    company_id: int | None = None  # 0: polices sans compagnie
+    policies: int
+    premium_by_currency: dict[str, int]
+    by_status: list[SummaryStatusRow]
+    upcoming_expiries: list[SummaryExpiryRow]  # polices actives, mois courant inclus
@@ -1,4 +1,5 @@
 """Extension du schéma de réponse pour supporter Celery."""
+from datetime import datetime
 from typing import Any, Optional
 
 from pydantic import BaseModel
@@ -28,8 +29,11 @@ class ReportJobStatusResponse(BaseModel):
 class HeavyReportRequest(BaseModel):
     """Requête pour un rapport lourd."""
     report_type: str  # pdf, excel, analysis
-    pages: Optional[int] = 10
-    processing_time: Optional[int] = 10  # Pour simulation
+    pages: Optional[int] = 10  # pages de détail des polices (PDF)
+    company_id: Optional[int] = None
+    status: Optional[str] = None
+    period_start: Optional[datetime] = None  # bornes sur la date d'effet des polices
+    period_end: Optional[datetime] = None
     priority: Optional[str] = "normal"  # normal, high, low
     callback_url: Optional[str] = None  # URL de callback à la fin
 
@@ -25,3 +25,8 @@ class ClientRead(ClientBase):
     owner_id: int | None
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
+
+class ClientList(BaseModel):
+    """Page de clients (pagination par curseur)."""
+    items: list[ClientRead]
+    next_cursor: str | None = None
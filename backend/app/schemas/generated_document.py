@@ -27,3 +27,26 @@ class GeneratedDocumentRead(BaseModel):
 class GeneratedDocumentList(BaseModel):
     items: list[GeneratedDocumentRead]
     total: int
+
+class PurgeLaunchResponse(BaseModel):
+    job_id: str
+    status: str
+    report_job_id: int
+    dry_run: bool
+    cursor: str | None = None  # point de reprise (None: depuis le début)
+
+class PurgeProgress(BaseModel):
+    scanned: int = 0
+    orphans: int = 0
+    removed: int = 0
+    recent: int = 0
+    errors: int = 0
+    cursor: str | None = None
+    sample: list[str] = []
+
+class PurgeStatusResponse(BaseModel):
+    report_job_id: int
+    status: str | None = None
+    dry_run: bool
+    progress: PurgeProgress
+    error: str | None = None
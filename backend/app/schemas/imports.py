@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class ImportLaunchResponse(BaseModel):
+    job_id: str
+    status: str
+    report_job_id: int
+    kind: str
+
+
+class ImportProgress(BaseModel):
+    processed: int = 0
+    inserted: int = 0
+    error_count: int = 0
+
+
+class ImportStatusResponse(BaseModel):
+    report_job_id: int
+    kind: str
+    status: str | None = None
+    progress: ImportProgress
+    errors: list[dict[str, Any]] = []
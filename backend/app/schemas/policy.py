@@ -30,3 +30,8 @@ class PolicyRead(PolicyBase):
     id: int
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
+
+class PolicyList(BaseModel):
+    """Page de polices (pagination par curseur)."""
+    items: list[PolicyRead]
+    next_cursor: str | None = None
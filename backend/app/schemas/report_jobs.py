@@ -1,15 +1,45 @@
 from __future__ import annotations
 
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel, Field
 
 
 class ReportJobLaunchResponse(BaseModel):
     job_id: str
     status: str
     report_job_id: int
+    queue: str | None = None  # voie retenue (reports_high, reports, reports_low)
+    deduplicated: bool = False  # rattaché à un job identique en cours ou récent
+    document_id: int | None = None  # document du job identique déjà terminé
 
 
 class ReportJobStatusResponse(BaseModel):
     job_id: str
     status: str
     report_job_id: int | None = None
+    progress: float | None = None  # 0-100, publié par la tâche (état PROGRESS)
+    estimated_completion: datetime | None = None
+    result: dict[str, Any] | None = None
+    error: str | None = None
+
+
+# Taille maximale d'un lot de POST /reports/jobs/status
+BULK_STATUS_MAX_IDS = 500
+
+
+class ReportJobBulkStatusRequest(BaseModel):
+    job_ids: list[str] = Field(..., min_length=1, max_length=BULK_STATUS_MAX_IDS)
+
+
+class ReportJobStatusEntry(BaseModel):
+    status: str
+    report_job_id: int | None = None
+    progress: float | None = None
+    error: str | None = None
+
+
+class ReportJobBulkStatusResponse(BaseModel):
+    jobs: dict[str, ReportJobStatusEntry]  # job_id (id de tâche Celery) -> statut
+
@@ -0,0 +1,16 @@
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict
+
+
+class SearchHitRead(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    type: Literal["client", "policy"]
+    id: int
+    label: str
+    rank: float
+
+class SearchResults(BaseModel):
+    items: list[SearchHitRead]
+    skip: int
+    limit: int
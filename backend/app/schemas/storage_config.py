@@ -13,6 +13,7 @@ class StorageConfigRead(BaseModel):
     s3_bucket: Optional[str] = Field(None, max_length=255)
     s3_region: Optional[str] = Field(None, max_length=50)
     s3_endpoint_url: Optional[str] = Field(None, max_length=255)
+    version: int = 1
     updated_at: datetime
 
 
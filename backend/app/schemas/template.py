@@ -26,6 +26,7 @@ class TemplateRead(TemplateBase):
     model_config = ConfigDict(from_attributes=True)
     id: int
     created_by: Optional[int] = None
+    latest_version: int = 0
     created_at: datetime
 
 class TemplateVersionBase(BaseModel):
@@ -47,5 +48,17 @@ class TemplateVersionRead(TemplateVersionBase):
 class TemplateWithVersions(TemplateRead):
     versions: list[TemplateVersionRead] = []
 
+class TemplateRenderProfile(BaseModel):
+    """Coût cumulé des rendus d'une version (générations de documents)."""
+    template_id: int
+    version: int
+    renders: int = 0
+    seconds_total: float = 0.0
+    seconds_max: float = 0.0
+    seconds_avg: float = 0.0
+    bytes_total: int = 0
+    bytes_max: int = 0
+    bytes_avg: float = 0.0
+
 # Note: la prévisualisation renvoie pour l'instant une HTMLResponse directe via route
 # Si besoin d'une API JSON à l'avenir, on pourra définir un schéma Preview ici.
@@ -4,8 +4,16 @@ Ce package contient des modules typés utilisés par mypy.
 """
 
 __all__ = [
+    "analytics",
     "document_renderer",
+    "document_storage",
     "gdrive_backend",
+    "portfolio_summary",
+    "report_dedup",
+    "report_engine",
     "storage_provider",
+    "template_profile",
     "template_storage",
+    "template_versions",
+    "template_warmup",
 ]
@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+"""Agrégations vectorisées du portefeuille (API /analytics, rapports lourds).
+
+Les colonnes utiles des polices sont lues en bloc (une requête Core, lots fetchmany) dans un
+PolicyFrame de tableaux NumPy: aucune entité ORM ni boucle Python par police pour les
+calculs. Les dates sont converties en secondes epoch par la base (extract / strftime), les
+chaînes nulles remplacées par des valeurs par défaut dans la requête.
+
+Calculs (tous par devise, les montants de devises différentes n'étant jamais additionnés):
+ - group_totals: nombre de polices et primes par clé (compagnie, statut, devise, mois
+   d'effet, agent = propriétaire du client) via np.unique + np.bincount
+ - premium_percentiles: percentiles des primes
+ - expiry_pipeline: échéancier des expirations (np.digitize sur les jours restants)
+ - portfolio_totals: agrégat au format PortfolioAggregate.as_dict (services.report_engine)
+
+NumPy est optionnel: sans lui, NUMPY_AVAILABLE est faux (l'API répond 503 et les rapports
+agrègent en flux ligne à ligne).
+"""
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import BigInteger, ColumnElement, Integer, cast, func, select
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.db import models
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    np = None  # type: ignore[assignment]
+    NUMPY_AVAILABLE = False
+
+GROUP_KEYS = ("company", "status", "currency", "month", "agent")
+EXPIRY_BINS = (0, 31, 61, 91)  # jours restants: < 0, 0-30, 31-60, 61-90, > 90
+EXPIRY_LABELS = ("expired", "0-30", "31-60", "61-90", ">90")
+DAY = 86400
+
+
+@dataclass
+class PolicyFrame:
+    """Colonnes des polices (une entrée par police)."""
+
+    company: Any  # str (nom, "" sans compagnie)
+    company_id: Any  # int64 (-1 sans compagnie)
+    agent: Any  # int64 (owner_id du client, -1 sans propriétaire)
+    status: Any  # str
+    currency: Any  # str
+    premium: Any  # int64
+    effective: Any  # float64 epoch (NaN si absente)
+    expiry: Any  # float64 epoch (NaN si absente)
+
+    def __len__(self) -> int:
+        return len(self.premium)
+
+
+def _epoch(db: Session, column: Any) -> ColumnElement[Any]:
+    if db.get_bind().dialect.name == "sqlite":
+        return cast(func.strftime("%s", column), Integer)
+    return cast(func.extract("epoch", column), BigInteger)
+
+
+def load_policy_frame(db: Session, criteria: Sequence[ColumnElement[bool]] = (), progress: Callable[[float], None] | None = None) -> PolicyFrame:
+    """Charge les polices filtrées (criteria: conditions sur Policy / Client) en colonnes."""
+    stmt = (
+        select(
+            func.coalesce(models.Company.name, ""),
+            func.coalesce(models.Policy.company_id, -1),
+            func.coalesce(models.Client.owner_id, -1),
+            func.coalesce(models.Policy.status, "unknown"),
+            func.coalesce(models.Policy.currency, "XAF"),
+            func.coalesce(models.Policy.premium_amount, 0),
+            _epoch(db, models.Policy.effective_date),
+            _epoch(db, models.Policy.expiry_date),
+        )
+        .join(models.Client, models.Client.id == models.Policy.client_id)
+        .outerjoin(models.Company, models.Company.id == models.Policy.company_id)
+        .where(*criteria)
+    )
+    total = db.execute(select(func.count()).select_from(stmt.subquery())).scalar_one() if progress else 0
+    columns: list[list[Any]] = [[] for _ in range(8)]
+    loaded = 0
+    result = db.execute(stmt.execution_options(yield_per=get_settings().report_stream_batch))
+    for rows in result.partitions():
+        # Transposition par lot: une seule passe Python, les calculs restent vectorisés
+        for target, values in zip(columns, zip(*rows)):
+            target.extend(values)
+        loaded += len(rows)
+        if progress and total:
+            progress(loaded / total)
+    return PolicyFrame(
+        company=np.array(columns[0], dtype=object),
+        company_id=np.array(columns[1], dtype=np.int64),
+        agent=np.array(columns[2], dtype=np.int64),
+        status=np.array(columns[3], dtype=object),
+        currency=np.array(columns[4], dtype=object),
+        premium=np.array(columns[5], dtype=np.int64),
+        effective=np.array(columns[6], dtype=np.float64),
+        expiry=np.array(columns[7], dtype=np.float64),
+    )
+
+
+def month_keys(epochs: Any) -> Any:
+    """Mois (AAAA-MM) de dates epoch valides."""
+    return np.datetime_as_string(epochs.astype(np.int64).astype("datetime64[s]").astype("datetime64[M]"), unit="M")
+
+
+def _group_keys(frame: PolicyFrame, by: str) -> tuple[Any, Any]:
+    """(clés, masque des polices retenues) pour un regroupement."""
+    everything = np.ones(len(frame), dtype=bool)
+    if by == "company":
+        return frame.company_id, everything
+    if by == "agent":
+        return frame.agent, everything
+    if by == "status":
+        return frame.status, everything
+    if by == "currency":
+        return frame.currency, everything
+    if by == "month":
+        valid = ~np.isnan(frame.effective)
+        return month_keys(frame.effective[valid]), valid
+    raise ValueError(f"Regroupement non supporté: {by}")
+
+
+def _sum_by(keys: Any, currencies: Any, premium: Any) -> tuple[Any, Any, Any, Any]:
+    """Clés uniques, devises uniques, nombre de polices par (clé, devise), primes par (clé, devise)."""
+    ukeys, kidx = np.unique(keys, return_inverse=True)
+    ucur, cidx = np.unique(currencies, return_inverse=True)
+    flat = kidx * len(ucur) + cidx
+    size = len(ukeys) * len(ucur)
+    counts = np.bincount(flat, minlength=size).reshape(len(ukeys), len(ucur))
+    # Somme en float64: exacte tant que le total reste < 2**53
+    sums = np.rint(np.bincount(flat, weights=premium, minlength=size)).astype(np.int64).reshape(len(ukeys), len(ucur))
+    return ukeys, ucur, counts, sums
+
+
+def group_totals(frame: PolicyFrame, by: str) -> list[dict[str, Any]]:
+    """[{key, currency, policies, premium_total}] trié par clé puis devise."""
+    if not len(frame):
+        return []
+    keys, mask = _group_keys(frame, by)
+    ukeys, ucur, counts, sums = _sum_by(keys, frame.currency[mask], frame.premium[mask])
+    labels: dict[int, str] = {}
+    if by == "company":
+        ids, first = np.unique(frame.company_id, return_index=True)
+        labels = {int(i): str(frame.company[f]) for i, f in zip(ids, first) if i >= 0}
+    rows = []
+    for i, j in zip(*np.nonzero(counts)):
+        key = ukeys[i].item() if hasattr(ukeys[i], "item") else ukeys[i]
+        row = {"key": key, "currency": str(ucur[j]), "policies": int(counts[i, j]), "premium_total": int(sums[i, j])}
+        if by == "company":
+            row["label"] = labels.get(key)
+        rows.append(row)
+    return rows
+
+
+def premium_percentiles(frame: PolicyFrame, quantiles: Sequence[float]) -> dict[str, dict[str, float]]:
+    """{devise: {"p50": ..., ...}} (interpolation linéaire)."""
+    out: dict[str, dict[str, float]] = {}
+    for currency in np.unique(frame.currency) if len(frame) else ():
+        values = np.percentile(frame.premium[frame.currency == currency], list(quantiles))
+        out[str(currency)] = {f"p{q:g}": float(v) for q, v in zip(quantiles, values)}
+    return out
+
+
+def expiry_buckets(frame: PolicyFrame, now: datetime) -> tuple[Any, Any]:
+    """(indice de tranche d'échéance, masque des polices ayant une date d'expiration)."""
+    valid = ~np.isnan(frame.expiry)
+    days = np.floor((frame.expiry[valid] - now.timestamp()) / DAY)
+    return np.digitize(days, EXPIRY_BINS), valid
+
+
+def expiry_pipeline(frame: PolicyFrame, now: datetime) -> list[dict[str, Any]]:
+    """[{bucket, currency, policies, premium_total}] dans l'ordre des tranches."""
+    if not len(frame):
+        return []
+    buckets, valid = expiry_buckets(frame, now)
+    ukeys, ucur, counts, sums = _sum_by(buckets, frame.currency[valid], frame.premium[valid])
+    return [
+        {"bucket": EXPIRY_LABELS[int(ukeys[i])], "currency": str(ucur[j]), "policies": int(counts[i, j]), "premium_total": int(sums[i, j])}
+        for i, j in zip(*np.nonzero(counts))
+    ]
+
+
+def _nested(keys: Any, currencies: Any, premium: Any) -> tuple[dict[Any, int], dict[Any, dict[str, int]]]:
+    ukeys, ucur, counts, sums = _sum_by(keys, currencies, premium)
+    policies: dict[Any, int] = {}
+    totals: dict[Any, dict[str, int]] = {}
+    for i, j in zip(*np.nonzero(counts)):
+        key = ukeys[i].item() if hasattr(ukeys[i], "item") else ukeys[i]
+        policies[key] = policies.get(key, 0) + int(counts[i, j])
+        totals.setdefault(key, {})[str(ucur[j])] = int(sums[i, j])
+    return policies, totals
+
+
+def portfolio_totals(frame: PolicyFrame, now: datetime, no_company: str) -> dict[str, Any]:
+    """Agrégat des polices au format PortfolioAggregate.as_dict (sans déclarations)."""
+    data: dict[str, Any] = {
+        "policies": len(frame), "declaration_items": 0, "premium_by_currency": {}, "policies_by_status": {},
+        "companies": {}, "expiries": {}, "monthly": {},
+    }
+    if not len(frame):
+        return data
+    _, by_currency = _nested(np.zeros(len(frame), dtype=np.int64), frame.currency, frame.premium)
+    data["premium_by_currency"] = by_currency.get(0, {})
+    data["policies_by_status"] = {str(k): v for k, v in _nested(frame.status, frame.currency, frame.premium)[0].items()}
+    counts, totals = _nested(frame.company, frame.currency, frame.premium)
+    data["companies"] = {
+        (name or no_company): {"policies": counts[name], "premium": totals[name], "declared_premium": 0, "commission": 0}
+        for name in counts
+    }
+    buckets, valid = expiry_buckets(frame, now)
+    counts, totals = _nested(buckets, frame.currency[valid], frame.premium[valid])
+    data["expiries"] = {EXPIRY_LABELS[int(b)]: {"policies": counts[b], "premium": totals[b]} for b in counts}
+    valid = ~np.isnan(frame.effective)
+    _, totals = _nested(month_keys(frame.effective[valid]), frame.currency[valid], frame.premium[valid])
+    data["monthly"] = {str(month): t for month, t in totals.items()}
+    return data
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+"""Variante asynchrone du protocole de stockage (astore_bytes / astore_stream / aread_text / astream).
+
+Les routes async attendent le stockage sans monopoliser un thread du pool pendant toute
+la durée d'un transfert:
+ - local: aiofiles (voir template_storage.astore_template_stream & co)
+ - S3: client aiobotocore (E/S réseau sur la boucle d'événements)
+ - autres backends (Google Drive): ThreadedAsyncStorage, repli sur asyncio.to_thread
+"""
+import asyncio
+import tempfile
+from collections.abc import AsyncIterator
+
+from backend.app.services.template_storage import STREAM_CHUNK_SIZE, StoredObject
+
+# Au-delà, le tampon de repli bascule sur disque
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+async def aiter_bytes(data: bytes, size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class ThreadedAsyncStorage:
+    """Implémentation asynchrone par défaut: méthodes synchrones exécutées via asyncio.to_thread.
+
+    Le flux entrant d'astore_stream est d'abord recopié (sans thread) dans un tampon borné.
+    """
+
+    async def astore_bytes(self, data: bytes, filename: str | None = None, content_type: str | None = None) -> str:
+        path: str = await asyncio.to_thread(self.store_bytes, data, filename, content_type)  # type: ignore[attr-defined]
+        return path
+
+    async def astore_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str | None = None,
+        content_type: str | None = None,
+        expected_sha256: str | None = None,
+    ) -> StoredObject:
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+            async for chunk in chunks:
+                spool.write(chunk)
+            spool.seek(0)
+            stored: StoredObject = await asyncio.to_thread(
+                self.store_stream, spool, filename, content_type, expected_sha256  # type: ignore[attr-defined]
+            )
+        return stored
+
+    async def aread_text(self, path: str) -> str:
+        text: str = await asyncio.to_thread(self.read_text, path)  # type: ignore[attr-defined]
+        return text
+
+    async def astream(self, path: str) -> AsyncIterator[bytes]:
+        yield (await self.aread_text(path)).encode("utf-8")
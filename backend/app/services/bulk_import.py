@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+"""Import en masse de clients / polices depuis un fichier CSV ou XLSX.
+
+Pipeline (exécuté par la tâche Celery import_tasks.import_portfolio):
+ - lecture en flux (csv.DictReader / openpyxl read_only) par lots de import_batch_size lignes
+ - validation Pydantic ligne à ligne, puis contrôles ensemblistes par lot:
+   un seul SELECT ... IN (...) pour les doublons de policy_number, les clients possédés
+   et les compagnies existantes (au lieu de 3 requêtes par ligne)
+ - insertion du lot via INSERT executemany (insertmanyvalues SQLAlchemy 2); pour les polices,
+   tables de synthèse du portefeuille mises à jour dans la transaction du lot
+ - rapport d'erreurs par ligne (numéro de ligne du fichier + message)
+"""
+import csv
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Any
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from backend.app.db import models
+from backend.app.schemas.client import ClientCreate
+from backend.app.schemas.policy import PolicyCreate
+from backend.app.services import portfolio_summary
+
+IMPORTS_DIR = Path("imports_store")
+IMPORTS_DIR.mkdir(exist_ok=True)
+
+ALLOWED_EXTENSIONS = {".csv", ".xlsx"}
+IMPORT_KINDS = {"clients", "policies"}
+MAX_REPORTED_ERRORS = 1000  # au-delà, seules les erreurs sont comptées
+
+Prepared = list[tuple[int, dict[str, Any]]]  # (numéro de ligne, données)
+
+
+@dataclass
+class ImportStats:
+    processed: int = 0
+    inserted: int = 0
+    error_count: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+    def add_error(self, line: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self) -> dict[str, Any]:
+        return {"processed": self.processed, "inserted": self.inserted, "error_count": self.error_count}
+
+
+def _clean(row: dict[Any, Any]) -> dict[str, Any]:
+    """Normalise une ligne: en-têtes en minuscules, chaînes vides -> None."""
+    out: dict[str, Any] = {}
+    for k, v in row.items():
+        if k is None:
+            continue
+        if isinstance(v, str):
+            v = v.strip() or None
+        out[str(k).strip().lower()] = v
+    return out
+
+
+def iter_rows(path: Path) -> Iterator[tuple[int, dict[str, Any]]]:
+    """Itère (numéro de ligne, données) sans charger le fichier en mémoire.
+
+    Le numéro de ligne correspond à la ligne du fichier (en-tête = ligne 1).
+    """
+    if path.suffix.lower() == ".xlsx":
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            ws = wb.active
+            assert ws is not None
+            rows = ws.iter_rows(values_only=True)
+            header: list[Any] = [str(h) if h is not None else None for h in next(rows, ())]
+            for line, values in enumerate(rows, start=2):
+                if all(v is None for v in values):
+                    continue
+                yield line, _clean(dict(zip(header, values, strict=False)))
+        finally:
+            wb.close()
+        return
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        reader = csv.DictReader(fh)
+        for line, raw in enumerate(reader, start=2):
+            yield line, _clean(raw)
+
+
+def _batches(rows: Iterator[tuple[int, dict[str, Any]]], size: int) -> Iterator[Prepared]:
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc']) or 'row'}: {e['msg']}" for e in exc.errors())
+
+
+def _prepare_clients(owner_id: int, batch: Prepared, stats: ImportStats) -> Prepared:
+    valid: Prepared = []
+    for line, row in batch:
+        try:
+            data = ClientCreate.model_validate(row).model_dump()
+        except ValidationError as exc:
+            stats.add_error(line, _validation_message(exc))
+            continue
+        data["owner_id"] = owner_id
+        valid.append((line, data))
+    return valid
+
+
+def _prepare_policies(db: Session, owner_id: int, batch: Prepared, stats: ImportStats, seen_numbers: set[str]) -> Prepared:
+    parsed: Prepared = []
+    for line, row in batch:
+        try:
+            parsed.append((line, PolicyCreate.model_validate(row).model_dump()))
+        except ValidationError as exc:
+            stats.add_error(line, _validation_message(exc))
+    if not parsed:
+        return []
+    numbers = {d["policy_number"] for _, d in parsed}
+    client_ids = {d["client_id"] for _, d in parsed}
+    company_ids = {d["company_id"] for _, d in parsed if d["company_id"] is not None}
+    # Contrôles ensemblistes: une requête par type de vérification et par lot
+    existing_numbers = set(db.scalars(select(models.Policy.policy_number).where(models.Policy.policy_number.in_(numbers))))
+    owned_clients = set(db.scalars(select(models.Client.id).where(models.Client.id.in_(client_ids), models.Client.owner_id == owner_id)))
+    known_companies = set(db.scalars(select(models.Company.id).where(models.Company.id.in_(company_ids)))) if company_ids else set()
+    valid: Prepared = []
+    for line, data in parsed:
+        number = data["policy_number"]
+        if number in existing_numbers:
+            stats.add_error(line, f"Numéro de police déjà existant: {number}")
+        elif number in seen_numbers:
+            stats.add_error(line, f"Numéro de police en double dans le fichier: {number}")
+        elif data["client_id"] not in owned_clients:
+            stats.add_error(line, f"Client introuvable: {data['client_id']}")
+        elif data["company_id"] is not None and data["company_id"] not in known_companies:
+            stats.add_error(line, f"Company introuvable: {data['company_id']}")
+        else:
+            seen_numbers.add(number)
+            valid.append((line, data))
+    return valid
+
+
+def run_import(
+    db: Session,
+    kind: str,
+    path: Path,
+    owner_id: int,
+    batch_size: int = 1000,
+    on_progress: Callable[[ImportStats], None] | None = None,
+) -> ImportStats:
+    """Importe le fichier lot par lot; chaque lot est commité indépendamment.
+
+    Un lot rejeté à l'insertion (contrainte violée entre validation et INSERT) est
+    annulé et ses lignes valides sont comptées en erreur; les lots précédents restent
+    acquis (import reprenable en corrigeant le fichier).
+    """
+    if kind not in IMPORT_KINDS:
+        raise ValueError(f"Type d'import non supporté: {kind}")
+    model: type[models.Client] | type[models.Policy] = models.Client if kind == "clients" else models.Policy
+    stats = ImportStats()
+    seen_numbers: set[str] = set()
+    for batch in _batches(iter_rows(path), batch_size):
+        if kind == "clients":
+            valid = _prepare_clients(owner_id, batch, stats)
+        else:
+            valid = _prepare_policies(db, owner_id, batch, stats, seen_numbers)
+        if valid:
+            try:
+                db.execute(insert(model), [data for _, data in valid])
+                if kind == "policies":
+                    portfolio_summary.apply_delta(db, added=[
+                        portfolio_summary.contribution(owner_id, data["company_id"], None, None, data["premium_amount"], data["expiry_date"])
+                        for _, data in valid
+                    ])
+                db.commit()
+                stats.inserted += len(valid)
+            except SQLAlchemyError as exc:
+                db.rollback()
+                for line, _ in valid:
+                    stats.add_error(line, f"Lot rejeté: {exc.__class__.__name__}")
+        stats.processed += len(batch)
+        if on_progress:
+            on_progress(stats)
+    return stats
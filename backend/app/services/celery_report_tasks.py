@@ -6,13 +6,25 @@ des tâches asynchrones et des rapports lourds.
 from __future__ import annotations
 
 from datetime import UTC, datetime
-from typing import Any
+from typing import Any, cast
 
-from celery import Task
+from celery import Task, chord
+from celery.exceptions import Ignore
 
 from backend.app.core.celery_app import celery_app
+from backend.app.core.config import get_settings
+from backend.app.core.redis import get_redis
 from backend.app.db import models
-from backend.app.db.session import SessionLocal
+from backend.app.db.session import SessionLocal, worker_session
+from backend.app.services.job_events import progress_event, publish_job_event
+from backend.app.services.job_status_buffer import flush_all, record_transition
+from backend.app.services.report_engine import (
+    PortfolioAggregate,
+    aggregate_chunk,
+    generate_report,
+    plan_chunks,
+)
+from backend.app.services.report_scheduling import QUICK_QUEUE, task_queue
 
 try:  # pragma: no cover
     from prometheus_client import Counter, Gauge, Histogram
@@ -44,28 +56,33 @@ except Exception:  # pragma: no cover
 
 
 def update_job_status(job_id: int, status: str, result: dict[str, Any] | None = None) -> None:
-    """Met à jour le statut d'un job dans la base de données."""
-    db = SessionLocal()
-    try:
-        job = db.query(models.ReportJob).filter(models.ReportJob.id == job_id).first()
-        if job:
-            job.status = status
-            if status == "started":
-                job.started_at = datetime.now(UTC)
-            elif status in ["completed", "failed"]:
-                job.finished_at = datetime.now(UTC)
-                if result:
-                    job.params = {**(job.params or {}), "result": result}
-            db.commit()
-    finally:
-        db.close()
+    """Met à jour le statut d'un job (UPDATE unique, éventuellement regroupé, voir services.job_status_buffer)."""
+    record_transition(worker_session(), job_id, status, result)
+
+
+def publish_status(task: Task, event: dict[str, Any]) -> None:
+    """Publie un événement de job (état Celery PROGRESS + pub/sub Redis, voir services.job_events)."""
+    task_id = task.request.id
+    if not task_id:
+        return  # appel direct (.run), hors Celery
+    if event["status"] == "progress":
+        task.update_state(state="PROGRESS", meta=event)
+    publish_job_event(task_id, event)
+
+
+def _sleep_with_progress(task: Task, seconds: float, start_time: datetime, steps: int) -> None:
+    """Traitement simulé découpé en étapes, chacune publiant sa progression."""
+    import time
+    for i in range(steps):
+        time.sleep(seconds / steps)
+        publish_status(task, progress_event((i + 1) * 100 / steps, start_time, datetime.now(UTC)))
 
 
 @celery_app.task(bind=True, queue="reports", max_retries=3, default_retry_delay=60)
 def generate_dummy_report(self: Task, report_id: str, job_id: int | None = None) -> dict[str, Any]:
     """Génération d'un rapport factice (pour démonstration et tests)."""
     job_type = "dummy"
-    queue_name = "reports"
+    queue_name = task_queue(self, QUICK_QUEUE)
     
     # Métriques début
     if REPORT_JOBS_ACTIVE:
@@ -77,10 +94,10 @@ def generate_dummy_report(self: Task, report_id: str, job_id: int | None = None)
         # Mise à jour statut démarrage
         if job_id:
             update_job_status(job_id, "started")
+        publish_status(self, {"status": "started", "progress": 0})
         
-        # Simulation d'un traitement plus long pour tester la queue
-        import time
-        time.sleep(2)  # 2 secondes de traitement
+        # Simulation d'un traitement plus long pour tester la queue (2 secondes)
+        _sleep_with_progress(self, 2, start_time, steps=2)
         
         # Génération du rapport
         result = {
@@ -95,6 +112,7 @@ def generate_dummy_report(self: Task, report_id: str, job_id: int | None = None)
         # Mise à jour statut succès
         if job_id:
             update_job_status(job_id, "completed", result)
+        publish_status(self, {"status": "completed", "progress": 100, "result": result})
         
         # Métriques succès
         if REPORT_JOBS_TOTAL:
@@ -114,6 +132,7 @@ def generate_dummy_report(self: Task, report_id: str, job_id: int | None = None)
             # Mise à jour statut retry
             if job_id:
                 update_job_status(job_id, f"retry_{self.request.retries + 1}")
+            publish_status(self, {"status": "retry", "error": str(exc)})
             
             # Retry avec backoff exponentiel
             retry_delay = 60 * (2 ** self.request.retries)
@@ -131,6 +150,7 @@ def generate_dummy_report(self: Task, report_id: str, job_id: int | None = None)
         
         if job_id:
             update_job_status(job_id, "failed", error_result)
+        publish_status(self, {"status": "failed", "error": str(exc)})
         
         if REPORT_JOBS_TOTAL:
             REPORT_JOBS_TOTAL.labels(job_type, "error", queue_name).inc()
@@ -147,7 +167,7 @@ def generate_dummy_report(self: Task, report_id: str, job_id: int | None = None)
 def generate_heavy_report(self: Task, report_type: str, params: dict[str, Any], job_id: int | None = None) -> dict[str, Any]:
     """Génération d'un rapport lourd (PDF, Excel avec beaucoup de données)."""
     job_type = "heavy"
-    queue_name = "reports"
+    queue_name = task_queue(self)  # voie retenue au lancement (services.report_scheduling)
     
     if REPORT_JOBS_ACTIVE:
         REPORT_JOBS_ACTIVE.labels(job_type, queue_name).inc()
@@ -157,21 +177,20 @@ def generate_heavy_report(self: Task, report_type: str, params: dict[str, Any],
     try:
         if job_id:
             update_job_status(job_id, "started")
+        publish_status(self, {"status": "started", "progress": 0})
         
-        # Simulation traitement lourd (10-30 secondes)
-        import time
-        processing_time = params.get("processing_time", 10)
-        time.sleep(processing_time)
-        
-        # Génération du rapport selon le type
-        if report_type == "pdf":
-            result = _generate_pdf_report(params)
-        elif report_type == "excel":
-            result = _generate_excel_report(params)
-        elif report_type == "analysis":
-            result = _generate_analysis_report(params)
-        else:
-            raise ValueError(f"Type de rapport non supporté: {report_type}")
+        # Gros volume: agrégation répartie en sous-tâches (chord); la tâche de réduction reprend
+        # l'id de cette tâche (statut, événements et résultat restent attachés au job)
+        chunks = plan_chunks(worker_session(), params, get_settings().report_chunk_size)
+        if chunks:
+            publish_status(self, {"status": "progress", "progress": 0, "chunks": len(chunks)})
+            return cast(dict[str, Any], self.replace(chunked_report(self.request.id, report_type, params, job_id, chunks, start_time, queue_name)))
+
+        # Agrégation en flux (progression publiée par lot), rendu, stockage (services.report_engine)
+        def _progress(fraction: float) -> None:
+            publish_status(self, progress_event(fraction * 90, start_time, datetime.now(UTC)))
+
+        result = generate_report(worker_session(), report_type, params, progress=_progress)
         
         result.update({
             "task_id": self.request.id,
@@ -182,6 +201,7 @@ def generate_heavy_report(self: Task, report_type: str, params: dict[str, Any],
         
         if job_id:
             update_job_status(job_id, "completed", result)
+        publish_status(self, {"status": "completed", "progress": 100, "result": result})
         
         if REPORT_JOBS_TOTAL:
             REPORT_JOBS_TOTAL.labels(job_type, "success", queue_name).inc()
@@ -191,6 +211,8 @@ def generate_heavy_report(self: Task, report_type: str, params: dict[str, Any],
         
         return result
         
+    except Ignore:
+        raise  # remplacée par le chord des morceaux
     except Exception as exc:
         if self.request.retries < self.max_retries:
             if REPORT_JOBS_RETRIES:
@@ -198,6 +220,7 @@ def generate_heavy_report(self: Task, report_type: str, params: dict[str, Any],
             
             if job_id:
                 update_job_status(job_id, f"retry_{self.request.retries + 1}")
+            publish_status(self, {"status": "retry", "error": str(exc)})
             
             retry_delay = 120 * (2 ** self.request.retries)
             raise self.retry(exc=exc, countdown=retry_delay)
@@ -213,6 +236,7 @@ def generate_heavy_report(self: Task, report_type: str, params: dict[str, Any],
         
         if job_id:
             update_job_status(job_id, "failed", error_result)
+        publish_status(self, {"status": "failed", "error": str(exc)})
         
         if REPORT_JOBS_TOTAL:
             REPORT_JOBS_TOTAL.labels(job_type, "error", queue_name).inc()
@@ -224,39 +248,87 @@ def generate_heavy_report(self: Task, report_type: str, params: dict[str, Any],
             REPORT_JOBS_ACTIVE.labels(job_type, queue_name).dec()
 
 
-def _generate_pdf_report(params: dict[str, Any]) -> dict[str, Any]:
-    """Génère un rapport PDF."""
-    return {
-        "type": "pdf",
-        "filename": f"report_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}.pdf",
-        "size_bytes": 1024 * 512,  # 512KB simulé
-        "pages": params.get("pages", 10),
-        "status": "success"
-    }
+def chunked_report(task_id: str, report_type: str, params: dict[str, Any], job_id: int | None,
+                   chunks: list[dict[str, Any]], start_time: datetime, queue: str = "reports") -> Any:
+    """Chord map / reduce: un agrégat partiel par morceau, fusionnés par finalize_chunked_report.
 
+    Les sous-tâches restent dans la voie du job (queue).
+    """
+    started_at = start_time.isoformat()
+    header = [aggregate_report_chunk.s(params, chunk, task_id, len(chunks), started_at).set(queue=queue) for chunk in chunks]
+    body = (
+        finalize_chunked_report.s(report_type, params, job_id, started_at).set(queue=queue)
+        .on_error(chunked_report_failed.s(job_id=job_id, queue=queue).set(queue=queue))
+    )
+    return chord(header, body)
 
-def _generate_excel_report(params: dict[str, Any]) -> dict[str, Any]:
-    """Génère un rapport Excel."""
-    return {
-        "type": "excel",
-        "filename": f"report_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}.xlsx",
-        "size_bytes": 1024 * 256,  # 256KB simulé
-        "sheets": params.get("sheets", 3),
-        "rows": params.get("rows", 1000),
-        "status": "success"
-    }
 
+def _chunk_done(task_id: str, total: int, started_at: str) -> None:
+    """Compte les morceaux terminés (Redis) et publie la progression du job."""
+    try:
+        key = f"report_chunks:{task_id}"
+        pipe = get_redis().pipeline()
+        pipe.incr(key)
+        pipe.expire(key, 24 * 3600)
+        done = pipe.execute()[0]
+    except Exception:
+        return
+    publish_job_event(task_id, progress_event(min(done, total) * 90 / total, datetime.fromisoformat(started_at), datetime.now(UTC)))
+
+
+@celery_app.task(
+    bind=True, queue="reports", autoretry_for=(Exception,), retry_backoff=True, retry_backoff_max=300,
+    max_retries=get_settings().report_chunk_max_retries,
+)
+def aggregate_report_chunk(self: Task, params: dict[str, Any], chunk: dict[str, Any], task_id: str | None = None,
+                           total_chunks: int = 1, started_at: str | None = None) -> dict[str, Any]:
+    """Map: agrégat partiel d'un morceau (réessayé seul en cas d'échec)."""
+    partial = aggregate_chunk(worker_session(), params, chunk).as_dict()
+    if task_id and started_at:
+        _chunk_done(task_id, total_chunks, started_at)
+    return partial
+
+
+@celery_app.task(bind=True, queue="reports")
+def finalize_chunked_report(self: Task, partials: list[dict[str, Any]], report_type: str, params: dict[str, Any],
+                            job_id: int | None = None, started_at: str | None = None) -> dict[str, Any]:
+    """Reduce: fusion des agrégats partiels, rendu et stockage (s'exécute sous l'id de la tâche initiale)."""
+    queue_name = task_queue(self)
+    start_time = datetime.fromisoformat(started_at) if started_at else datetime.now(UTC)
+    map_seconds = (datetime.now(UTC) - start_time).total_seconds()
+    # Un échec ici comme dans un morceau est traité par chunked_report_failed (on_error)
+    aggregate = PortfolioAggregate()
+    for partial in partials:
+        aggregate.merge(PortfolioAggregate.from_dict(partial))
+    result = generate_report(worker_session(), report_type, params, aggregate=aggregate)
+    result["timings"]["aggregate_seconds"] = round(map_seconds, 4)
+    result.update({
+        "task_id": self.request.id,
+        "generated_at": start_time.isoformat(),
+        "processing_time_seconds": (datetime.now(UTC) - start_time).total_seconds(),
+        "queue": queue_name,
+        "chunks": len(partials),
+    })
+    if job_id:
+        update_job_status(job_id, "completed", result)
+    publish_status(self, {"status": "completed", "progress": 100, "result": result})
+    if REPORT_JOBS_TOTAL:
+        REPORT_JOBS_TOTAL.labels("heavy", "success", queue_name).inc()
+    if REPORT_JOBS_DURATION:
+        REPORT_JOBS_DURATION.labels("heavy", queue_name).observe(result["processing_time_seconds"])
+    return result
 
-def _generate_analysis_report(params: dict[str, Any]) -> dict[str, Any]:
-    """Génère un rapport d'analyse avancée."""
-    return {
-        "type": "analysis",
-        "filename": f"analysis_{datetime.now(UTC).strftime('%Y%m%d_%H%M%S')}.pdf",
-        "size_bytes": 1024 * 1024 * 2,  # 2MB simulé
-        "charts": params.get("charts", 5),
-        "data_points": params.get("data_points", 10000),
-        "status": "success"
-    }
+
+@celery_app.task(queue="reports")
+def chunked_report_failed(request: Any, exc: Exception, traceback: Any, job_id: int | None = None, queue: str = "reports") -> None:
+    """Morceau ayant épuisé ses essais ou réduction en échec: job marqué en échec (request: tâche de réduction)."""
+    task_id = getattr(request, "id", None)
+    if job_id:
+        update_job_status(job_id, "failed", {"error": str(exc), "task_id": task_id, "status": "failed", "queue": queue})
+    if task_id:
+        publish_job_event(task_id, {"status": "failed", "error": str(exc)})
+    if REPORT_JOBS_TOTAL:
+        REPORT_JOBS_TOTAL.labels("heavy", "error", queue).inc()
 
 
 # Tâches de maintenance pour nettoyer les anciens jobs
@@ -287,6 +359,12 @@ def cleanup_old_report_jobs() -> dict[str, Any]:
         db.close()
 
 
+@celery_app.task(queue="celery")
+def flush_job_status_buffer() -> dict[str, Any]:
+    """Écrit les transitions de statut regroupées dans Redis (JOB_STATUS_COALESCE)."""
+    return {"flushed_jobs": flush_all(worker_session())}
+
+
 # Migration de l'ancienne interface RQ vers Celery
 class CeleryTaskWrapper:
     """Wrapper pour maintenir la compatibilité avec l'ancienne interface RQ."""
@@ -314,12 +392,54 @@ def get_task_status(task_id: str) -> dict[str, Any]:
     from celery.result import AsyncResult
     
     result = AsyncResult(task_id, app=celery_app)
+    # Tâche en cours: meta publiée par publish_status (progress, estimated_completion)
+    meta = result.info if result.state == "PROGRESS" and isinstance(result.info, dict) else {}
     
     return {
         "task_id": task_id,
         "state": result.state,
+        "progress": meta.get("progress"),
+        "estimated_completion": meta.get("estimated_completion"),
         "status": "finished" if result.ready() else result.state.lower(),
         "result": result.result if result.ready() and result.successful() else None,
         "error": str(result.result) if result.ready() and not result.successful() else None,
         "traceback": result.traceback if result.ready() and not result.successful() else None
     }
+
+
+READY_STATES = {"SUCCESS", "FAILURE", "REVOKED"}
+
+
+def get_task_statuses(task_ids: list[str]) -> dict[str, dict[str, Any]]:
+    """Statuts de plusieurs tâches en un seul MGET sur les clés celery-task-meta-* du backend Redis.
+
+    Même forme que get_task_status; les tâches sans meta (pas encore démarrées, expirées ou
+    inconnues) sont absentes du résultat. Lève une exception si Redis est indisponible.
+    """
+    import json
+
+    from backend.app.core.redis import get_redis
+
+    if not task_ids:
+        return {}
+    backend = celery_app.backend
+    keys = [backend.get_key_for_task(task_id).decode() for task_id in task_ids]
+    statuses: dict[str, dict[str, Any]] = {}
+    for task_id, raw in zip(task_ids, get_redis().mget(keys)):
+        if not raw:
+            continue
+        meta = json.loads(raw)
+        state = meta.get("status", "PENDING")
+        result = meta.get("result")
+        ready = state in READY_STATES
+        info = result if state == "PROGRESS" and isinstance(result, dict) else {}
+        statuses[task_id] = {
+            "task_id": task_id,
+            "state": state,
+            "status": "finished" if ready else state.lower(),
+            "progress": info.get("progress"),
+            "result": result if state == "SUCCESS" else None,
+            "error": str(result.get("exc_message") or result.get("exc_type")) if state == "FAILURE" and isinstance(result, dict) else None,
+        }
+    return statuses
+
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+"""Cache du catalogue des compagnies (GET /companies).
+
+Deux niveaux:
+ - mémoire du process: réponse sérialisée + ETag, revalidée auprès de Redis toutes les
+   companies_cache_local_ttl secondes (propagation des invalidations entre workers)
+ - Redis: clé partagée companies:catalogue:<génération> (JSON {"etag", "body"});
+   une écriture incrémente companies:catalogue:gen, si bien qu'un catalogue construit
+   en parallèle d'une écriture atterrit sous une génération déjà périmée
+
+Seul un défaut complet (mémoire + Redis) déclenche la requête SQL. Redis indisponible:
+repli sur le seul cache mémoire.
+"""
+import hashlib
+import json
+import threading
+import time
+from dataclasses import dataclass
+
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.core.redis import get_redis
+from backend.app.db import models
+from backend.app.schemas.company import CompanyRead
+
+REDIS_KEY = "companies:catalogue"
+REDIS_GEN_KEY = "companies:catalogue:gen"
+REDIS_TTL_SECONDS = 24 * 3600  # les générations périmées expirent d'elles-mêmes
+
+_adapter = TypeAdapter(list[CompanyRead])
+
+try:  # pragma: no cover
+    from prometheus_client import Counter
+    CATALOGUE_LOOKUPS = Counter("companies_catalogue_lookups_total", "Lectures du catalogue compagnies", ["source"])
+except Exception:  # pragma: no cover
+    CATALOGUE_LOOKUPS = None  # type: ignore
+
+
+@dataclass(frozen=True)
+class Catalogue:
+    body: bytes
+    etag: str
+
+
+_lock = threading.Lock()
+_local: tuple[Catalogue, float] | None = None  # (catalogue, expiration monotonic)
+
+
+def _build(db: Session) -> Catalogue:
+    rows = db.query(models.Company).order_by(models.Company.created_at.desc(), models.Company.id.desc()).all()
+    body = _adapter.dump_json(_adapter.validate_python(rows, from_attributes=True))
+    return Catalogue(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+def _redis_generation() -> str | None:
+    try:
+        return str(get_redis().get(REDIS_GEN_KEY) or "0")
+    except Exception:
+        return None
+
+
+def _redis_get(gen: str) -> Catalogue | None:
+    try:
+        raw = get_redis().get(f"{REDIS_KEY}:{gen}")
+    except Exception:
+        return None
+    if not raw:
+        return None
+    data = json.loads(raw)
+    return Catalogue(body=data["body"].encode(), etag=data["etag"])
+
+
+def _redis_set(gen: str, cat: Catalogue) -> None:
+    try:
+        get_redis().set(f"{REDIS_KEY}:{gen}", json.dumps({"etag": cat.etag, "body": cat.body.decode()}), ex=REDIS_TTL_SECONDS)
+    except Exception:
+        pass
+
+
+def get_catalogue(db: Session) -> Catalogue:
+    """Renvoie le catalogue sérialisé (mémoire -> Redis -> base)."""
+    global _local
+    now = time.monotonic()
+    entry = _local
+    if entry and entry[1] > now:
+        if CATALOGUE_LOOKUPS:
+            CATALOGUE_LOOKUPS.labels("memory").inc()
+        return entry[0]
+    with _lock:
+        entry = _local
+        if entry and entry[1] > now:
+            return entry[0]
+        # Génération lue avant la requête SQL (voir docstring du module)
+        gen = _redis_generation()
+        cat = _redis_get(gen) if gen is not None else None
+        source = "redis"
+        if cat is None:
+            source = "db"
+            cat = _build(db)
+            if gen is not None:
+                _redis_set(gen, cat)
+        if CATALOGUE_LOOKUPS:
+            CATALOGUE_LOOKUPS.labels(source).inc()
+        _local = (cat, now + get_settings().companies_cache_local_ttl)
+        return cat
+
+
+def invalidate_catalogue() -> None:
+    """À appeler après toute écriture commitée sur companies."""
+    global _local
+    with _lock:
+        _local = None
+    try:
+        get_redis().incr(REDIS_GEN_KEY)
+    except Exception:
+        pass
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+"""Purge incrémentale des documents générés orphelins (sans ligne generated_documents).
+
+Exécutée par la tâche Celery document_tasks.purge_orphan_documents:
+ - parcours du backend de stockage en ordre trié, par lots de purge_batch_size documents
+ - un seul SELECT ... IN (...) par lot pour savoir quelles références sont connues
+ - délai de grâce (purge_grace_seconds): un document écrit récemment peut appartenir
+   à une génération dont la ligne n'est pas encore commitée, il est conservé
+ - mode dry_run: les orphelins sont comptés (et échantillonnés) sans être supprimés
+ - curseur (position du dernier document traité) publié après chaque lot: une exécution
+   interrompue reprend au lot suivant
+"""
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from backend.app.db import models
+from backend.app.services.document_storage import StoredDocument
+from backend.app.services.storage_provider import StorageBackend
+
+try:  # pragma: no cover
+    from prometheus_client import Counter
+    DOCUMENT_PURGE_TOTAL = Counter("document_purge_total", "Documents examinés par la purge des orphelins", ["outcome"])
+except Exception:  # pragma: no cover
+    DOCUMENT_PURGE_TOTAL = None  # type: ignore
+
+MAX_REPORTED_ORPHANS = 100  # au-delà, les orphelins sont seulement comptés
+
+
+@dataclass
+class PurgeStats:
+    scanned: int = 0
+    orphans: int = 0
+    removed: int = 0
+    recent: int = 0
+    errors: int = 0
+    cursor: str | None = None
+    sample: list[str] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "scanned": self.scanned,
+            "orphans": self.orphans,
+            "removed": self.removed,
+            "recent": self.recent,
+            "errors": self.errors,
+            "cursor": self.cursor,
+            "sample": list(self.sample),
+        }
+
+
+def _count(outcome: str, n: int = 1) -> None:
+    if DOCUMENT_PURGE_TOTAL and n:
+        DOCUMENT_PURGE_TOTAL.labels(outcome).inc(n)
+
+
+def _purge_batch(db: Session, storage: StorageBackend, batch: list[StoredDocument], cutoff: float, dry_run: bool, stats: PurgeStats) -> None:
+    refs = [d.ref for d in batch]
+    known = {r for (r,) in db.query(models.GeneratedDocument.file_path).filter(models.GeneratedDocument.file_path.in_(refs))}
+    before = stats.as_dict()
+    for doc in batch:
+        stats.scanned += 1
+        if doc.ref in known:
+            continue
+        if doc.modified > cutoff:
+            stats.recent += 1
+            continue
+        stats.orphans += 1
+        if len(stats.sample) < MAX_REPORTED_ORPHANS:
+            stats.sample.append(doc.ref)
+        if dry_run:
+            continue
+        try:
+            storage.delete_document(doc.ref)
+            stats.removed += 1
+        except Exception:
+            stats.errors += 1
+    stats.cursor = batch[-1].cursor
+    for outcome in ("scanned", "orphans", "removed", "recent", "errors"):
+        _count(outcome, getattr(stats, outcome) - before[outcome])
+
+
+def purge_orphans(
+    db: Session,
+    storage: StorageBackend,
+    *,
+    batch_size: int,
+    grace_seconds: int,
+    dry_run: bool = False,
+    cursor: str | None = None,
+    on_progress: Callable[[PurgeStats], None] | None = None,
+) -> PurgeStats:
+    """Supprime (ou compte si dry_run) les documents du stockage situés après cursor
+    et absents de generated_documents.file_path."""
+    stats = PurgeStats(cursor=cursor)
+    cutoff = time.time() - grace_seconds
+    batch: list[StoredDocument] = []
+    for doc in storage.list_documents(start_after=cursor):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            _purge_batch(db, storage, batch, cutoff, dry_run, stats)
+            batch = []
+            if on_progress:
+                on_progress(stats)
+    if batch:
+        _purge_batch(db, storage, batch, cutoff, dry_run, stats)
+        if on_progress:
+            on_progress(stats)
+    return stats
@@ -3,27 +3,76 @@ from __future__ import annotations
 """Service de rendu de documents multi-format.
 
 Fonctions:
+ - make_environment / compile_template: environnement Jinja2 sandboxé et borné, compilation
+   unique d'un contenu (réutilisable entre rendus)
  - render_template: produit un binaire selon le format (html, pdf, xlsx)
- - store_output: persiste le binaire sur disque avec nom déterministe (hash) + métadonnées
+ - write_pdf_lines / write_xlsx_sheets: écriture au fil de l'eau de lignes (PDF) ou de
+   feuilles (XLSX, classeur openpyxl en mode write_only) consommées depuis des itérateurs,
+   pour les rapports volumineux (services.report_engine)
+ - store_output: persiste le binaire via le backend de stockage configuré, sous une clé
+   déterministe (hash) répartie par préfixe, + métadonnées
+
+Les contenus de templates sont fournis par les utilisateurs: ils sont exécutés dans un
+SandboxedEnvironment (pas d'accès aux attributs internes Python) et chaque rendu est borné:
+ - temps: render_timeout_seconds, imposé par un chien de garde qui interrompt le thread de
+   rendu (exception asynchrone levée au prochain bytecode, le code Jinja compilé étant du
+   Python pur); un template bouclant indéfiniment ne bloque donc pas un thread du serveur
+ - mémoire: sortie plafonnée à render_max_output_mb (comptée pendant la génération), range()
+   limité à render_max_range éléments, multiplications de chaînes/listes, puissances,
+   filtres à largeur (center, indent), méthodes de chaîne qui allouent en un seul appel
+   (ljust, rjust, center, zfill, expandtabs, replace) et largeurs de formatage (%, format,
+   str.format) refusés au-delà des mêmes bornes
+ - récursion (macros récursives): RecursionError convertie en RenderLimitError
+Chaque dépassement lève RenderLimitError. Les rendus identifiés (profile_key) alimentent le
+profil de coût par template (services.template_profile).
 """
+import ctypes
+import functools
 import hashlib
+import math
+import re
+import threading
+import time
+from collections.abc import Iterable, Sequence
 from io import BytesIO
-from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, BinaryIO
 
+from jinja2 import BaseLoader
 from jinja2 import Template as JinjaTemplate
+from jinja2.sandbox import SandboxedEnvironment, SandboxedFormatter
+from markupsafe import EscapeFormatter, Markup
 from openpyxl import Workbook
 from reportlab.lib.pagesizes import A4  # type: ignore[import-untyped]
 from reportlab.pdfgen import canvas  # type: ignore[import-untyped]
 
-OUTPUT_DIR = Path("generated")
-OUTPUT_DIR.mkdir(exist_ok=True)
+from backend.app.core.config import get_settings
+from backend.app.services.document_storage import (  # noqa: F401 (OUTPUT_DIR réexporté)
+    OUTPUT_DIR,
+    document_key,
+)
+
+if TYPE_CHECKING:
+    from backend.app.services.storage_provider import StorageBackend
 
 MIME_MAP = {
     "html": "text/html",
     "pdf": "application/pdf",
     "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
 }
+WIDTH_FILTERS = {"center", "indent"}
+PADDING_METHODS = {"ljust", "rjust", "center", "zfill"}
+MAX_POWER_BITS = 65536
+# Spécification de conversion %: largeur et précision (nombre ou *)
+PERCENT_SPEC = re.compile(r"%(?:\([^)]*\))?[-#0 +]*(\*|\d+)?(?:\.(\*|\d+))?[hlL]?[diouxXeEfFgGcrsa%]")
+
+
+class RenderLimitError(Exception):
+    """Rendu interrompu: budget de temps, taille de sortie ou opération trop coûteuse."""
+
+
+class _RenderInterrupted(BaseException):
+    """Injectée dans le thread de rendu par le chien de garde (BaseException: non capturée par le template)."""
+
 
 class RenderResult:
     """Objet simple retourné après stockage du rendu."""
@@ -34,32 +83,236 @@ class RenderResult:
         self.size = size
         self.checksum = checksum
 
-def render_template(content: str, context: dict[str, Any] | None, fmt: str) -> bytes:
+
+def _max_output() -> int:
+    return get_settings().render_max_output_mb * 1024 * 1024
+
+
+class _BoundedRange:
+    """range() de template: longueur plafonnée, interface de séquence conservée (length, reverse)."""
+
+    def __init__(self, *args: int):
+        self._range = range(*args)
+        if len(self._range) > get_settings().render_max_range:
+            raise RenderLimitError(f"range() limité à {get_settings().render_max_range} éléments")
+
+    def __len__(self) -> int:
+        return len(self._range)
+
+    def __iter__(self) -> Any:
+        return iter(self._range)
+
+    def __reversed__(self) -> Any:
+        return reversed(self._range)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self._range[index]
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self._range
+
+
+def _check_format_spec(spec: str) -> None:
+    """Largeur / précision d'une spécification str.format (déjà résolue)."""
+    if any(int(n) > _max_output() for n in re.findall(r"\d+", spec)):
+        raise RenderLimitError("Formatage: largeur excessive")
+
+
+def _check_percent_format(fmt: str, values: Any) -> None:
+    """Largeurs / précisions d'un formatage %, * compris (valeur prise dans les arguments)."""
+    limit = _max_output()
+    starred = False
+    for match in PERCENT_SPEC.finditer(fmt):
+        for number in match.groups():
+            if number == "*":
+                starred = True
+            elif number and int(number) > limit:
+                raise RenderLimitError("Formatage %: largeur excessive")
+    if starred:
+        items = values if isinstance(values, tuple) else (values,)
+        if any(isinstance(v, int) and abs(v) > limit for v in items):
+            raise RenderLimitError("Formatage %: largeur excessive")
+
+
+def _check_str_call(value: str, method: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> None:
+    """Taille du résultat des méthodes de chaîne qui allouent en un seul appel C."""
+    size: Any = None
+    if method in PADDING_METHODS:
+        size = args[0] if args else kwargs.get("width")
+    elif method == "expandtabs":
+        tabsize = args[0] if args else kwargs.get("tabsize", 8)
+        if isinstance(tabsize, int):
+            size = len(value) + value.count("\t") * tabsize
+    elif method == "replace" and len(args) >= 2 and isinstance(args[0], str) and isinstance(args[1], str):
+        old, new = args[0], args[1]
+        count = args[2] if len(args) > 2 else kwargs.get("count", -1)
+        occurrences = value.count(old)
+        if isinstance(count, int) and count >= 0:
+            occurrences = min(occurrences, count)
+        size = len(value) + occurrences * (len(new) - len(old))
+    if isinstance(size, int) and size > _max_output():
+        raise RenderLimitError(f"str.{method}: résultat trop volumineux")
+
+
+def _bounded_filter(name: str, func: Any) -> Any:
+    @functools.wraps(func)  # conserve jinja_pass_arg (pass_context, pass_environment...)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        limit = _max_output()
+        if name in WIDTH_FILTERS and any(isinstance(a, int) and a > limit for a in (*args, *kwargs.values())):
+            raise RenderLimitError(f"Filtre {name}: largeur excessive")
+        if name == "format" and args and isinstance(args[0], str):
+            _check_percent_format(args[0], args[1:] or kwargs)
+        result = func(*args, **kwargs)
+        if isinstance(result, (str, list, tuple)) and len(result) > limit:
+            raise RenderLimitError(f"Filtre {name}: résultat trop volumineux")
+        return result
+
+    return wrapper
+
+
+class _BoundedFormatter(SandboxedFormatter):
+    def format_field(self, value: Any, format_spec: str) -> Any:
+        _check_format_spec(format_spec)
+        return super().format_field(value, format_spec)
+
+
+class _BoundedEscapeFormatter(_BoundedFormatter, EscapeFormatter):
+    pass
+
+
+class BoundedSandboxedEnvironment(SandboxedEnvironment):
+    intercepted_binops = frozenset({"*", "**", "%"})
+
+    def __init__(self, **options: Any):
+        super().__init__(**options)
+        self.globals["range"] = _BoundedRange
+        self.filters = {name: _bounded_filter(name, f) for name, f in self.filters.items()}
+
+    def call_binop(self, context: Any, operator: str, left: Any, right: Any) -> Any:
+        if operator == "*":
+            for seq, n in ((left, right), (right, left)):
+                if isinstance(seq, (str, list, tuple)) and isinstance(n, int) and len(seq) * n > _max_output():
+                    raise RenderLimitError("Multiplication de séquence trop volumineuse")
+        elif operator == "%":
+            if isinstance(left, str):
+                _check_percent_format(left, right)
+        elif isinstance(left, int) and isinstance(right, int) and abs(left) > 1 and right * math.log2(abs(left)) > MAX_POWER_BITS:
+            raise RenderLimitError("Puissance trop grande")
+        return super().call_binop(context, operator, left, right)
+
+    def call(self, context: Any, obj: Any, /, *args: Any, **kwargs: Any) -> Any:
+        owner = getattr(obj, "__self__", None)
+        if isinstance(owner, str):
+            _check_str_call(owner, getattr(obj, "__name__", ""), args, kwargs)
+        return super().call(context, obj, *args, **kwargs)
+
+    def format_string(
+        self, s: str, args: tuple[Any, ...], kwargs: dict[str, Any], format_func: Any | None = None
+    ) -> str:
+        """str.format / format_map sandboxés (SandboxedEnvironment.format_string), largeurs bornées."""
+        formatter = _BoundedEscapeFormatter(self, escape=s.escape) if isinstance(s, Markup) else _BoundedFormatter(self)
+        if format_func is not None and format_func.__name__ == "format_map":
+            if len(args) != 1 or kwargs:
+                raise TypeError(f"format_map() takes exactly one argument {len(args) + (kwargs is not None)} given")
+            kwargs = args[0]
+            args = ()
+        return type(s)(formatter.vformat(s, args, kwargs))
+
+
+def make_environment(loader: BaseLoader | None = None) -> BoundedSandboxedEnvironment:
+    """Environnement de rendu; les bundles précompilés (template_warmup) doivent utiliser le même."""
+    return BoundedSandboxedEnvironment(loader=loader)
+
+
+_ENV = make_environment()
+
+
+def compile_template(content: str) -> JinjaTemplate:
+    return _ENV.from_string(content)
+
+
+def _as_template(content: str | JinjaTemplate) -> JinjaTemplate:
+    return content if isinstance(content, JinjaTemplate) else compile_template(content)
+
+
+class _Watchdog:
+    """Interrompt le thread courant s'il est encore en rendu à l'échéance."""
+
+    def __init__(self, timeout: float):
+        self._thread_id = threading.get_ident()
+        self._lock = threading.Lock()
+        self._armed = True
+        self._fired = False
+        self._timer = threading.Timer(timeout, self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _fire(self) -> None:
+        with self._lock:
+            if self._armed:
+                self._fired = True
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self._thread_id), ctypes.py_object(_RenderInterrupted))
+
+    def disarm(self) -> None:
+        self._timer.cancel()
+        with self._lock:
+            self._armed = False
+            if self._fired:
+                # Rendu terminé juste à l'échéance: annule l'exception si elle n'a pas encore été levée
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self._thread_id), None)
+
+
+def _render_text(template: JinjaTemplate, ctx: dict[str, Any]) -> str:
+    """Rendu borné en taille (compté pendant la génération) et en temps."""
+    limit = _max_output()
+    timeout = get_settings().render_timeout_seconds
+    parts: list[str] = []
+    size = 0
+    try:
+        watchdog = _Watchdog(timeout) if timeout > 0 else None
+        try:
+            for chunk in template.generate(**ctx):
+                size += len(chunk)
+                if size > limit:
+                    raise RenderLimitError(f"Sortie limitée à {get_settings().render_max_output_mb} Mo")
+                parts.append(chunk)
+        finally:
+            if watchdog:
+                watchdog.disarm()
+    except _RenderInterrupted:
+        raise RenderLimitError(f"Temps de rendu dépassé ({timeout:g}s)") from None
+    except RecursionError:
+        raise RenderLimitError("Récursion trop profonde") from None
+    return "".join(parts)
+
+
+def render_template(content: str | JinjaTemplate, context: dict[str, Any] | None, fmt: str, profile_key: str | None = None) -> bytes:
     """Rend un template Jinja2 ou construit un document selon le format demandé.
 
+    content: source Jinja2 ou template déjà compilé (compile_template).
     html: rendu direct du template.
     pdf: rendu texte puis conversion basique via reportlab (multi-page).
     xlsx: transformation du contexte en tableau clé/valeur.
+    profile_key: identifiant du template (ex: "v42") dont le profil de coût est mis à jour.
+    Lève RenderLimitError si le rendu dépasse ses budgets.
     """
-    ctx = context or {}
+    start = time.perf_counter()
+    data = _render(content, context or {}, fmt)
+    if profile_key:
+        from backend.app.services.template_profile import record_render
+
+        record_render(profile_key, fmt, time.perf_counter() - start, len(data))
+    return data
+
+
+def _render(content: str | JinjaTemplate, ctx: dict[str, Any], fmt: str) -> bytes:
     if fmt == "html":
-        template = JinjaTemplate(content)
-        return template.render(**ctx).encode("utf-8")
+        return _render_text(_as_template(content), ctx).encode("utf-8")
     if fmt == "pdf":
         # Interpréter le content comme texte Jinja2 avant rendu PDF
-        template = JinjaTemplate(content)
-        rendered_text = template.render(**ctx)
+        rendered_text = _render_text(_as_template(content), ctx)
         buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        y = height - 50
-        for line in rendered_text.splitlines() or [rendered_text]:
-            c.drawString(40, y, line[:150])
-            y -= 15
-            if y < 50:
-                c.showPage()
-                y = height - 50
-        c.save()
+        write_pdf_lines(rendered_text.splitlines() or [rendered_text], buffer)
         return buffer.getvalue()
     if fmt == "xlsx":
         # content ignoré si vide: on transforme contexte en table clé/valeur
@@ -77,18 +330,48 @@ def render_template(content: str, context: dict[str, Any] | None, fmt: str) -> b
         wb.save(buffer)
         return buffer.getvalue()
     # fallback brut
-    template = JinjaTemplate(content)
-    return template.render(**ctx).encode("utf-8")
+    return _render_text(_as_template(content), ctx).encode("utf-8")
+
+
+def write_pdf_lines(lines: Iterable[str], fileobj: BinaryIO) -> int:
+    """Écrit les lignes en PDF multi-page au fur et à mesure; retourne le nombre de pages."""
+    c = canvas.Canvas(fileobj, pagesize=A4)
+    width, height = A4
+    y = height - 50
+    for line in lines:
+        c.drawString(40, y, line[:150])
+        y -= 15
+        if y < 50:
+            c.showPage()
+            y = height - 50
+    # Page courante vide (saut de page sur la dernière ligne): non émise par save()
+    pages = int(c.getPageNumber()) if y < height - 50 else max(int(c.getPageNumber()) - 1, 1)
+    c.save()
+    return pages
+
+
+def write_xlsx_sheets(sheets: Iterable[tuple[str, Iterable[Sequence[Any]]]], fileobj: BinaryIO) -> int:
+    """Écrit un classeur en mode write_only (lignes non conservées en mémoire); retourne le nombre de lignes."""
+    wb = Workbook(write_only=True)
+    rows = 0
+    for title, sheet_rows in sheets:
+        ws = wb.create_sheet(title=title[:31])
+        for row in sheet_rows:
+            ws.append(list(row))
+            rows += 1
+    if not wb.worksheets:
+        wb.create_sheet(title="Data").append(["Empty"])
+    wb.save(fileobj)
+    return rows
+
 
-def store_output(data: bytes, extension: str) -> RenderResult:
-    """Stocke le flux généré sur disque dans OUTPUT_DIR.
+def store_output(data: bytes, extension: str, storage: StorageBackend) -> RenderResult:
+    """Stocke le flux généré via le backend (local réparti, S3, Google Drive).
 
-    Le nom de fichier incorpore un préfixe du checksum pour éviter doublons.
+    La clé incorpore un préfixe du checksum pour éviter doublons; file_path reçoit la
+    référence renvoyée par le backend (chemin local, clé S3 ou id Drive).
     """
     checksum = hashlib.sha256(data).hexdigest()
-    filename = f"doc_{checksum[:12]}.{extension}"
-    path = OUTPUT_DIR / filename
-    with open(path, "wb") as f:
-        f.write(data)
     mime = MIME_MAP.get(extension, "application/octet-stream")
-    return RenderResult(str(path), mime, len(data), checksum)
+    ref = storage.store_document(data, document_key(checksum, extension), content_type=mime)
+    return RenderResult(ref, mime, len(data), checksum)
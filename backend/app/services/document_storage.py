@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+"""Stockage local des documents générés.
+
+Les documents sont rangés sous OUTPUT_DIR dans une arborescence répartie par préfixe
+du checksum (generated/ab/cd/doc_<checksum[:12]>.<ext>) afin qu'aucun répertoire ne
+grossisse indéfiniment. La même clé relative sert de clé d'objet pour S3.
+
+Les anciens documents rangés à plat (generated/doc_*.ext) restent lisibles.
+"""
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from uuid import uuid4
+
+OUTPUT_DIR = Path("generated")
+OUTPUT_DIR.mkdir(exist_ok=True)
+
+DOCUMENT_PREFIX = "generated"
+READ_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class StoredDocument:
+    """Document présent dans le stockage: référence (telle que persistée) et date de modification (epoch)."""
+
+    ref: str
+    modified: float
+    position: str | None = None  # position dans l'ordre du listing, si la référence n'en est pas une
+
+    @property
+    def cursor(self) -> str:
+        """Valeur de start_after pour reprendre après ce document (valable même s'il a été supprimé)."""
+        return self.position or self.ref
+
+
+def document_key(checksum: str, extension: str) -> str:
+    """Clé relative répartie sur deux niveaux de préfixe (256 * 256 répertoires)."""
+    return f"{DOCUMENT_PREFIX}/{checksum[:2]}/{checksum[2:4]}/doc_{checksum[:12]}.{extension}"
+
+
+def _local_path(key: str) -> Path:
+    return OUTPUT_DIR.joinpath(*key.split("/")[1:]) if key.startswith(f"{DOCUMENT_PREFIX}/") else OUTPUT_DIR / key
+
+
+def resolve_document_path(path: str) -> Path:
+    """Renvoie le chemin d'un document local après contrôle de confinement dans OUTPUT_DIR."""
+    p = Path(path)
+    try:
+        if not p.resolve().is_relative_to(OUTPUT_DIR.resolve()):
+            raise ValueError("Chemin hors répertoire autorisé")
+    except AttributeError:
+        root = str(OUTPUT_DIR.resolve())
+        if not str(p.resolve()).startswith(root):
+            raise ValueError("Chemin hors répertoire autorisé")
+    return p
+
+
+def store_document_file(data: bytes, key: str) -> str:
+    """Écrit le document (fichier temporaire puis renommage atomique) et renvoie son chemin."""
+    path = _local_path(key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.parent / f".write_{uuid4().hex}.part"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return str(path)
+
+
+def open_document_file(path: str) -> Iterator[bytes]:
+    """Ouvre le document (FileNotFoundError immédiate s'il manque) et le lit par blocs."""
+    f = open(resolve_document_path(path), "rb")
+
+    def _chunks() -> Iterator[bytes]:
+        with f:
+            while chunk := f.read(READ_CHUNK_SIZE):
+                yield chunk
+
+    return _chunks()
+
+
+def list_document_files(start_after: str | None = None) -> Iterator[StoredDocument]:
+    """Parcourt l'arborescence (anciens fichiers à plat compris) en ordre trié, sous la forme
+    stockée en base, en ne renvoyant que les documents situés après start_after.
+
+    Seul le contenu d'un répertoire à la fois est chargé; les sous-arbres entièrement
+    antérieurs au curseur ne sont pas parcourus.
+    """
+    after = Path(start_after).parts if start_after else ()
+    yield from _walk(OUTPUT_DIR, after)
+
+
+def _walk(directory: Path, after: tuple[str, ...]) -> Iterator[StoredDocument]:
+    try:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        path = directory / entry.name
+        parts = path.parts
+        if entry.is_dir(follow_symlinks=False):
+            if parts >= after[: len(parts)]:
+                yield from _walk(path, after)
+        elif entry.name.startswith("doc_") and parts > after:
+            try:
+                yield StoredDocument(ref=str(path), modified=entry.stat().st_mtime)
+            except FileNotFoundError:
+                continue
+
+
+def delete_document_file(path: str) -> None:
+    resolve_document_path(path).unlink(missing_ok=True)
@@ -7,6 +7,11 @@ from typing import Any
 from celery import Task
 
 from backend.app.core.celery_app import celery_app
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services.document_purge import PurgeStats, purge_orphans
+from backend.app.services.storage_provider import get_storage
 
 
 @celery_app.task(bind=True, queue="documents", max_retries=2)
@@ -53,3 +58,54 @@ def generate_document_thumbnail(self: Task, document_id: int) -> dict[str, Any]:
         if self.request.retries < self.max_retries:
             raise self.retry(exc=exc, countdown=15)
         raise exc
+
+
+@celery_app.task(bind=True, queue="documents", max_retries=0, time_limit=2 * 60 * 60, soft_time_limit=115 * 60)
+def purge_orphan_documents(self: Task, job_id: int) -> dict[str, Any]:
+    """Purge les documents orphelins du backend de stockage (voir services.document_purge).
+
+    Paramètres lus dans report_jobs.params (dry_run, cursor de départ); la progression et le
+    curseur atteint sont publiés après chaque lot (état Celery PROGRESS + report_jobs.progress),
+    ce qui permet de relancer une purge interrompue à partir du dernier lot traité.
+    """
+    db = SessionLocal()
+    job = db.get(models.ReportJob, job_id)
+    if not job:
+        db.close()
+        raise ValueError(f"Job de purge introuvable: {job_id}")
+    params = job.params or {}
+    try:
+        job.status = "started"
+        job.started_at = datetime.now(UTC)
+        db.commit()
+
+        def _progress(stats: PurgeStats) -> None:
+            if self.request.id:
+                self.update_state(state="PROGRESS", meta=stats.as_dict())
+            job.progress = stats.as_dict()
+            db.commit()
+
+        settings = get_settings()
+        stats = purge_orphans(
+            db,
+            get_storage(db),
+            batch_size=settings.purge_batch_size,
+            grace_seconds=settings.purge_grace_seconds,
+            dry_run=bool(params.get("dry_run")),
+            cursor=params.get("cursor"),
+            on_progress=_progress,
+        )
+        job.status = "completed"
+        job.finished_at = datetime.now(UTC)
+        job.progress = stats.as_dict()
+        db.commit()
+        return stats.as_dict()
+    except Exception as exc:
+        db.rollback()
+        job.status = "failed"
+        job.finished_at = datetime.now(UTC)
+        job.result = {"error": str(exc)}
+        db.commit()
+        raise
+    finally:
+        db.close()
@@ -1,53 +1,281 @@
 from __future__ import annotations
 
 """
-Backend Google Drive pour le stockage des templates.
+Backend Google Drive pour le stockage des templates et des documents générés.
+
+Le client Drive (credentials + service issu de la découverte d'API) est partagé par
+fichier de compte de service entre toutes les instances du backend. httplib2 n'étant pas
+thread-safe, chaque thread dispose de sa propre session HTTP autorisée, réutilisée d'un
+appel à l'autre (connexions keep-alive) et passée explicitement à execute()/next_chunk().
+
+ - envois: toujours en upload résumable par blocs de gdrive_chunk_mb
+ - lectures: requêtes Range de gdrive_chunk_mb, jusqu'à gdrive_download_workers en parallèle,
+   restituées dans l'ordre
+ - réponses 429 / 403 rateLimitExceeded / 5xx et erreurs réseau: nouvel essai avec backoff
+   exponentiel (gdrive_max_retries)
 """
+import hashlib
 import io
+import json
+import random
+import tempfile
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, BinaryIO, TypeVar
 
+import httplib2  # type: ignore
 from google.oauth2 import service_account  # type: ignore
+from google_auth_httplib2 import AuthorizedHttp  # type: ignore
 from googleapiclient.discovery import build  # type: ignore
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload  # type: ignore
+from googleapiclient.errors import HttpError  # type: ignore
+from googleapiclient.http import MediaIoBaseUpload  # type: ignore
+
+from backend.app.core.config import get_settings
+from backend.app.services.async_storage import ThreadedAsyncStorage
+from backend.app.services.document_storage import StoredDocument
+from backend.app.services.template_storage import StoredObject, check_checksum, iter_chunks
+
+# Au-delà, le tampon d'envoi bascule sur disque (l'API Drive exige un flux repositionnable)
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 32.0
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+# Marqueur (appProperties) des documents générés: le dossier contient aussi les templates,
+# dont le nom est celui du fichier envoyé; seuls les fichiers marqués sont listés (et purgés)
+DOCUMENT_PROPERTIES = {"kind": "generated_document"}
+
+T = TypeVar("T")
+
+
+def _position_key(position: str) -> tuple[str, ...]:
+    """(nom, date de création, id) d'une position de listing; seul le nom peut contenir '/'."""
+    return tuple(position.rsplit("/", 2))
+
+
+class DriveClient:
+    """Service Drive partagé + une session HTTP autorisée par thread."""
+
+    def __init__(self, service: Any, credentials: Any = None, timeout: int | None = None):
+        self.service = service
+        self.credentials = credentials
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def http(self) -> Any:
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = AuthorizedHttp(self.credentials, http=httplib2.Http(timeout=self.timeout))
+            self._local.http = http
+        return http
+
+
+_clients_lock = threading.Lock()
+_clients: dict[str, DriveClient] = {}  # chemin du compte de service -> client partagé
+
+
+def get_drive_client(service_account_path: str) -> DriveClient:
+    with _clients_lock:
+        client = _clients.get(service_account_path)
+        if client is None:
+            if not Path(service_account_path).exists():
+                raise FileNotFoundError(f"Service account JSON introuvable: {service_account_path}")
+            creds = service_account.Credentials.from_service_account_file(
+                service_account_path,
+                scopes=["https://www.googleapis.com/auth/drive"]
+            )
+            service = build("drive", "v3", credentials=creds, cache_discovery=False)
+            client = DriveClient(service, creds, timeout=get_settings().gdrive_http_timeout)
+            _clients[service_account_path] = client
+        return client
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if not isinstance(exc, HttpError):
+        return isinstance(exc, (OSError, httplib2.HttpLib2Error))
+    status = int(exc.resp.status)
+    if status in RETRYABLE_STATUSES:
+        return True
+    if status != 403:
+        return False
+    try:
+        errors = json.loads(exc.content)["error"]["errors"]
+    except (ValueError, KeyError, TypeError):
+        return False
+    return any(e.get("reason") in RATE_LIMIT_REASONS for e in errors)
+
 
+class GoogleDriveStorageBackend(ThreadedAsyncStorage):
+    """Variante async: pas de client Drive asynchrone, appels synchrones via asyncio.to_thread."""
 
-class GoogleDriveStorageBackend:
-    def __init__(self, service_account_path: str, folder_id: str):
+    name = "google_drive"
+
+    def __init__(
+        self,
+        service_account_path: str,
+        folder_id: str,
+        client: DriveClient | None = None,
+        chunk_size: int | None = None,
+        download_workers: int | None = None,
+        max_retries: int | None = None,
+        retry_base_delay: float = RETRY_BASE_DELAY,
+    ):
         self.service_account_path = service_account_path
         self.folder_id = folder_id
-        self._client = None
-        self._drive: Any = None  # Pour mypy
-        self._creds = None
-        self._init_client()
-
-    def _init_client(self):
-        if not Path(self.service_account_path).exists():
-            raise FileNotFoundError(f"Service account JSON introuvable: {self.service_account_path}")
-        self._creds = service_account.Credentials.from_service_account_file(
-            self.service_account_path,
-            scopes=["https://www.googleapis.com/auth/drive"]
-        )
-        self._drive = build("drive", "v3", credentials=self._creds)
+        self._client = client or get_drive_client(service_account_path)
+        settings = get_settings()
+        # Drive impose des blocs résumables multiples de 256 Kio
+        self.chunk_size = chunk_size or settings.gdrive_chunk_mb * 1024 * 1024
+        self.download_workers = download_workers or settings.gdrive_download_workers
+        self.max_retries = settings.gdrive_max_retries if max_retries is None else max_retries
+        self.retry_base_delay = retry_base_delay
+
+    @property
+    def _drive(self) -> Any:
+        return self._client.service
+
+    def _retry(self, call: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            try:
+                return call()
+            except Exception as exc:
+                if attempt >= self.max_retries or not _is_retryable(exc):
+                    raise
+            delay = min(RETRY_MAX_DELAY, self.retry_base_delay * 2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay))
+            attempt += 1
+
+    def _execute(self, request: Any) -> Any:
+        return self._retry(lambda: request.execute(http=self._client.http()))
+
+    def _upload(self, fileobj: IO[bytes], name: str, content_type: str, properties: dict[str, str] | None = None) -> str:
+        media = MediaIoBaseUpload(fileobj, mimetype=content_type, chunksize=self.chunk_size, resumable=True)
+        body: dict[str, Any] = {"name": name, "parents": [self.folder_id]}
+        if properties:
+            body["appProperties"] = properties
+        request = self._drive.files().create(body=body, media_body=media, fields="id")
+        http = self._client.http()
+        response: dict[str, Any] | None = None
+        while response is None:
+            # Après une erreur, next_chunk interroge Drive sur l'état de l'upload et reprend au bon offset
+            _, response = self._retry(lambda: request.next_chunk(http=http))
+        return str(response["id"])
 
     def store_bytes(self, data: bytes, filename: str | None = None, content_type: str | None = None) -> str:
-        assert self._drive is not None  # Pour mypy
-        name = filename or "untitled"
-        media = MediaIoBaseUpload(io.BytesIO(data), mimetype=content_type or "text/plain")
-        file_metadata = {
-            "name": name,
-            "parents": [self.folder_id],
-        }
-        file = self._drive.files().create(body=file_metadata, media_body=media, fields="id").execute()
-        return str(file["id"])
+        return self._upload(io.BytesIO(data), filename or "untitled", content_type or "text/plain")
+
+    def store_stream(
+        self,
+        fileobj: BinaryIO,
+        filename: str | None = None,
+        content_type: str | None = None,
+        expected_sha256: str | None = None,
+    ) -> StoredObject:
+        """Copie le flux dans un tampon borné en mémoire (débordement sur disque) en le hachant,
+        puis l'envoie en upload résumable par blocs de chunk_size."""
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+            for chunk in iter_chunks(fileobj):
+                digest.update(chunk)
+                size += len(chunk)
+                spool.write(chunk)
+            checksum = digest.hexdigest()
+            check_checksum(checksum, expected_sha256)
+            spool.seek(0)
+            file_id = self._upload(spool, filename or "untitled", content_type or "application/octet-stream")
+        return StoredObject(path=file_id, checksum=checksum, size=size)
+
+    def _size(self, file_id: str) -> int:
+        try:
+            meta = self._execute(self._drive.files().get(fileId=file_id, fields="size"))
+        except HttpError as exc:
+            if int(exc.resp.status) == 404:
+                raise FileNotFoundError(file_id) from exc
+            raise
+        return int(meta.get("size") or 0)
+
+    def _fetch_range(self, file_id: str, start: int, end: int) -> bytes:
+        def _call() -> bytes:
+            request = self._drive.files().get_media(fileId=file_id)
+            request.headers["Range"] = f"bytes={start}-{end}"
+            data: bytes = request.execute(http=self._client.http())
+            return data
+
+        return self._retry(_call)
+
+    def _iter_content(self, file_id: str, size: int) -> Iterator[bytes]:
+        """Télécharge par plages de chunk_size, au plus download_workers en vol, dans l'ordre."""
+        ranges = iter([(start, min(start + self.chunk_size, size) - 1) for start in range(0, size, self.chunk_size)])
+        if size <= self.chunk_size:
+            if size:
+                yield self._fetch_range(file_id, 0, size - 1)
+            return
+        with ThreadPoolExecutor(max_workers=self.download_workers, thread_name_prefix="gdrive-dl") as pool:
+            pending: deque[Future[bytes]] = deque()
+            try:
+                for _ in range(self.download_workers):
+                    rng = next(ranges, None)
+                    if rng is None:
+                        break
+                    pending.append(pool.submit(self._fetch_range, file_id, *rng))
+                while pending:
+                    data = pending.popleft().result()
+                    rng = next(ranges, None)
+                    if rng is not None:
+                        pending.append(pool.submit(self._fetch_range, file_id, *rng))
+                    yield data
+            finally:
+                for f in pending:
+                    f.cancel()
 
     def read_text(self, file_id: str) -> str:
-        assert self._drive is not None  # Pour mypy
-        request = self._drive.files().get_media(fileId=file_id)
-        fh = io.BytesIO()
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while not done:
-            status, done = downloader.next_chunk()
-        fh.seek(0)
-        return fh.read().decode("utf-8")
+        return b"".join(self._iter_content(file_id, self._size(file_id))).decode("utf-8")
+
+    def store_document(self, data: bytes, key: str, content_type: str | None = None) -> str:
+        """Drive n'a pas d'arborescence par clé: seul le nom de fichier (doc_<hash>.<ext>) est conservé,
+        le fichier étant marqué comme document généré (DOCUMENT_PROPERTIES)."""
+        return self._upload(
+            io.BytesIO(data), key.rsplit("/", 1)[-1], content_type or "application/octet-stream", properties=DOCUMENT_PROPERTIES
+        )
+
+    def open_document(self, file_id: str) -> Iterator[bytes]:
+        return self._iter_content(file_id, self._size(file_id))
+
+    def document_url(self, file_id: str, filename: str, content_type: str | None, expires_in: int) -> str | None:
+        return None  # Drive ne fournit pas d'URL présignée: lecture en flux via l'API
+
+    def list_documents(self, start_after: str | None = None) -> Iterator[StoredDocument]:
+        """Documents générés du dossier (marqués DOCUMENT_PROPERTIES), triés par nom puis date de création.
+
+        La position d'un document (nom/date de création/id) sert de curseur: la requête Drive
+        ne permet pas de filtrer sur name > ..., la reprise relit donc la liste et écarte les
+        documents situés avant la position, que le document du curseur existe encore ou non.
+        """
+        marker = " and ".join(f"appProperties has {{ key='{k}' and value='{v}' }}" for k, v in DOCUMENT_PROPERTIES.items())
+        query = f"'{self.folder_id}' in parents and {marker} and trashed = false"
+        after = _position_key(start_after) if start_after else None
+        page_token = None
+        while True:
+            resp = self._execute(self._drive.files().list(
+                q=query, orderBy="name,createdTime", fields="nextPageToken, files(id, name, createdTime, modifiedTime)",
+                pageToken=page_token,
+            ))
+            for f in resp.get("files", []):
+                position = f"{f['name']}/{f.get('createdTime', '')}/{f['id']}"
+                if after is not None and _position_key(position) <= after:
+                    continue
+                modified = datetime.fromisoformat(f["modifiedTime"].replace("Z", "+00:00")).timestamp()
+                yield StoredDocument(ref=str(f["id"]), modified=modified, position=position)
+            page_token = resp.get("nextPageToken")
+            if not page_token:
+                return
+
+    def delete_document(self, file_id: str) -> None:
+        self._execute(self._drive.files().delete(fileId=file_id))
@@ -0,0 +1,69 @@
+"""Tâches Celery d'import en masse (queue dédiée "imports")."""
+from __future__ import annotations
+
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from celery import Task
+
+from backend.app.core.celery_app import celery_app
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services.bulk_import import ImportStats, run_import
+
+try:  # pragma: no cover
+    from prometheus_client import Counter
+    IMPORT_ROWS_TOTAL = Counter("import_rows_total", "Lignes importées en masse", ["kind", "outcome"])
+except Exception:  # pragma: no cover
+    IMPORT_ROWS_TOTAL = None  # type: ignore
+
+
+# Un portefeuille de 100k lignes dépasse la limite globale de 30 min sur petit worker
+@celery_app.task(bind=True, queue="imports", max_retries=0, time_limit=2 * 60 * 60, soft_time_limit=115 * 60)
+def import_portfolio(self: Task, job_id: int, kind: str, file_path: str, owner_id: int) -> dict[str, Any]:
+    """Importe un fichier CSV/XLSX de clients ou polices pour owner_id.
+
+    La progression est publiée à chaque lot (état Celery PROGRESS + report_jobs.progress),
+    le rapport d'erreurs par ligne est conservé dans report_jobs.result.errors.
+    """
+    db = SessionLocal()
+    path = Path(file_path)
+    job = db.get(models.ReportJob, job_id)
+    try:
+        if job:
+            job.status = "started"
+            job.started_at = datetime.now(UTC)
+            db.commit()
+
+        def _progress(stats: ImportStats) -> None:
+            if self.request.id:
+                self.update_state(state="PROGRESS", meta=stats.as_dict())
+            if job:
+                job.progress = stats.as_dict()
+                db.commit()
+
+        stats = run_import(db, kind, path, owner_id, batch_size=get_settings().import_batch_size, on_progress=_progress)
+        result = {**stats.as_dict(), "kind": kind}
+        if job:
+            job.status = "completed"
+            job.finished_at = datetime.now(UTC)
+            job.progress = stats.as_dict()
+            job.result = {"errors": stats.errors}
+            db.commit()
+        if IMPORT_ROWS_TOTAL:
+            IMPORT_ROWS_TOTAL.labels(kind, "inserted").inc(stats.inserted)
+            IMPORT_ROWS_TOTAL.labels(kind, "error").inc(stats.error_count)
+        return result
+    except Exception as exc:
+        db.rollback()
+        if job:
+            job.status = "failed"
+            job.finished_at = datetime.now(UTC)
+            job.result = {"error": str(exc)}
+            db.commit()
+        raise
+    finally:
+        db.close()
+        path.unlink(missing_ok=True)
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+"""Événements de progression des jobs Celery, poussés aux clients (SSE) au lieu d'être sondés.
+
+Publication (workers): publish_job_event(task_id, event) écrit le dernier événement
+(job_events:last:<task_id>, TTL) et le publie sur le canal Redis job_events:<task_id>.
+Sans Redis (tests, dev eager), l'événement est remis directement aux abonnés du process.
+
+Diffusion (API): JobEventHub maintient, par process, UNE connexion pub/sub Redis
+(psubscribe job_events:*) ouverte tant qu'au moins un client écoute, et répartit les
+messages vers les files asyncio des flux SSE abonnés au task_id concerné; le nombre de
+clients connectés ne multiplie donc pas les connexions Redis.
+
+Format d'un événement: {"status": started|progress|retry|completed|failed|cancelled,
+"progress": 0-100, "estimated_completion": ISO 8601, "result": {...}, "error": "..."}.
+"""
+import asyncio
+import json
+import threading
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any
+
+from backend.app.core.config import get_settings
+from backend.app.core.redis import get_redis
+
+CHANNEL_PREFIX = "job_events:"
+LAST_EVENT_PREFIX = "job_events:last:"
+LAST_EVENT_TTL = 24 * 3600
+TERMINAL_STATUSES = {"completed", "failed", "cancelled"}
+QUEUE_SIZE = 100
+MAX_RECONNECT_DELAY = 30.0
+LISTENER_READY_TIMEOUT = 1.0  # attente max de la souscription Redis avant de lire l'état courant
+
+
+def progress_event(progress: float, started_at: datetime, now: datetime) -> dict[str, Any]:
+    """Événement "progress" avec estimation linéaire de la fin à partir du temps écoulé."""
+    event: dict[str, Any] = {"status": "progress", "progress": round(progress, 1)}
+    if progress > 0:
+        elapsed = (now - started_at).total_seconds()
+        event["estimated_completion"] = (started_at + timedelta(seconds=elapsed * 100 / progress)).isoformat()
+    return event
+
+
+def publish_job_event(task_id: str, event: dict[str, Any]) -> None:
+    payload = json.dumps(event, default=str)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.set(f"{LAST_EVENT_PREFIX}{task_id}", payload, ex=LAST_EVENT_TTL)
+        pipe.publish(f"{CHANNEL_PREFIX}{task_id}", payload)
+        pipe.execute()
+    except Exception:
+        hub.dispatch(task_id, json.loads(payload))
+
+
+def last_job_event(task_id: str) -> dict[str, Any] | None:
+    try:
+        raw = get_redis().get(f"{LAST_EVENT_PREFIX}{task_id}")
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+def _offer(queue: asyncio.Queue[dict[str, Any]], event: dict[str, Any]) -> None:
+    if queue.full():  # client lent: on garde les événements les plus récents
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+class JobEventHub:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscribers: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue[dict[str, Any]]]]] = {}
+        self._listener: asyncio.Task[None] | None = None
+        self._listener_loop: asyncio.AbstractEventLoop | None = None
+        self._ready: asyncio.Event | None = None
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue[dict[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        entry = (loop, queue)
+        with self._lock:
+            self._subscribers.setdefault(task_id, set()).add(entry)
+        self._ensure_listener(loop)
+        try:
+            # Souscription Redis active avant que l'appelant ne lise l'état courant
+            assert self._ready is not None
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=LISTENER_READY_TIMEOUT)
+            except TimeoutError:
+                pass  # Redis indisponible: seuls les événements locaux seront reçus
+            yield queue
+        finally:
+            with self._lock:
+                entries = self._subscribers.get(task_id)
+                if entries is not None:
+                    entries.discard(entry)
+                    if not entries:
+                        del self._subscribers[task_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._subscribers.values())
+
+    def dispatch(self, task_id: str, event: dict[str, Any]) -> None:
+        """Remet l'événement aux abonnés du process (appelable depuis n'importe quel thread)."""
+        with self._lock:
+            entries = list(self._subscribers.get(task_id, ()))
+        for loop, queue in entries:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_offer, queue, event)
+
+    def _ensure_listener(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._listener is None or self._listener.done() or self._listener_loop is not loop:
+            self._listener_loop = loop
+            self._ready = asyncio.Event()
+            self._listener = loop.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        """Une souscription Redis par process, fermée dès qu'il n'y a plus d'abonnés."""
+        from redis import asyncio as aioredis
+
+        delay = 1.0
+        while self.subscriber_count():
+            client = aioredis.from_url(get_settings().redis_url, decode_responses=True)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                if self._ready:
+                    self._ready.set()
+                delay = 1.0
+                while self.subscriber_count():
+                    msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if msg and msg.get("type") == "pmessage":
+                        self.dispatch(msg["channel"][len(CHANNEL_PREFIX):], json.loads(msg["data"]))
+            except Exception:
+                # Redis indisponible: les événements locaux (dispatch) restent délivrés
+                if self._ready:
+                    self._ready.clear()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            finally:
+                try:
+                    # aclose (redis >= 5) absent des stubs types-redis 4.6
+                    await pubsub.aclose()  # type: ignore[attr-defined]
+                    await client.aclose()  # type: ignore[attr-defined]
+                except Exception:
+                    pass
+
+
+hub = JobEventHub()
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    return f"event: {event.get('status', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+async def stream_job_events(task_id: str, snapshot: dict[str, Any]) -> AsyncIterator[str]:
+    """Flux SSE: état courant, puis événements poussés jusqu'à un état terminal.
+
+    snapshot: état lu en base par la route. Un statut terminal en base fait foi (annulation,
+    échec sans événement publié): il est envoyé seul et le flux se ferme. Sinon, le dernier
+    événement publié, relu après l'abonnement, le complète si le job a progressé entre-temps
+    (aucun événement manqué).
+    Un commentaire est envoyé toutes les job_events_heartbeat secondes pour maintenir la
+    connexion à travers les proxys; le flux est fermé après job_events_max_stream secondes.
+    """
+    if snapshot.get("status") in TERMINAL_STATUSES:
+        yield format_sse(snapshot)
+        return
+    settings = get_settings()
+    async with hub.subscribe(task_id) as queue:
+        latest = await asyncio.to_thread(last_job_event, task_id)
+        snapshot = {**snapshot, **(latest or {})}
+        yield format_sse(snapshot)
+        if snapshot.get("status") in TERMINAL_STATUSES:
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.job_events_max_stream
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=min(settings.job_events_heartbeat, remaining))
+            except TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield format_sse(event)
+            if event.get("status") in TERMINAL_STATUSES:
+                return
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+"""Écriture des transitions de statut des report_jobs (started, retry_n, completed, failed).
+
+Chaque transition est un UPDATE unique par clé primaire (ni SELECT préalable ni chargement
+ORM), exécuté sur la session du worker (db.session.worker_session). Les transitions de même
+forme sont regroupées en un executemany.
+
+Mode regroupé (JOB_STATUS_COALESCE): les transitions intermédiaires (started, retry_n) sont
+poussées dans une liste Redis et écrites par lots (flush_buffer): dès que la liste atteint
+JOB_STATUS_FLUSH_SIZE, périodiquement via la tâche beat flush_job_status_buffer et à l'arrêt
+de chaque process worker. Les transitions successives d'un même job sont fusionnées (une
+ligne écrite par job et par lot). Les transitions terminales sont toujours écrites
+immédiatement: un statut terminal n'est jamais écrasé par une transition intermédiaire
+écrite plus tard, mais les horodatages de celle-ci sont conservés.
+Sans Redis, les transitions sont écrites directement.
+"""
+import json
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from typing import Any, cast
+
+from loguru import logger
+from sqlalchemy import Table, bindparam, case, or_, update
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.core.redis import get_redis
+from backend.app.db import models
+
+BUFFER_KEY = "report_jobs:status_buffer"
+TERMINAL_STATUSES = ("completed", "failed", "cancelled")
+_TIMESTAMPS = ("started_at", "finished_at")
+
+try:  # pragma: no cover
+    from prometheus_client import Counter
+    JOB_STATUS_WRITES = Counter("report_job_status_writes_total", "Transitions de statut des report_jobs", ["mode"])
+except Exception:  # pragma: no cover
+    JOB_STATUS_WRITES = None  # type: ignore
+
+
+def transition_values(status: str, result: dict[str, Any] | None = None, at: datetime | None = None) -> dict[str, Any]:
+    """Colonnes à écrire pour une transition (horodatage pris au moment de la transition)."""
+    at = at or datetime.now(UTC)
+    values: dict[str, Any] = {"status": status}
+    if status == "started":
+        values["started_at"] = at
+    elif status in ("completed", "failed"):
+        values["finished_at"] = at
+        if result:
+            values["result"] = result
+    return values
+
+
+def write_transitions(db: Session, transitions: Iterable[tuple[int, dict[str, Any]]]) -> int:
+    """Écrit les transitions (job_id, colonnes), un executemany par forme de transition.
+
+    Ne commite pas. Retourne le nombre de transitions écrites.
+    """
+    table = cast(Table, models.ReportJob.__table__)
+    groups: dict[tuple[bool, tuple[str, ...]], list[dict[str, Any]]] = {}
+    for job_id, values in transitions:
+        terminal = values.get("status") in TERMINAL_STATUSES
+        groups.setdefault((terminal, tuple(sorted(values))), []).append(
+            {"job_id": job_id, **{f"v_{k}": v for k, v in values.items()}}
+        )
+    written = 0
+    for (terminal, columns), params in groups.items():
+        assignments: dict[str, Any] = {c: bindparam(f"v_{c}", type_=table.c[c].type) for c in columns}
+        if not terminal and "status" in assignments:
+            # Une transition intermédiaire ne remplace pas un statut terminal déjà écrit (pas de
+            # IN (...): paramètre « expanding » refusé par executemany)
+            terminal_now = or_(*(table.c.status == s for s in TERMINAL_STATUSES))
+            assignments["status"] = case((terminal_now, table.c.status), else_=assignments["status"])
+        db.execute(update(table).where(table.c.id == bindparam("job_id")).values(assignments), params)
+        written += len(params)
+    return written
+
+
+def buffer_transition(job_id: int, values: dict[str, Any]) -> int:
+    """Pousse la transition dans la liste Redis; retourne la longueur de la liste."""
+    return int(get_redis().rpush(BUFFER_KEY, json.dumps({"job_id": job_id, "values": values}, default=str)))
+
+
+def _decode(raw: str) -> tuple[int, dict[str, Any]]:
+    item = json.loads(raw)
+    values = item["values"]
+    for key in _TIMESTAMPS:
+        if key in values:
+            values[key] = datetime.fromisoformat(values[key])
+    return int(item["job_id"]), values
+
+
+def coalesce(transitions: Iterable[tuple[int, dict[str, Any]]]) -> list[tuple[int, dict[str, Any]]]:
+    """Fusionne les transitions successives de chaque job (ordre conservé, la dernière l'emporte)."""
+    merged: dict[int, dict[str, Any]] = {}
+    for job_id, values in transitions:
+        merged.setdefault(job_id, {}).update(values)
+    return list(merged.items())
+
+
+def flush_buffer(db: Session, limit: int | None = None) -> int:
+    """Écrit (et commite) un lot de transitions de la liste Redis; retourne le nombre de jobs écrits.
+
+    Le lot est retiré atomiquement (MULTI LRANGE + LTRIM): des flushs concurrents ne se
+    partagent jamais une transition. En cas d'échec d'écriture, le lot est remis en tête.
+    """
+    limit = limit or get_settings().job_status_flush_size
+    redis_client = get_redis()
+    pipe = redis_client.pipeline()
+    pipe.lrange(BUFFER_KEY, 0, limit - 1)
+    pipe.ltrim(BUFFER_KEY, limit, -1)
+    raw, _ = pipe.execute()
+    if not raw:
+        return 0
+    transitions = coalesce(_decode(r) for r in raw)
+    try:
+        write_transitions(db, transitions)
+        db.commit()
+    except Exception:
+        db.rollback()
+        redis_client.lpush(BUFFER_KEY, *reversed(raw))
+        raise
+    if JOB_STATUS_WRITES:
+        JOB_STATUS_WRITES.labels("flushed").inc(len(raw))
+    return len(transitions)
+
+
+def flush_all(db: Session) -> int:
+    """Vide la liste (arrêt d'un worker, tâche périodique)."""
+    total = 0
+    while written := flush_buffer(db):
+        total += written
+    return total
+
+
+def record_transition(db: Session, job_id: int, status: str, result: dict[str, Any] | None = None) -> None:
+    values = transition_values(status, result)
+    settings = get_settings()
+    if settings.job_status_coalesce and status not in TERMINAL_STATUSES:
+        try:
+            pending = buffer_transition(job_id, values)
+        except Exception:
+            pass  # Redis indisponible: écriture directe
+        else:
+            if JOB_STATUS_WRITES:
+                JOB_STATUS_WRITES.labels("buffered").inc()
+            if pending >= settings.job_status_flush_size:
+                try:
+                    flush_buffer(db)
+                except Exception as exc:  # lot remis en file, repris au prochain flush
+                    logger.warning(f"Flush des statuts de jobs reporté: {exc}")
+            return
+    try:
+        write_transitions(db, [(job_id, values)])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if JOB_STATUS_WRITES:
+        JOB_STATUS_WRITES.labels("direct").inc()
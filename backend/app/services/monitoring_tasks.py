@@ -112,3 +112,20 @@ def generate_daily_metrics_report() -> dict[str, Any]:
         
     finally:
         db.close()
+
+
+@celery_app.task(queue="celery")
+def reconcile_portfolio_summaries() -> dict[str, Any]:
+    """Recalcule les tables de synthèse du portefeuille et corrige les écarts."""
+    from loguru import logger
+
+    from backend.app.services.portfolio_summary import reconcile
+
+    db = SessionLocal()
+    try:
+        drift = reconcile(db)
+        if any(drift.values()):
+            logger.warning(f"Tables de synthèse du portefeuille corrigées: {drift}")
+        return {"reconciled_at": datetime.now(UTC).isoformat(), "drift": drift}
+    finally:
+        db.close()
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+"""Tables de synthèse du portefeuille (tableaux de bord, page d'accueil des agents).
+
+ - portfolio_summaries: nombre de polices et primes par (agent, compagnie, statut, devise)
+ - portfolio_expiries: polices actives par (agent, compagnie, mois d'expiration, devise)
+L'agent est le propriétaire du client de la police; 0 remplace un propriétaire ou une
+compagnie absents.
+
+Mise à jour incrémentale: chaque écriture de police (routes policies, imports) appelle
+apply_delta dans sa transaction. Les contributions retirées et ajoutées sont compensées
+par clé, puis appliquées en un upsert par table (INSERT ... ON CONFLICT DO UPDATE SET policies = policies + excluded.policies).
+Les écritures hors de ces chemins (scripts, SQL direct) sont rattrapées par reconcile
+(tâche périodique monitoring_tasks.reconcile_portfolio_summaries), qui recalcule les
+tables par GROUP BY et corrige les lignes divergentes.
+
+Lecture (read_summary): quelques lignes par agent ou par compagnie, lues par index, sans
+parcourir les polices.
+"""
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import UTC, date, datetime
+from typing import Any, cast
+
+from sqlalchemy import ColumnClause, Table, delete, func, literal_column, select, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from backend.app.db import models
+
+# Valeurs par défaut serveur de policies.status / policies.currency (colonnes encore
+# vides avant le flush d'une police créée)
+DEFAULT_STATUS = "active"
+DEFAULT_CURRENCY = "XAF"
+EXPIRY_STATUS = "active"  # seules les polices actives alimentent l'échéancier
+UPSERT_BATCH = 500
+
+SUMMARY = cast(Table, models.PortfolioSummary.__table__)
+EXPIRY = cast(Table, models.PortfolioExpiry.__table__)
+SUMMARY_KEY = ("owner_id", "company_id", "status", "currency")
+EXPIRY_KEY = ("owner_id", "company_id", "expiry_month", "currency")
+
+Totals = dict[tuple[Any, ...], tuple[int, int]]  # clé -> (polices, primes)
+
+
+@dataclass(frozen=True)
+class Contribution:
+    """Part d'une police dans les tables de synthèse."""
+
+    owner_id: int
+    company_id: int
+    status: str
+    currency: str
+    premium: int
+    expiry_month: str | None  # None: police non active ou sans date d'expiration
+
+
+def expiry_month(value: datetime | None) -> str | None:
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC)
+    return value.strftime("%Y-%m")
+
+
+def contribution(
+    owner_id: int | None, company_id: int | None, status: str | None, currency: str | None, premium: int | None, expiry: datetime | None
+) -> Contribution:
+    status = status or DEFAULT_STATUS
+    return Contribution(
+        owner_id=owner_id or 0,
+        company_id=company_id or 0,
+        status=status,
+        currency=currency or DEFAULT_CURRENCY,
+        premium=premium or 0,
+        expiry_month=expiry_month(expiry) if status == EXPIRY_STATUS else None,
+    )
+
+
+def policy_contribution(policy: models.Policy, owner_id: int | None) -> Contribution:
+    """Contribution d'une police (créée ou chargée) dont le client appartient à owner_id."""
+    return contribution(owner_id, policy.company_id, policy.status, policy.currency, policy.premium_amount, policy.expiry_date)
+
+
+def _deltas(removed: Iterable[Contribution], added: Iterable[Contribution]) -> tuple[Totals, Totals]:
+    summaries: dict[tuple[Any, ...], list[int]] = {}
+    expiries: dict[tuple[Any, ...], list[int]] = {}
+    for sign, items in ((-1, removed), (1, added)):
+        for item in items:
+            targets = [summaries.setdefault((item.owner_id, item.company_id, item.status, item.currency), [0, 0])]
+            if item.expiry_month:
+                targets.append(expiries.setdefault((item.owner_id, item.company_id, item.expiry_month, item.currency), [0, 0]))
+            for target in targets:
+                target[0] += sign
+                target[1] += sign * item.premium
+    # Une police modifiée sans changement de clé ni de prime ne produit aucune écriture
+    return (
+        {key: (p, t) for key, (p, t) in summaries.items() if p or t},
+        {key: (p, t) for key, (p, t) in expiries.items() if p or t},
+    )
+
+
+def _insert(db: Session, table: Table) -> postgresql.Insert | sqlite.Insert:
+    """INSERT du dialecte de la session (seuls PostgreSQL et SQLite savent faire ON CONFLICT DO UPDATE)."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def _upsert(db: Session, table: Table, keys: Sequence[str], totals: Totals, increment: bool) -> None:
+    if not totals:
+        return
+    items = list(totals.items())
+    for offset in range(0, len(items), UPSERT_BATCH):
+        # Clés uniques dans un même INSERT (exigé par ON CONFLICT DO UPDATE)
+        stmt = _insert(db, table).values([
+            {**dict(zip(keys, key)), "policies": policies, "premium_total": premium}
+            for key, (policies, premium) in items[offset:offset + UPSERT_BATCH]
+        ])
+        if increment:
+            values = {"policies": table.c.policies + stmt.excluded.policies, "premium_total": table.c.premium_total + stmt.excluded.premium_total}
+        else:
+            values = {"policies": stmt.excluded.policies, "premium_total": stmt.excluded.premium_total}
+        db.execute(stmt.on_conflict_do_update(index_elements=list(keys), set_={**values, "updated_at": func.now()}))
+
+
+def apply_delta(db: Session, removed: Iterable[Contribution] = (), added: Iterable[Contribution] = ()) -> None:
+    """Reporte le retrait et l'ajout de polices (au plus un upsert par table; ne commite pas)."""
+    summaries, expiries = _deltas(removed, added)
+    _upsert(db, SUMMARY, SUMMARY_KEY, summaries, increment=True)
+    _upsert(db, EXPIRY, EXPIRY_KEY, expiries, increment=True)
+
+
+def _expected(db: Session) -> tuple[Totals, Totals]:
+    """Totaux recalculés depuis les polices (GROUP BY par position: mêmes expressions partout)."""
+    owner = func.coalesce(models.Client.owner_id, 0)
+    company = func.coalesce(models.Policy.company_id, 0)
+    status = func.coalesce(models.Policy.status, DEFAULT_STATUS)
+    currency = func.coalesce(models.Policy.currency, DEFAULT_CURRENCY)
+    if db.get_bind().dialect.name == "postgresql":
+        month = func.to_char(func.timezone("UTC", models.Policy.expiry_date), "YYYY-MM")
+    else:
+        month = func.strftime("%Y-%m", models.Policy.expiry_date)
+    measures = (func.count(), func.coalesce(func.sum(models.Policy.premium_amount), 0))
+    positions: list[ColumnClause[Any]] = [literal_column(str(i)) for i in range(1, 5)]
+    base = select().select_from(models.Policy).join(models.Client, models.Client.id == models.Policy.client_id)
+    summaries = base.add_columns(owner, company, status, currency, *measures).group_by(*positions)
+    expiries = (
+        base.add_columns(owner, company, month, currency, *measures)
+        .where(status == EXPIRY_STATUS, models.Policy.expiry_date.isnot(None))
+        .group_by(*positions)
+    )
+    return (
+        {tuple(row[:4]): (int(row[4]), int(row[5])) for row in db.execute(summaries)},
+        {tuple(row[:4]): (int(row[4]), int(row[5])) for row in db.execute(expiries)},
+    )
+
+
+def reconcile(db: Session) -> dict[str, int]:
+    """Recalcule les tables de synthèse et corrige les écarts; commite.
+
+    Retourne le nombre de lignes corrigées par table (0 en régime établi). Sous PostgreSQL,
+    les tables sont verrouillées (EXCLUSIVE: lectures permises, deltas concurrents mis en
+    attente) avant le recalcul: un delta est soit vu par le GROUP BY, soit appliqué après
+    la correction, jamais perdu ni compté deux fois.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE portfolio_summaries, portfolio_expiries IN EXCLUSIVE MODE"))
+    drift: dict[str, int] = {}
+    for table, keys, expected in zip((SUMMARY, EXPIRY), (SUMMARY_KEY, EXPIRY_KEY), _expected(db)):
+        key_columns = [table.c[k] for k in keys]
+        current: Totals = {
+            tuple(row[:4]): (row[4], row[5])
+            for row in db.execute(select(*key_columns, table.c.policies, table.c.premium_total))
+        }
+        changed = {key: value for key, value in expected.items() if current.get(key) != value}
+        stale = [key for key in current if key not in expected]
+        _upsert(db, table, keys, changed, increment=False)
+        for offset in range(0, len(stale), UPSERT_BATCH):
+            db.execute(delete(table).where(tuple_(*key_columns).in_(stale[offset:offset + UPSERT_BATCH])))
+        drift[table.name] = len(changed) + len(stale)
+    db.commit()
+    return drift
+
+
+def month_span(start: date, months: int) -> tuple[str, str]:
+    """Premier et dernier mois (AAAA-MM) d'une fenêtre de months mois commençant à start."""
+    last = start.year * 12 + start.month - 1 + months - 1
+    return f"{start.year:04d}-{start.month:02d}", f"{last // 12:04d}-{last % 12 + 1:02d}"
+
+
+def read_summary(db: Session, owner_id: int | None = None, company_id: int | None = None, months: int = 3, today: date | None = None) -> dict[str, Any]:
+    """Synthèse d'un agent et/ou d'une compagnie (tout le portefeuille sans filtre).
+
+    Deux requêtes sur les tables de synthèse; échéancier limité aux months mois à venir
+    (mois courant inclus).
+    """
+    first, last = month_span(today or datetime.now(UTC).date(), months)
+    summary_filters = [SUMMARY.c.policies != 0]
+    expiry_filters = [EXPIRY.c.policies != 0, EXPIRY.c.expiry_month.between(first, last)]
+    for column, value in (("owner_id", owner_id), ("company_id", company_id)):
+        if value is not None:
+            summary_filters.append(SUMMARY.c[column] == value)
+            expiry_filters.append(EXPIRY.c[column] == value)
+    by_status = db.execute(
+        select(SUMMARY.c.status, SUMMARY.c.currency, func.sum(SUMMARY.c.policies), func.sum(SUMMARY.c.premium_total))
+        .where(*summary_filters)
+        .group_by(SUMMARY.c.status, SUMMARY.c.currency)
+        .order_by(SUMMARY.c.status, SUMMARY.c.currency)
+    ).all()
+    expiries = db.execute(
+        select(EXPIRY.c.expiry_month, EXPIRY.c.currency, func.sum(EXPIRY.c.policies), func.sum(EXPIRY.c.premium_total))
+        .where(*expiry_filters)
+        .group_by(EXPIRY.c.expiry_month, EXPIRY.c.currency)
+        .order_by(EXPIRY.c.expiry_month, EXPIRY.c.currency)
+    ).all()
+    premium_by_currency: dict[str, int] = {}
+    for _, currency, _, premium in by_status:
+        premium_by_currency[currency] = premium_by_currency.get(currency, 0) + int(premium)
+    return {
+        "owner_id": owner_id,
+        "company_id": company_id,
+        "policies": sum(int(row[2]) for row in by_status),
+        "premium_by_currency": premium_by_currency,
+        "by_status": [
+            {"status": status, "currency": currency, "policies": int(policies), "premium_total": int(premium)}
+            for status, currency, policies, premium in by_status
+        ],
+        "upcoming_expiries": [
+            {"month": month, "currency": currency, "policies": int(policies), "premium_total": int(premium)}
+            for month, currency, policies, premium in expiries
+        ],
+    }
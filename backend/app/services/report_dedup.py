@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+"""Regroupement des demandes de rapport identiques (double clic, tableaux de bord concurrents).
+
+Une demande est identifiée par l'empreinte de son type et de ses paramètres normalisés
+(dedup_key: valeurs nulles retirées, clés triées, SHA-256), enregistrée sur le report_job.
+Une demande identique:
+ - à un job en cours (pending, queued, started, retry_n) est rattachée à sa tâche Celery
+   (même job_id, même flux d'événements)
+ - à un job terminé depuis moins de REPORT_DEDUP_TTL secondes reçoit ce job et son document
+   au lieu d'en produire un nouveau
+Deux demandes simultanées ne se voient pas encore en base: chacune enregistre son job
+(tâche pré-identifiée) puis réserve l'empreinte dans Redis (SET NX, même TTL); la perdante
+supprime son job et reprend celui de la gagnante (claim). Sans Redis, seule la recherche en
+base s'applique. Les jobs en échec ou annulés ne sont jamais réutilisés.
+"""
+import hashlib
+import json
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.core.redis import get_redis
+from backend.app.db import models
+from backend.app.services.job_status_buffer import TERMINAL_STATUSES
+from backend.app.services.report_scheduling import ACTIVE_WINDOW
+
+KEY_PREFIX = "report_dedup:"
+# Paramètres sans effet sur le document produit, par type de rapport lourd
+IGNORED_PARAMS = {"analysis": ("pages",)}
+
+
+def dedup_key(job_type: str, params: dict[str, Any]) -> str | None:
+    """Empreinte de la demande; None si le regroupement est désactivé."""
+    if get_settings().report_dedup_ttl <= 0:
+        return None
+    ignored = IGNORED_PARAMS.get(params.get("report_type", ""), ())
+    normalised = {k: v for k, v in params.items() if v is not None and k not in ignored}
+    payload = json.dumps({"job_type": job_type, "params": normalised}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _reusable(job: models.ReportJob, now: datetime) -> bool:
+    if not job.celery_task_id or job.status in ("failed", "cancelled"):
+        return False
+    if job.status not in TERMINAL_STATUSES:
+        return True
+    finished = job.finished_at
+    if finished is not None and finished.tzinfo is None:
+        finished = finished.replace(tzinfo=UTC)  # SQLite: horodatages relus sans fuseau
+    return finished is not None and finished >= now - timedelta(seconds=get_settings().report_dedup_ttl)
+
+
+def find_reusable_job(db: Session, key: str) -> models.ReportJob | None:
+    """Dernier job réutilisable pour l'empreinte (une requête, index dedup_key)."""
+    now = datetime.now(UTC)
+    ttl = timedelta(seconds=get_settings().report_dedup_ttl)
+    job = (
+        db.query(models.ReportJob)
+        .filter(
+            models.ReportJob.dedup_key == key,
+            models.ReportJob.celery_task_id.isnot(None),
+            models.ReportJob.created_at >= now - max(ACTIVE_WINDOW, ttl),
+            or_(models.ReportJob.status.notin_(TERMINAL_STATUSES), models.ReportJob.finished_at >= now - ttl),
+        )
+        .order_by(models.ReportJob.id.desc())
+        .first()
+    )
+    return job if job is not None and _reusable(job, now) else None
+
+
+def claim(db: Session, key: str, task_id: str) -> models.ReportJob | None:
+    """Réserve l'empreinte pour task_id; retourne le job d'une demande concurrente l'ayant déjà réservée.
+
+    À appeler une fois le job de la demande commité: la gagnante est alors visible en base.
+    Une réservation pointant vers un job non réutilisable (échec, expiré) est reprise.
+    """
+    redis_key = f"{KEY_PREFIX}{key}"
+    ttl = get_settings().report_dedup_ttl
+    try:
+        redis_client = get_redis()
+        if redis_client.set(redis_key, task_id, nx=True, ex=ttl):
+            return None
+        owner = redis_client.get(redis_key)
+    except Exception:
+        return None  # Redis indisponible: recherche en base seule
+    if owner and owner != task_id:
+        job = db.query(models.ReportJob).filter(models.ReportJob.celery_task_id == owner).first()
+        if job is not None and _reusable(job, datetime.now(UTC)):
+            return job
+    try:
+        redis_client.set(redis_key, task_id, ex=ttl)
+    except Exception:
+        pass
+    return None
+
+
+def attached_response(job: models.ReportJob) -> dict[str, Any]:
+    """Champs de ReportJobLaunchResponse pour une demande rattachée à un job existant."""
+    document_id = (job.result or {}).get("document_id") if job.status == "completed" else None
+    return {
+        "job_id": job.celery_task_id,
+        "status": job.status or "queued",
+        "report_job_id": job.id,
+        "queue": job.queue,
+        "deduplicated": True,
+        "document_id": document_id,
+    }
@@ -0,0 +1,480 @@
+from __future__ import annotations
+
+"""Moteur des rapports lourds (tâche Celery generate_heavy_report).
+
+Les données du portefeuille (polices + client + compagnie, lignes de déclaration) sont lues
+en flux (select Core + yield_per, aucune entité ORM chargée) et agrégées dans un
+PortfolioAggregate:
+ - totaux de primes par devise et nombre de polices par statut
+ - par compagnie: polices, primes par devise, primes déclarées et commissions
+ - échéancier des expirations (expirées, 0-30, 31-60, 61-90, > 90 jours), primes par devise
+ - primes par mois d'effet
+Avec NumPy, les polices sont agrégées en colonnes (services.analytics, mêmes résultats).
+Un agrégat est fusionnable (merge) et sérialisable en JSON (as_dict / from_dict): au-delà
+de REPORT_CHUNK_SIZE polices, l'agrégation est découpée en morceaux (plan_chunks: tranches
+d'id de même effectif + un morceau pour les déclarations) calculés par des sous-tâches
+Celery puis fusionnés (celery_report_tasks: chord map / reduce).
+
+Le document est ensuite écrit au fil de l'eau via document_renderer (PDF: lignes; XLSX:
+classeur write_only, détail des polices relu en flux), stocké via le backend configuré et
+enregistré comme GeneratedDocument. Le résultat indique les volumes (lignes, octets, pages)
+et les temps réellement mesurés.
+"""
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from io import BytesIO
+from typing import Any, overload
+
+from sqlalchemy import ColumnElement, Select, func, select
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.services import analytics
+from backend.app.services.document_renderer import store_output, write_pdf_lines, write_xlsx_sheets
+from backend.app.services.storage_provider import get_storage
+
+REPORT_TYPES = ("pdf", "excel", "analysis")
+EXPIRY_BUCKETS = ((0, "expired"), (30, "0-30"), (60, "31-60"), (90, "61-90"))
+EXPIRY_LAST_BUCKET = ">90"
+PDF_LINES_PER_PAGE = 51  # A4, interligne 15 pt (document_renderer.write_pdf_lines)
+NO_COMPANY = "(sans compagnie)"
+
+ProgressCallback = Callable[[float], None]
+
+
+@dataclass
+class ReportFilters:
+    company_id: int | None = None
+    status: str | None = None
+    period_start: datetime | None = None  # bornes sur la date d'effet des polices
+    period_end: datetime | None = None
+    id_from: int | None = None  # tranche d'id des polices (morceau), bornes incluse / exclue
+    id_to: int | None = None
+
+    @classmethod
+    def from_params(cls, params: dict[str, Any]) -> ReportFilters:
+        def _date(value: Any) -> datetime | None:
+            return datetime.fromisoformat(value) if isinstance(value, str) and value else None
+
+        return cls(
+            company_id=params.get("company_id"),
+            status=params.get("status"),
+            period_start=_date(params.get("period_start")),
+            period_end=_date(params.get("period_end")),
+            id_from=params.get("id_from"),
+            id_to=params.get("id_to"),
+        )
+
+
+def _add(totals: dict[str, int], key: str, amount: int) -> None:
+    totals[key] = totals.get(key, 0) + amount
+
+
+def _merge_totals(target: dict[str, int], other: dict[str, int]) -> None:
+    for key, amount in other.items():
+        _add(target, key, amount)
+
+
+@overload
+def _aware(value: datetime) -> datetime: ...
+
+
+@overload
+def _aware(value: None) -> None: ...
+
+
+def _aware(value: datetime | None) -> datetime | None:
+    # SQLite renvoie des dates naïves (stockées en UTC)
+    return value.replace(tzinfo=UTC) if value is not None and value.tzinfo is None else value
+
+
+def expiry_bucket(expiry: datetime | None, today: datetime) -> str | None:
+    expiry = _aware(expiry)
+    if expiry is None:
+        return None
+    days = (expiry - today).days
+    if days < 0:
+        return EXPIRY_BUCKETS[0][1]
+    for limit, label in EXPIRY_BUCKETS[1:]:
+        if days <= limit:
+            return label
+    return EXPIRY_LAST_BUCKET
+
+
+@dataclass
+class PortfolioAggregate:
+    policies: int = 0
+    declaration_items: int = 0
+    premium_by_currency: dict[str, int] = field(default_factory=dict)
+    policies_by_status: dict[str, int] = field(default_factory=dict)
+    companies: dict[str, dict[str, Any]] = field(default_factory=dict)
+    expiries: dict[str, dict[str, Any]] = field(default_factory=dict)
+    monthly: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    def _company(self, name: str | None) -> dict[str, Any]:
+        return self.companies.setdefault(name or NO_COMPANY, {"policies": 0, "premium": {}, "declared_premium": 0, "commission": 0})
+
+    def add_policy(self, company: str | None, status: str | None, currency: str | None, premium: int | None,
+                   effective: datetime | None, expiry: datetime | None, today: datetime) -> None:
+        currency = currency or "XAF"
+        premium = premium or 0
+        self.policies += 1
+        _add(self.premium_by_currency, currency, premium)
+        _add(self.policies_by_status, status or "unknown", 1)
+        entry = self._company(company)
+        entry["policies"] += 1
+        _add(entry["premium"], currency, premium)
+        bucket = expiry_bucket(expiry, today)
+        if bucket:
+            pipeline = self.expiries.setdefault(bucket, {"policies": 0, "premium": {}})
+            pipeline["policies"] += 1
+            _add(pipeline["premium"], currency, premium)
+        effective = _aware(effective)
+        if effective is not None:
+            _add(self.monthly.setdefault(effective.strftime("%Y-%m"), {}), currency, premium)
+
+    def add_declaration(self, company: str | None, premium: int | None, commission: int | None) -> None:
+        self.declaration_items += 1
+        entry = self._company(company)
+        entry["declared_premium"] += premium or 0
+        entry["commission"] += commission or 0
+
+    def merge(self, other: PortfolioAggregate) -> PortfolioAggregate:
+        self.policies += other.policies
+        self.declaration_items += other.declaration_items
+        _merge_totals(self.premium_by_currency, other.premium_by_currency)
+        _merge_totals(self.policies_by_status, other.policies_by_status)
+        for name, theirs in other.companies.items():
+            entry = self._company(name)
+            for key in ("policies", "declared_premium", "commission"):
+                entry[key] += theirs[key]
+            _merge_totals(entry["premium"], theirs["premium"])
+        for bucket, theirs in other.expiries.items():
+            pipeline = self.expiries.setdefault(bucket, {"policies": 0, "premium": {}})
+            pipeline["policies"] += theirs["policies"]
+            _merge_totals(pipeline["premium"], theirs["premium"])
+        for month, totals in other.monthly.items():
+            _merge_totals(self.monthly.setdefault(month, {}), totals)
+        return self
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "policies": self.policies,
+            "declaration_items": self.declaration_items,
+            "premium_by_currency": self.premium_by_currency,
+            "policies_by_status": self.policies_by_status,
+            "companies": self.companies,
+            "expiries": self.expiries,
+            "monthly": dict(sorted(self.monthly.items())),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> PortfolioAggregate:
+        return cls(**data)
+
+
+def policy_criteria(filters: ReportFilters) -> list[ColumnElement[bool]]:
+    criteria: list[ColumnElement[bool]] = []
+    if filters.company_id is not None:
+        criteria.append(models.Policy.company_id == filters.company_id)
+    if filters.status:
+        criteria.append(models.Policy.status == filters.status)
+    if filters.period_start:
+        criteria.append(models.Policy.effective_date >= filters.period_start)
+    if filters.period_end:
+        criteria.append(models.Policy.effective_date < filters.period_end)
+    if filters.id_from is not None:
+        criteria.append(models.Policy.id >= filters.id_from)
+    if filters.id_to is not None:
+        criteria.append(models.Policy.id < filters.id_to)
+    return criteria
+
+
+def policy_query(filters: ReportFilters) -> Select[Any]:
+    return (
+        select(
+            models.Policy.id,
+            models.Policy.policy_number,
+            models.Client.last_name,
+            models.Client.first_name,
+            models.Company.name.label("company"),
+            models.Policy.product_name,
+            models.Policy.status,
+            models.Policy.currency,
+            models.Policy.premium_amount,
+            models.Policy.effective_date,
+            models.Policy.expiry_date,
+        )
+        .join(models.Client, models.Client.id == models.Policy.client_id)
+        .outerjoin(models.Company, models.Company.id == models.Policy.company_id)
+        .where(*policy_criteria(filters))
+        .order_by(models.Policy.id)
+    )
+
+
+def declaration_query(filters: ReportFilters) -> Select[Any]:
+    stmt = (
+        select(models.Company.name.label("company"), models.DeclarationItem.premium_amount, models.DeclarationItem.commission_amount)
+        .join(models.DeclarationBatch, models.DeclarationBatch.id == models.DeclarationItem.batch_id)
+        .outerjoin(models.Company, models.Company.id == models.DeclarationBatch.company_id)
+    )
+    if filters.company_id is not None:
+        stmt = stmt.where(models.DeclarationBatch.company_id == filters.company_id)
+    if filters.period_start:
+        stmt = stmt.where(models.DeclarationBatch.period_end >= filters.period_start)
+    if filters.period_end:
+        stmt = stmt.where(models.DeclarationBatch.period_start < filters.period_end)
+    return stmt.order_by(models.DeclarationItem.id)
+
+
+def stream(db: Session, stmt: Select[Any]) -> Iterator[Any]:
+    """Lignes lues par lots (curseur serveur sur PostgreSQL), sans entités ORM."""
+    batch = get_settings().report_stream_batch
+    for partition in db.execute(stmt.execution_options(yield_per=batch)).partitions():
+        yield from partition
+
+
+def aggregate_portfolio(db: Session, filters: ReportFilters, progress: ProgressCallback | None = None,
+                        policies: bool = True, declarations: bool = True) -> PortfolioAggregate:
+    """Agrège polices et déclarations en un passage chacune (progress: fraction 0-1)."""
+    agg = PortfolioAggregate()
+    if policies and analytics.NUMPY_AVAILABLE:
+        # Chargement en colonnes et calculs vectorisés (services.analytics)
+        frame = analytics.load_policy_frame(db, policy_criteria(filters), progress)
+        agg.merge(PortfolioAggregate.from_dict(analytics.portfolio_totals(frame, datetime.now(UTC), NO_COMPANY)))
+    elif policies:
+        today = datetime.now(UTC)
+        total = db.execute(select(func.count()).select_from(policy_query(filters).order_by(None).subquery())).scalar_one()
+        batch = get_settings().report_stream_batch
+        for row in stream(db, policy_query(filters)):
+            agg.add_policy(row.company, row.status, row.currency, row.premium_amount, row.effective_date, row.expiry_date, today)
+            if progress and total and agg.policies % batch == 0:
+                progress(agg.policies / total)
+    if declarations:
+        for row in stream(db, declaration_query(filters)):
+            agg.add_declaration(row.company, row.premium_amount, row.commission_amount)
+    if progress:
+        progress(1.0)
+    return agg
+
+
+def plan_chunks(db: Session, params: dict[str, Any], chunk_size: int) -> list[dict[str, Any]]:
+    """Découpe l'agrégation en morceaux d'au plus chunk_size polices; [] si un seul suffit.
+
+    Les bornes sont les ids de rang 1, chunk_size + 1, ... parmi les polices filtrées (une
+    requête, fonction de fenêtre row_number): chaque tranche [id_from, id_to) compte
+    chunk_size polices au moment du découpage. Les déclarations forment un morceau à part.
+    """
+    if chunk_size <= 0:
+        return []
+    numbered = (
+        policy_query(ReportFilters.from_params(params))
+        .with_only_columns(models.Policy.id, func.row_number().over(order_by=models.Policy.id).label("rn"))
+        .order_by(None)
+        .subquery()
+    )
+    bounds = list(db.execute(select(numbered.c.id).where((numbered.c.rn - 1) % chunk_size == 0).order_by(numbered.c.id)).scalars())
+    if len(bounds) <= 1:
+        return []
+    chunks: list[dict[str, Any]] = [{"id_from": lo, "id_to": hi} for lo, hi in zip(bounds, [*bounds[1:], None])]
+    return [*chunks, {"declarations": True}]
+
+
+def aggregate_chunk(db: Session, params: dict[str, Any], chunk: dict[str, Any]) -> PortfolioAggregate:
+    filters = ReportFilters.from_params({**params, **chunk})
+    if chunk.get("declarations"):
+        return aggregate_portfolio(db, filters, policies=False)
+    return aggregate_portfolio(db, filters, declarations=False)
+
+
+def _amounts(totals: dict[str, int]) -> str:
+    return ", ".join(f"{amount:,} {currency}".replace(",", " ") for currency, amount in sorted(totals.items())) or "0"
+
+
+def summary_lines(title: str, agg: PortfolioAggregate, filters: ReportFilters) -> Iterator[str]:
+    yield title
+    yield f"Généré le {datetime.now(UTC):%Y-%m-%d %H:%M} UTC"
+    if filters.company_id is not None or filters.status or filters.period_start or filters.period_end:
+        yield f"Filtres: compagnie={filters.company_id or '-'} statut={filters.status or '-'} période={filters.period_start or '-'} / {filters.period_end or '-'}"
+    yield ""
+    yield f"Polices: {agg.policies}    Primes: {_amounts(agg.premium_by_currency)}"
+    yield "Par statut: " + ", ".join(f"{status}={count}" for status, count in sorted(agg.policies_by_status.items()))
+    yield ""
+    yield "Commissions par compagnie"
+    for name, entry in sorted(agg.companies.items(), key=lambda item: -item[1]["commission"]):
+        yield f"  {name[:40]:<40} polices={entry['policies']:<7} primes={_amounts(entry['premium'])}  déclaré={entry['declared_premium']}  commission={entry['commission']}"
+    yield ""
+    yield "Échéancier des expirations"
+    for _, label in (*EXPIRY_BUCKETS, (None, EXPIRY_LAST_BUCKET)):
+        pipeline = agg.expiries.get(label, {"policies": 0, "premium": {}})
+        yield f"  {label:<8} polices={pipeline['policies']:<7} primes={_amounts(pipeline['premium'])}"
+
+
+def _policy_line(row: Any) -> str:
+    client = f"{row.last_name} {row.first_name}"
+    expiry = f"{_aware(row.expiry_date):%Y-%m-%d}" if row.expiry_date else ""
+    return (
+        f"{row.policy_number:<20} {client[:28]:<28} {(row.company or NO_COMPANY)[:20]:<20}"
+        f" {row.status or '':<10} {row.premium_amount or 0:>12} {row.currency or ''} {expiry}"
+    )
+
+
+def _policy_row(row: Any) -> tuple[Any, ...]:
+    return (
+        row.policy_number, f"{row.last_name} {row.first_name}", row.company or NO_COMPANY, row.product_name,
+        row.status, row.currency, row.premium_amount,
+        _aware(row.effective_date).date() if row.effective_date else None,
+        _aware(row.expiry_date).date() if row.expiry_date else None,
+    )
+
+
+@dataclass
+class RenderedReport:
+    data: bytes
+    extension: str
+    pages: int | None = None
+    sheets: int | None = None
+    detail_rows: int = 0
+
+
+def render_pdf(db: Session, title: str, agg: PortfolioAggregate, filters: ReportFilters, detail_pages: int) -> RenderedReport:
+    """Synthèse puis, si detail_pages > 0, détail des polices (relu en flux, borné au nombre de pages)."""
+    report = RenderedReport(b"", "pdf")
+
+    def _lines() -> Iterator[str]:
+        yield from summary_lines(title, agg, filters)
+        if detail_pages <= 0:
+            return
+        yield ""
+        yield "Détail des polices"
+        limit = detail_pages * PDF_LINES_PER_PAGE
+        for row in stream(db, policy_query(filters).limit(limit)):
+            report.detail_rows += 1
+            yield _policy_line(row)
+
+    buffer = BytesIO()
+    report.pages = write_pdf_lines(_lines(), buffer)
+    report.data = buffer.getvalue()
+    return report
+
+
+def render_analysis(title: str, agg: PortfolioAggregate, filters: ReportFilters) -> RenderedReport:
+    def _lines() -> Iterator[str]:
+        yield from summary_lines(title, agg, filters)
+        yield ""
+        yield "Primes par mois d'effet"
+        for month, totals in sorted(agg.monthly.items()):
+            yield f"  {month}  {_amounts(totals)}"
+
+    buffer = BytesIO()
+    pages = write_pdf_lines(_lines(), buffer)
+    return RenderedReport(buffer.getvalue(), "pdf", pages=pages)
+
+
+def render_excel(db: Session, agg: PortfolioAggregate, filters: ReportFilters) -> RenderedReport:
+    """Classeur write_only: synthèse, compagnies, expirations, mois, puis détail des polices en flux."""
+    report = RenderedReport(b"", "xlsx")
+    currencies = sorted(agg.premium_by_currency) or ["XAF"]
+
+    def _summary() -> Iterator[tuple[Any, ...]]:
+        yield ("Indicateur", "Valeur")
+        yield ("Polices", agg.policies)
+        yield ("Lignes de déclaration", agg.declaration_items)
+        for currency in currencies:
+            yield (f"Primes {currency}", agg.premium_by_currency.get(currency, 0))
+        for status, count in sorted(agg.policies_by_status.items()):
+            yield (f"Statut {status}", count)
+
+    def _companies() -> Iterator[tuple[Any, ...]]:
+        yield ("Compagnie", "Polices", *(f"Primes {c}" for c in currencies), "Primes déclarées", "Commissions")
+        for name, entry in sorted(agg.companies.items()):
+            yield (name, entry["policies"], *(entry["premium"].get(c, 0) for c in currencies), entry["declared_premium"], entry["commission"])
+
+    def _expiries() -> Iterator[tuple[Any, ...]]:
+        yield ("Échéance", "Polices", *(f"Primes {c}" for c in currencies))
+        for _, label in (*EXPIRY_BUCKETS, (None, EXPIRY_LAST_BUCKET)):
+            pipeline = agg.expiries.get(label, {"policies": 0, "premium": {}})
+            yield (label, pipeline["policies"], *(pipeline["premium"].get(c, 0) for c in currencies))
+
+    def _monthly() -> Iterator[tuple[Any, ...]]:
+        yield ("Mois", *(f"Primes {c}" for c in currencies))
+        for month, totals in sorted(agg.monthly.items()):
+            yield (month, *(totals.get(c, 0) for c in currencies))
+
+    def _policies() -> Iterator[tuple[Any, ...]]:
+        yield ("Police", "Client", "Compagnie", "Produit", "Statut", "Devise", "Prime", "Effet", "Expiration")
+        for row in stream(db, policy_query(filters).limit(get_settings().report_max_detail_rows)):
+            report.detail_rows += 1
+            yield _policy_row(row)
+
+    sheets = [("Synthèse", _summary()), ("Compagnies", _companies()), ("Expirations", _expiries()), ("Mois", _monthly()), ("Polices", _policies())]
+    buffer = BytesIO()
+    write_xlsx_sheets(sheets, buffer)
+    report.data = buffer.getvalue()
+    report.sheets = len(sheets)
+    return report
+
+
+def render_report(db: Session, report_type: str, agg: PortfolioAggregate, filters: ReportFilters, params: dict[str, Any]) -> RenderedReport:
+    if report_type == "pdf":
+        return render_pdf(db, "Rapport de portefeuille", agg, filters, detail_pages=int(params.get("pages") or 0))
+    if report_type == "excel":
+        return render_excel(db, agg, filters)
+    if report_type == "analysis":
+        return render_analysis("Analyse du portefeuille", agg, filters)
+    raise ValueError(f"Type de rapport non supporté: {report_type}")
+
+
+def store_report(db: Session, report_type: str, rendered: RenderedReport, metadata: dict[str, Any]) -> models.GeneratedDocument:
+    storage = get_storage(db)
+    stored = store_output(rendered.data, rendered.extension, storage)
+    doc = models.GeneratedDocument(
+        document_type=f"report_{report_type}",
+        file_path=stored.file_path,
+        mime_type=stored.mime_type,
+        size_bytes=stored.size,
+        status="generated",
+        doc_metadata={"checksum": stored.checksum, "format": rendered.extension, "storage": storage.name, "report_type": report_type, **metadata},
+    )
+    db.add(doc)
+    db.commit()
+    return doc
+
+
+def generate_report(db: Session, report_type: str, params: dict[str, Any], progress: ProgressCallback | None = None,
+                    aggregate: PortfolioAggregate | None = None) -> dict[str, Any]:
+    """Agrège (sauf agrégat fourni), rend, stocke; retourne le résultat de la tâche.
+
+    progress reçoit l'avancement de la phase d'agrégation (fraction 0-1).
+    """
+    if report_type not in REPORT_TYPES:
+        raise ValueError(f"Type de rapport non supporté: {report_type}")
+    filters = ReportFilters.from_params(params)
+    start = time.perf_counter()
+    agg = aggregate if aggregate is not None else aggregate_portfolio(db, filters, progress)
+    aggregated = time.perf_counter()
+    rendered = render_report(db, report_type, agg, filters, params)
+    rendered_at = time.perf_counter()
+    timings = {"aggregate_seconds": round(aggregated - start, 4), "render_seconds": round(rendered_at - aggregated, 4)}
+    rows = {"policies": agg.policies, "declaration_items": agg.declaration_items, "detail_rows": rendered.detail_rows}
+    doc = store_report(db, report_type, rendered, {"rows": rows, "timings": timings})
+    timings["store_seconds"] = round(time.perf_counter() - rendered_at, 4)
+    result: dict[str, Any] = {
+        "type": report_type,
+        "document_id": doc.id,
+        "file_path": doc.file_path,
+        "filename": doc.file_path.rsplit("/", 1)[-1] if doc.file_path else None,
+        "size_bytes": doc.size_bytes,
+        "rows": rows,
+        "timings": timings,
+        "totals": {"premium_by_currency": agg.premium_by_currency, "policies_by_status": agg.policies_by_status},
+        "status": "success",
+    }
+    if rendered.pages is not None:
+        result["pages"] = rendered.pages
+    if rendered.sheets is not None:
+        result["sheets"] = rendered.sheets
+    return result
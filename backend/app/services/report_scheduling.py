@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+"""Voies de priorité des rapports: files Celery reports_high, reports et reports_low.
+
+Choix de la file au lancement d'un rapport lourd (plan_heavy_report):
+ - priorité demandée (high, normal, low)
+ - coût estimé: nombre de polices couvertes par les filtres (une requête COUNT). Au plus
+   REPORT_QUICK_ROWS polices: voie rapide, sauf si low est demandé. Au-delà de
+   REPORT_HEAVY_ROWS: une voie plus bas (high -> normal, normal -> low), la voie rapide
+   restant réservée aux rapports courts
+ - part équitable: un utilisateur ayant déjà REPORT_USER_FAIR_SHARE rapports lourds en cours
+   (pending, queued, started, retry_n) voit les suivants relégués en voie basse; à
+   REPORT_USER_MAX_ACTIVE, le lancement est refusé (ReportQuotaExceeded -> 429)
+Les rapports factices, courts par construction, partent en voie rapide.
+
+Consommation pondérée (docker-compose.celery.yml): un worker est dédié à reports_high, les
+autres consomment les trois files à tour de rôle (rotation des files par kombu). Une rafale
+de rapports lourds n'occupe donc jamais tous les slots capables de servir un rapport court.
+"""
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.services.job_status_buffer import TERMINAL_STATUSES
+from backend.app.services.report_engine import ReportFilters, policy_criteria
+
+LANES = {"high": "reports_high", "normal": "reports", "low": "reports_low"}
+LANE_ORDER = ("high", "normal", "low")
+REPORT_QUEUES = tuple(LANES.values())
+QUICK_QUEUE = LANES["high"]
+# Jobs non terminés plus anciens ignorés (worker perdu): ils ne bloquent pas leur auteur
+ACTIVE_WINDOW = timedelta(hours=24)
+
+
+class ReportQuotaExceeded(Exception):
+    """Trop de rapports lourds en cours pour un utilisateur."""
+
+
+def estimate_rows(db: Session, params: dict[str, Any]) -> int:
+    """Nombre de polices couvertes par les filtres du rapport."""
+    criteria = policy_criteria(ReportFilters.from_params(params))
+    return db.execute(select(func.count()).select_from(models.Policy).where(*criteria)).scalar_one()
+
+
+def active_heavy_jobs(db: Session, user_id: int) -> int:
+    """Rapports lourds non terminés lancés par l'utilisateur (index requested_by, status)."""
+    return db.execute(
+        select(func.count()).select_from(models.ReportJob).where(
+            models.ReportJob.requested_by == user_id,
+            models.ReportJob.job_type == "heavy",
+            models.ReportJob.status.notin_(TERMINAL_STATUSES),
+            models.ReportJob.created_at >= datetime.now(UTC) - ACTIVE_WINDOW,
+        )
+    ).scalar_one()
+
+
+def choose_lane(priority: str, estimated_rows: int, active_jobs: int) -> str:
+    """Voie (high, normal, low) d'un rapport lourd; lève ReportQuotaExceeded au-delà du plafond."""
+    settings = get_settings()
+    if settings.report_user_max_active and active_jobs >= settings.report_user_max_active:
+        raise ReportQuotaExceeded(f"{active_jobs} rapports lourds déjà en cours (maximum {settings.report_user_max_active})")
+    lane = priority if priority in LANES else "normal"
+    if lane == "low":
+        return lane
+    if settings.report_user_fair_share and active_jobs >= settings.report_user_fair_share:
+        return "low"
+    if estimated_rows <= settings.report_quick_rows:
+        return "high"
+    if estimated_rows > settings.report_heavy_rows:
+        return LANE_ORDER[LANE_ORDER.index(lane) + 1]
+    return lane
+
+
+def plan_heavy_report(db: Session, user_id: int, priority: str, params: dict[str, Any]) -> tuple[str, int]:
+    """(file Celery, polices estimées) d'un rapport lourd à lancer."""
+    rows = estimate_rows(db, params)
+    return LANES[choose_lane(priority, rows, active_heavy_jobs(db, user_id))], rows
+
+
+def task_queue(task: Any, default: str = LANES["normal"]) -> str:
+    """File d'où provient la tâche en cours (voie retenue au lancement)."""
+    delivery_info = getattr(task.request, "delivery_info", None) or {}
+    queue = delivery_info.get("routing_key")
+    return str(queue) if queue in REPORT_QUEUES else default
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+"""Recherche plein texte clients / polices, cloisonnée par propriétaire.
+
+Moteurs selon le dialecte:
+ - PostgreSQL: tsvector 'simple' + unaccent (index GIN d'expression, migration 20261019_0005)
+ - SQLite: tables virtuelles FTS5 (remove_diacritics) maintenues par triggers
+ - Repli: LIKE sur les colonnes si aucun index plein texte n'est disponible (create_all dev)
+
+Les expressions tsvector ci-dessous doivent rester identiques à celles des index GIN,
+sinon PostgreSQL ne les utilisera pas.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+PG_CLIENT_VECTOR = (
+    "to_tsvector('simple', immutable_unaccent("
+    "coalesce(c.first_name, '') || ' ' || coalesce(c.last_name, '') || ' ' || "
+    "coalesce(c.email, '') || ' ' || coalesce(c.phone, '')))"
+)
+PG_POLICY_VECTOR = (
+    "to_tsvector('simple', immutable_unaccent("
+    "coalesce(p.policy_number, '') || ' ' || coalesce(p.product_name, '')))"
+)
+
+_TOKEN_RE = re.compile(r"[\w@.+-]+", re.UNICODE)
+_MAX_TOKENS = 8
+
+
+@dataclass
+class SearchHit:
+    type: str  # client | policy
+    id: int
+    label: str
+    rank: float
+
+
+def _tokens(q: str) -> list[str]:
+    # Les séparateurs internes (@ . + -) sont conservés pour email / téléphone / n° de police
+    return [t.strip(".-+@") for t in _TOKEN_RE.findall(q) if t.strip(".-+@")][:_MAX_TOKENS]
+
+
+def _pg_tsquery(tokens: list[str]) -> str:
+    # Termes quotés (pas d'opérateurs tsquery injectables), recherche par préfixe, AND
+    return " & ".join(f"'{t}':*" for t in tokens)
+
+
+def _fts5_query(tokens: list[str]) -> str:
+    return " ".join('"' + t.replace('"', '""') + '"*' for t in tokens)
+
+
+_fts5_available: bool | None = None
+
+
+def _has_fts5(db: Session) -> bool:
+    global _fts5_available
+    if _fts5_available is None:
+        row = db.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='search_clients_fts'")).first()
+        _fts5_available = row is not None
+    return _fts5_available
+
+
+def _rows_to_hits(rows: Any) -> list[SearchHit]:
+    return [SearchHit(type=r.kind, id=r.id, label=r.label, rank=float(r.rank or 0)) for r in rows]
+
+
+def _search_postgres(db: Session, owner_id: int, tokens: list[str], limit: int, skip: int) -> list[SearchHit]:
+    sql = text(f"""
+        SELECT kind, id, label, rank FROM (
+            SELECT 'client' AS kind, c.id AS id, c.first_name || ' ' || c.last_name AS label,
+                   ts_rank({PG_CLIENT_VECTOR}, q) AS rank
+            FROM clients c, to_tsquery('simple', immutable_unaccent(:tsq)) q
+            WHERE c.owner_id = :owner_id AND {PG_CLIENT_VECTOR} @@ q
+            UNION ALL
+            SELECT 'policy' AS kind, p.id AS id, p.policy_number || ' – ' || p.product_name AS label,
+                   ts_rank({PG_POLICY_VECTOR}, q) AS rank
+            FROM policies p JOIN clients c ON c.id = p.client_id,
+                 to_tsquery('simple', immutable_unaccent(:tsq)) q
+            WHERE c.owner_id = :owner_id AND {PG_POLICY_VECTOR} @@ q
+        ) hits
+        ORDER BY rank DESC, id DESC
+        LIMIT :limit OFFSET :skip
+    """)
+    rows = db.execute(sql, {"tsq": _pg_tsquery(tokens), "owner_id": owner_id, "limit": limit, "skip": skip})
+    return _rows_to_hits(rows)
+
+
+def _search_sqlite_fts(db: Session, owner_id: int, tokens: list[str], limit: int, skip: int) -> list[SearchHit]:
+    # bm25(): plus petit = plus pertinent, on inverse pour un rang décroissant
+    sql = text("""
+        SELECT kind, id, label, rank FROM (
+            SELECT 'client' AS kind, c.id AS id, c.first_name || ' ' || c.last_name AS label,
+                   -bm25(search_clients_fts) AS rank
+            FROM search_clients_fts JOIN clients c ON c.id = search_clients_fts.rowid
+            WHERE search_clients_fts MATCH :q AND c.owner_id = :owner_id
+            UNION ALL
+            SELECT 'policy' AS kind, p.id AS id, p.policy_number || ' – ' || p.product_name AS label,
+                   -bm25(search_policies_fts) AS rank
+            FROM search_policies_fts JOIN policies p ON p.id = search_policies_fts.rowid
+                 JOIN clients c ON c.id = p.client_id
+            WHERE search_policies_fts MATCH :q AND c.owner_id = :owner_id
+        )
+        ORDER BY rank DESC, id DESC
+        LIMIT :limit OFFSET :skip
+    """)
+    rows = db.execute(sql, {"q": _fts5_query(tokens), "owner_id": owner_id, "limit": limit, "skip": skip})
+    return _rows_to_hits(rows)
+
+
+def _search_like(db: Session, owner_id: int, tokens: list[str], limit: int, skip: int) -> list[SearchHit]:
+    params: dict[str, Any] = {"owner_id": owner_id, "limit": limit, "skip": skip}
+    client_conds, policy_conds = [], []
+    for i, tok in enumerate(tokens):
+        params[f"t{i}"] = f"%{tok}%"
+        client_conds.append(
+            f"(c.first_name LIKE :t{i} OR c.last_name LIKE :t{i} OR c.email LIKE :t{i} OR c.phone LIKE :t{i})"
+        )
+        policy_conds.append(f"(p.policy_number LIKE :t{i} OR p.product_name LIKE :t{i})")
+    sql = text(f"""
+        SELECT kind, id, label, rank FROM (
+            SELECT 'client' AS kind, c.id AS id, c.first_name || ' ' || c.last_name AS label, 0 AS rank
+            FROM clients c WHERE c.owner_id = :owner_id AND {' AND '.join(client_conds)}
+            UNION ALL
+            SELECT 'policy' AS kind, p.id AS id, p.policy_number || ' – ' || p.product_name AS label, 0 AS rank
+            FROM policies p JOIN clients c ON c.id = p.client_id
+            WHERE c.owner_id = :owner_id AND {' AND '.join(policy_conds)}
+        ) hits
+        ORDER BY id DESC
+        LIMIT :limit OFFSET :skip
+    """)
+    return _rows_to_hits(db.execute(sql, params))
+
+
+def search(db: Session, owner_id: int, q: str, limit: int = 20, skip: int = 0) -> list[SearchHit]:
+    """Recherche classée dans les clients et polices appartenant à owner_id."""
+    tokens = _tokens(q)
+    if not tokens:
+        return []
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return _search_postgres(db, owner_id, tokens, limit, skip)
+    if dialect == "sqlite" and _has_fts5(db):
+        return _search_sqlite_fts(db, owner_id, tokens, limit, skip)
+    return _search_like(db, owner_id, tokens, limit, skip)
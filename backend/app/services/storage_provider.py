@@ -2,27 +2,80 @@ from __future__ import annotations
 
 """Provider de backend de stockage basé sur la configuration persistée.
 
-Expose get_storage() pour obtenir un objet avec store_bytes() et read_text(path).
+Expose get_storage() pour obtenir un objet avec store_bytes() et read_text(path)
+(templates), ainsi que store_document() / open_document() / document_url() /
+list_documents() / delete_document() pour les documents générés.
+
+Chaque backend expose aussi une variante asynchrone (astore_bytes, astore_stream,
+aread_text, astream) pour les routes async: aiofiles en local, aiobotocore pour S3
+(optionnel: repli sur asyncio.to_thread s'il n'est pas installé).
+
+Les backends instanciés (client boto3 et son pool HTTP, service Drive issu de la
+découverte d'API) sont conservés dans un registre indexé par storage_config.version:
+la configuration n'est relue qu'après invalidation ou expiration de storage_cache_ttl.
+invalidate_storage_cache() vide le cache local et publie sur Redis afin que les autres
+workers (abonnés au canal STORAGE_CHANNEL) fassent de même.
 """
+import asyncio
+import hashlib
+import threading
+import time
+import weakref
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import Protocol
+from typing import Any, BinaryIO, Protocol
 
 from sqlalchemy.orm import Session
 
+from backend.app.core.config import get_settings
+from backend.app.core.redis import get_redis
 from backend.app.db import models
+from backend.app.services.async_storage import ThreadedAsyncStorage, aiter_bytes
+from backend.app.services.document_storage import (
+    DOCUMENT_PREFIX,
+    READ_CHUNK_SIZE,
+    StoredDocument,
+    delete_document_file,
+    list_document_files,
+    open_document_file,
+    store_document_file,
+)
 from backend.app.services.gdrive_backend import GoogleDriveStorageBackend
 
 try:
     import boto3  # type: ignore
 except Exception:  # pragma: no cover
     boto3 = None
+try:
+    from aiobotocore.session import get_session as get_aio_session  # type: ignore
+except Exception:  # pragma: no cover
+    get_aio_session = None
 from backend.app.services.template_storage import (
+    STREAM_CHUNK_SIZE,
+    StoredObject,
+    aiter_template_file,
+    aread_template_text_from_file,
+    astore_template_stream,
+    check_checksum,
     read_template_text_from_file,
     store_template_bytes,
+    store_template_stream,
 )
 
+try:  # pragma: no cover
+    from prometheus_client import Counter
+    STORAGE_BACKEND_LOOKUPS = Counter("storage_backend_lookups_total", "Résolutions du backend de stockage", ["result"])
+except Exception:  # pragma: no cover
+    STORAGE_BACKEND_LOOKUPS = None  # type: ignore
+
+STORAGE_CHANNEL = "storage:config:invalidate"
+_LISTENER_RETRY_SECONDS = 60
+
 
 class StorageBackend(Protocol):
+    name: str  # valeur de storage_config.backend effectivement servie
+
     def store_bytes(
         self,
         data: bytes,
@@ -31,12 +84,66 @@ class StorageBackend(Protocol):
     ) -> str:
         ...
 
+    def store_stream(
+        self,
+        fileobj: BinaryIO,
+        filename: str | None = None,
+        content_type: str | None = None,
+        expected_sha256: str | None = None,
+    ) -> StoredObject:
+        """Stocke un flux sans le matérialiser en mémoire; checksum calculé au fil de l'eau.
+
+        Lève ChecksumMismatchError, sans rien laisser de stocké, si expected_sha256 diffère.
+        """
+        ...
+
     def read_text(self, path: str) -> str:
         ...
 
+    async def astore_bytes(self, data: bytes, filename: str | None = None, content_type: str | None = None) -> str:
+        ...
+
+    async def astore_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str | None = None,
+        content_type: str | None = None,
+        expected_sha256: str | None = None,
+    ) -> StoredObject:
+        """Pendant asynchrone de store_stream, alimenté par un itérateur asynchrone de blocs."""
+        ...
+
+    async def aread_text(self, path: str) -> str:
+        ...
+
+    def astream(self, path: str) -> AsyncIterator[bytes]:
+        """Lecture asynchrone par blocs."""
+        ...
+
+    def store_document(self, data: bytes, key: str, content_type: str | None = None) -> str:
+        """Stocke un document généré sous la clé donnée; renvoie la référence à persister."""
+        ...
+
+    def open_document(self, ref: str) -> Iterator[bytes]:
+        """Lecture en flux; FileNotFoundError immédiate si le document n'existe pas."""
+        ...
+
+    def document_url(self, ref: str, filename: str, content_type: str | None, expires_in: int) -> str | None:
+        """URL de téléchargement direct présignée, ou None si le backend n'en fournit pas."""
+        ...
+
+    def list_documents(self, start_after: str | None = None) -> Iterator[StoredDocument]:
+        """Documents présents, dans un ordre stable, strictement après la référence start_after."""
+        ...
+
+    def delete_document(self, ref: str) -> None:
+        ...
+
 
 @dataclass
 class LocalStorageBackend:
+    name = "local"
+
     def store_bytes(
         self,
         data: bytes,
@@ -45,9 +152,52 @@ class LocalStorageBackend:
     ) -> str:
         return store_template_bytes(data, filename=filename, content_type=content_type)
 
+    def store_stream(
+        self,
+        fileobj: BinaryIO,
+        filename: str | None = None,
+        content_type: str | None = None,
+        expected_sha256: str | None = None,
+    ) -> StoredObject:
+        return store_template_stream(fileobj, filename=filename, content_type=content_type, expected_sha256=expected_sha256)
+
     def read_text(self, path: str) -> str:
         return read_template_text_from_file(path)
 
+    async def astore_bytes(self, data: bytes, filename: str | None = None, content_type: str | None = None) -> str:
+        stored = await astore_template_stream(aiter_bytes(data), filename=filename, content_type=content_type)
+        return stored.path
+
+    async def astore_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str | None = None,
+        content_type: str | None = None,
+        expected_sha256: str | None = None,
+    ) -> StoredObject:
+        return await astore_template_stream(chunks, filename=filename, content_type=content_type, expected_sha256=expected_sha256)
+
+    async def aread_text(self, path: str) -> str:
+        return await aread_template_text_from_file(path)
+
+    def astream(self, path: str) -> AsyncIterator[bytes]:
+        return aiter_template_file(path)
+
+    def store_document(self, data: bytes, key: str, content_type: str | None = None) -> str:
+        return store_document_file(data, key)
+
+    def open_document(self, ref: str) -> Iterator[bytes]:
+        return open_document_file(ref)
+
+    def document_url(self, ref: str, filename: str, content_type: str | None, expires_in: int) -> str | None:
+        return None
+
+    def list_documents(self, start_after: str | None = None) -> Iterator[StoredDocument]:
+        return list_document_files(start_after)
+
+    def delete_document(self, ref: str) -> None:
+        delete_document_file(ref)
+
 
 def _make_backend(cfg: models.StorageConfig) -> StorageBackend:
     if cfg.backend == "google_drive":
@@ -70,11 +220,125 @@ def _make_backend(cfg: models.StorageConfig) -> StorageBackend:
     return LocalStorageBackend()
 
 
-class S3StorageBackend:
-    def __init__(self, bucket: str, region: str | None, endpoint_url: str | None):
-        session = boto3.session.Session(region_name=region) if boto3 else None
-        self._client = session.client("s3", endpoint_url=endpoint_url) if session else None
+def _read_full(fileobj: BinaryIO, size: int) -> bytes:
+    """Lit exactement size octets (moins en fin de flux), read() pouvant renvoyer moins."""
+    parts: list[bytes] = []
+    remaining = size
+    while remaining > 0:
+        chunk = fileobj.read(remaining)
+        if not chunk:
+            break
+        parts.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(parts)
+
+
+class S3StorageBackend(ThreadedAsyncStorage):
+    """Backend S3 (ou compatible: MinIO, Ceph...).
+
+    store_stream: un objet tenant dans une part est envoyé en put_object; au-delà,
+    upload multipart avec au plus max_concurrency parts en vol (mémoire bornée à
+    max_concurrency * part_size).
+
+    Documents générés: clés sous DOCUMENT_PREFIX/, téléchargés via URL présignée.
+
+    Variante async: un client aiobotocore par boucle d'événements (pool HTTP réutilisé),
+    même découpage multipart qu'en synchrone.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        region: str | None,
+        endpoint_url: str | None,
+        client: Any = None,
+        part_size: int | None = None,
+        max_concurrency: int | None = None,
+        aclient: Any = None,
+    ):
+        if client is None:
+            session = boto3.session.Session(region_name=region) if boto3 else None
+            client = session.client("s3", endpoint_url=endpoint_url) if session else None
+        self._client = client
+        self._aclient_override = aclient
+        self._aclients: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any] = weakref.WeakKeyDictionary()
+        self.region = region
+        self.endpoint_url = endpoint_url
         self.bucket = bucket
+        settings = get_settings()
+        # S3 impose 5 Mo minimum par part (sauf la dernière)
+        self.part_size = part_size or max(settings.s3_multipart_part_mb, 5) * 1024 * 1024
+        self.max_concurrency = max_concurrency or settings.s3_multipart_concurrency
+
+    def store_stream(
+        self,
+        fileobj: BinaryIO,
+        filename: str | None = None,
+        content_type: str | None = None,
+        expected_sha256: str | None = None,
+    ) -> StoredObject:
+        assert self._client is not None
+        key = filename or "object"
+        extra: dict = {"ContentType": content_type} if content_type else {}
+        digest = hashlib.sha256()
+        first = _read_full(fileobj, self.part_size)
+        digest.update(first)
+        second = _read_full(fileobj, self.part_size) if len(first) == self.part_size else b""
+        digest.update(second)
+        if not second:
+            # Objet tenant dans une part: checksum vérifié avant tout envoi
+            check_checksum(digest.hexdigest(), expected_sha256)
+            self._client.put_object(Bucket=self.bucket, Key=key, Body=first, **extra)
+            return StoredObject(path=key, checksum=digest.hexdigest(), size=len(first))
+        upload_id = self._client.create_multipart_upload(Bucket=self.bucket, Key=key, **extra)["UploadId"]
+        try:
+            size, parts = self._upload_parts(key, upload_id, fileobj, [first, second], digest)
+            checksum = digest.hexdigest()
+            # Vérifié avant complétion: un abort ne laisse aucun objet visible
+            check_checksum(checksum, expected_sha256)
+            self._client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            self._client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+        return StoredObject(path=key, checksum=checksum, size=size)
+
+    def _upload_parts(
+        self, key: str, upload_id: str, fileobj: BinaryIO, pending: list[bytes], digest: Any
+    ) -> tuple[int, list[dict[str, Any]]]:
+        """Lit le flux séquentiellement (hachage dans l'ordre) et envoie les parts en parallèle."""
+
+        def _send(number: int, body: bytes) -> dict[str, Any]:
+            resp = self._client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+            return {"PartNumber": number, "ETag": resp["ETag"]}
+
+        size = sum(len(p) for p in pending)
+        number = 0
+        in_flight: set[Future[dict[str, Any]]] = set()
+        done_parts: list[dict[str, Any]] = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="s3-part") as pool:
+            try:
+                while pending:
+                    body = pending.pop(0)
+                    number += 1
+                    if len(in_flight) >= self.max_concurrency:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        done_parts.extend(f.result() for f in finished)
+                    in_flight.add(pool.submit(_send, number, body))
+                    nxt = _read_full(fileobj, self.part_size)
+                    if nxt:
+                        digest.update(nxt)
+                        size += len(nxt)
+                        pending.append(nxt)
+                done_parts.extend(f.result() for f in in_flight)
+            except BaseException:
+                for f in in_flight:
+                    f.cancel()
+                raise
+        return size, sorted(done_parts, key=lambda p: p["PartNumber"])
 
     def store_bytes(
         self,
@@ -97,17 +361,254 @@ class S3StorageBackend:
         text: str = body_bytes.decode("utf-8")
         return text
 
+    async def _aclient(self) -> Any:
+        """Client aiobotocore de la boucle courante (None si aiobotocore n'est pas installé)."""
+        if self._aclient_override is not None:
+            return self._aclient_override
+        if get_aio_session is None:
+            return None
+        loop = asyncio.get_running_loop()
+        client = self._aclients.get(loop)
+        if client is None:
+            ctx = get_aio_session().create_client("s3", region_name=self.region, endpoint_url=self.endpoint_url)
+            client = await ctx.__aenter__()
+            if loop in self._aclients:  # créé entre-temps par une autre coroutine
+                await ctx.__aexit__(None, None, None)
+                return self._aclients[loop]
+            self._aclients[loop] = client
+        return client
+
+    async def astore_bytes(self, data: bytes, filename: str | None = None, content_type: str | None = None) -> str:
+        client = await self._aclient()
+        if client is None:
+            return await super().astore_bytes(data, filename, content_type)
+        key = filename or "object"
+        extra: dict = {"ContentType": content_type} if content_type else {}
+        await client.put_object(Bucket=self.bucket, Key=key, Body=data, **extra)
+        return key
+
+    async def astore_stream(
+        self,
+        chunks: AsyncIterator[bytes],
+        filename: str | None = None,
+        content_type: str | None = None,
+        expected_sha256: str | None = None,
+    ) -> StoredObject:
+        client = await self._aclient()
+        if client is None:
+            return await super().astore_stream(chunks, filename, content_type, expected_sha256)
+        key = filename or "object"
+        extra: dict = {"ContentType": content_type} if content_type else {}
+        digest = hashlib.sha256()
+        size = 0
+        buf = bytearray()
+        upload_id: str | None = None
+        number = 0
+        in_flight: set[asyncio.Task[dict[str, Any]]] = set()
+        done_parts: list[dict[str, Any]] = []
+
+        async def _send(number: int, body: bytes) -> dict[str, Any]:
+            resp = await client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+            return {"PartNumber": number, "ETag": resp["ETag"]}
+
+        async def _submit(body: bytes) -> None:
+            nonlocal number, in_flight
+            number += 1
+            if len(in_flight) >= self.max_concurrency:
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                done_parts.extend(t.result() for t in finished)
+            in_flight.add(asyncio.ensure_future(_send(number, body)))
+
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                buf += chunk
+                # Une part n'est envoyée que si la suite du flux existe: la dernière reste en tampon
+                while len(buf) > self.part_size:
+                    if upload_id is None:
+                        upload_id = (await client.create_multipart_upload(Bucket=self.bucket, Key=key, **extra))["UploadId"]
+                    body = bytes(buf[: self.part_size])
+                    del buf[: self.part_size]
+                    await _submit(body)
+            checksum = digest.hexdigest()
+            if upload_id is None:
+                # Objet tenant dans une part: checksum vérifié avant tout envoi
+                check_checksum(checksum, expected_sha256)
+                await client.put_object(Bucket=self.bucket, Key=key, Body=bytes(buf), **extra)
+                return StoredObject(path=key, checksum=checksum, size=size)
+            await _submit(bytes(buf))
+            done_parts.extend(await asyncio.gather(*in_flight))
+            in_flight = set()
+            # Vérifié avant complétion: un abort ne laisse aucun objet visible
+            check_checksum(checksum, expected_sha256)
+            parts = sorted(done_parts, key=lambda p: p["PartNumber"])
+            await client.complete_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+        except BaseException:
+            for t in in_flight:
+                t.cancel()
+            if upload_id is not None:
+                await client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+        return StoredObject(path=key, checksum=checksum, size=size)
+
+    async def aread_text(self, path: str) -> str:
+        client = await self._aclient()
+        if client is None:
+            return await super().aread_text(path)
+        resp = await client.get_object(Bucket=self.bucket, Key=path)
+        body = resp["Body"]
+        try:
+            data: bytes = await body.read()
+        finally:
+            body.close()
+        return data.decode("utf-8")
+
+    async def astream(self, path: str) -> AsyncIterator[bytes]:
+        client = await self._aclient()
+        if client is None:
+            async for chunk in super().astream(path):
+                yield chunk
+            return
+        resp = await client.get_object(Bucket=self.bucket, Key=path)
+        body = resp["Body"]
+        try:
+            while chunk := await body.read(STREAM_CHUNK_SIZE):
+                yield chunk
+        finally:
+            body.close()
+
+    def store_document(self, data: bytes, key: str, content_type: str | None = None) -> str:
+        return self.store_bytes(data, filename=key, content_type=content_type)
+
+    def open_document(self, ref: str) -> Iterator[bytes]:
+        assert self._client is not None
+        try:
+            resp = self._client.get_object(Bucket=self.bucket, Key=ref)
+        except Exception as exc:
+            code = getattr(exc, "response", {}).get("Error", {}).get("Code")
+            if code in {"NoSuchKey", "404"}:
+                raise FileNotFoundError(ref) from exc
+            raise
+        body = resp["Body"]
+
+        def _chunks() -> Iterator[bytes]:
+            try:
+                while chunk := body.read(READ_CHUNK_SIZE):
+                    yield chunk
+            finally:
+                body.close()
+
+        return _chunks()
+
+    def document_url(self, ref: str, filename: str, content_type: str | None, expires_in: int) -> str | None:
+        assert self._client is not None
+        params = {"Bucket": self.bucket, "Key": ref, "ResponseContentDisposition": f'attachment; filename="{filename}"'}
+        if content_type:
+            params["ResponseContentType"] = content_type
+        url: str = self._client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+        return url
+
+    def list_documents(self, start_after: str | None = None) -> Iterator[StoredDocument]:
+        assert self._client is not None
+        paginator = self._client.get_paginator("list_objects_v2")
+        extra = {"StartAfter": start_after} if start_after else {}
+        # list_objects_v2 renvoie les clés en ordre lexicographique
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{DOCUMENT_PREFIX}/", **extra):
+            for obj in page.get("Contents", []):
+                yield StoredDocument(ref=obj["Key"], modified=obj["LastModified"].timestamp())
+
+    def delete_document(self, ref: str) -> None:
+        assert self._client is not None
+        self._client.delete_object(Bucket=self.bucket, Key=ref)
+
+
+_lock = threading.Lock()
+_registry: dict[int, StorageBackend] = {}  # version de config -> backend instancié
+_current_version: int | None = None
+_checked_at = 0.0
+_listener_thread: threading.Thread | None = None
+_listener_retry_at = 0.0
+
+
+def _drop_local() -> None:
+    global _current_version
+    with _lock:
+        _current_version = None
+        _registry.clear()
+
+
+def _listen() -> None:
+    global _listener_retry_at
+    try:
+        pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(STORAGE_CHANNEL)
+        for _ in pubsub.listen():
+            _drop_local()
+    except Exception:
+        # Redis indisponible: la fraîcheur repose sur storage_cache_ttl, nouvel essai plus tard
+        _listener_retry_at = time.monotonic() + _LISTENER_RETRY_SECONDS
+
+
+def _ensure_listener() -> None:
+    global _listener_thread
+    if _listener_thread is not None and _listener_thread.is_alive():
+        return
+    if time.monotonic() < _listener_retry_at:
+        return
+    with _lock:
+        if _listener_thread is None or not _listener_thread.is_alive():
+            _listener_thread = threading.Thread(target=_listen, name="storage-config-listener", daemon=True)
+            _listener_thread.start()
+
 
 def get_storage(db: Session) -> StorageBackend:
+    global _current_version, _checked_at
+    _ensure_listener()
+    now = time.monotonic()
+    version = _current_version
+    if version is not None and now - _checked_at < get_settings().storage_cache_ttl:
+        backend = _registry.get(version)
+        if backend is not None:
+            if STORAGE_BACKEND_LOOKUPS:
+                STORAGE_BACKEND_LOOKUPS.labels("hit").inc()
+            return backend
     cfg = db.query(models.StorageConfig).order_by(models.StorageConfig.id.asc()).first()
     if not cfg:
         cfg = models.StorageConfig(backend="local")
         db.add(cfg)
         db.commit()
         db.refresh(cfg)
-    return _make_backend(cfg)
+    with _lock:
+        backend = _registry.get(cfg.version)
+        if backend is None:
+            if STORAGE_BACKEND_LOOKUPS:
+                STORAGE_BACKEND_LOOKUPS.labels("miss").inc()
+            backend = _make_backend(cfg)
+            # Une seule version utile: les anciens clients (et leurs pools) sont libérés
+            _registry.clear()
+            _registry[cfg.version] = backend
+        _current_version = cfg.version
+        _checked_at = now
+    return backend
+
+
+def get_document_storage(db: Session, stored_with: str | None) -> StorageBackend:
+    """Backend à utiliser pour relire un document persisté avec le backend stored_with.
+
+    Les documents antérieurs au routage via le backend (stored_with absent) ou écrits en
+    local avant un passage à S3 / Drive restent servis depuis le disque local.
+    """
+    storage = get_storage(db)
+    if stored_with in (None, LocalStorageBackend.name) and storage.name != LocalStorageBackend.name:
+        return LocalStorageBackend()
+    return storage
+
 
-def invalidate_storage_cache():
-    """À appeler après modification de la config pour invalider le cache du backend."""
-    # Si un cache est utilisé, l’invalider ici (ex: lru_cache, etc.)
-    pass
+def invalidate_storage_cache() -> None:
+    """À appeler après modification de la config: vide le cache local et notifie les autres workers."""
+    _drop_local()
+    try:
+        get_redis().publish(STORAGE_CHANNEL, "1")
+    except Exception:
+        pass
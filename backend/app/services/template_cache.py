@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+"""Cache en lecture des contenus de templates stockés hors base (S3, Google Drive, local).
+
+Les TemplateVersion sont immuables et portent un checksum SHA-256: le contenu est donc
+indexé par checksum, sur trois niveaux consultés dans l'ordre:
+ 1. LRU en mémoire du process (borné en octets: template_cache_memory_mb)
+ 2. répertoire disque local (borné: template_cache_disk_mb, éviction du moins récemment lu)
+ 3. backend distant (storage.read_text), résultat propagé aux niveaux 1 et 2
+
+Les octets lus sur disque ou à distance sont vérifiés contre le checksum: une entrée
+disque corrompue est supprimée et la lecture se poursuit au niveau suivant.
+Les versions sans checksum ne sont pas mises en cache.
+aread_cached_text est la variante pour les routes async (storage.aread_text attendu).
+"""
+import asyncio
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+from backend.app.core.config import get_settings
+from backend.app.services.template_storage import ChecksumMismatchError
+
+try:  # pragma: no cover
+    from prometheus_client import Counter
+    TEMPLATE_CACHE_LOOKUPS = Counter("template_cache_lookups_total", "Lectures de contenu de template par niveau servi", ["tier"])
+except Exception:  # pragma: no cover
+    TEMPLATE_CACHE_LOOKUPS = None  # type: ignore
+
+TIERS = ("memory", "disk", "remote")
+
+_lock = threading.Lock()
+_memory: OrderedDict[str, bytes] = OrderedDict()
+_memory_bytes = 0
+_stats: dict[str, int] = dict.fromkeys(TIERS, 0)
+
+
+def _valid(data: bytes, checksum: str) -> bool:
+    return hashlib.sha256(data).hexdigest() == checksum
+
+
+def _record(tier: str) -> None:
+    with _lock:
+        _stats[tier] += 1
+    if TEMPLATE_CACHE_LOOKUPS:
+        TEMPLATE_CACHE_LOOKUPS.labels(tier).inc()
+
+
+def hit_ratio() -> float:
+    """Part des lectures servies sans accès au backend distant."""
+    total = sum(_stats.values())
+    return (total - _stats["remote"]) / total if total else 0.0
+
+
+def stats() -> dict[str, Any]:
+    return {**_stats, "hit_ratio": hit_ratio(), "memory_bytes": _memory_bytes}
+
+
+# --- niveau 1: mémoire ---
+def _memory_get(checksum: str) -> bytes | None:
+    with _lock:
+        data = _memory.get(checksum)
+        if data is not None:
+            _memory.move_to_end(checksum)
+        return data
+
+
+def _memory_put(checksum: str, data: bytes) -> None:
+    global _memory_bytes
+    cap = get_settings().template_cache_memory_mb * 1024 * 1024
+    if len(data) > cap:
+        return
+    with _lock:
+        old = _memory.pop(checksum, None)
+        _memory_bytes -= len(old) if old else 0
+        _memory[checksum] = data
+        _memory_bytes += len(data)
+        while _memory_bytes > cap:
+            _, evicted = _memory.popitem(last=False)
+            _memory_bytes -= len(evicted)
+
+
+# --- niveau 2: disque ---
+def _disk_dir() -> Path:
+    path = Path(get_settings().template_cache_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _disk_get(checksum: str) -> bytes | None:
+    path = _disk_dir() / checksum
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    if not _valid(data, checksum):
+        path.unlink(missing_ok=True)
+        return None
+    os.utime(path)  # mtime = dernier accès, base de l'éviction LRU
+    return data
+
+
+def _disk_put(checksum: str, data: bytes) -> None:
+    root = _disk_dir()
+    tmp = root / f".{checksum}.{threading.get_ident()}.tmp"
+    tmp.write_bytes(data)
+    os.replace(tmp, root / checksum)
+    _disk_evict(root, get_settings().template_cache_disk_mb * 1024 * 1024)
+
+
+def _disk_evict(root: Path, cap: int) -> None:
+    entries = []
+    total = 0
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.startswith("."):
+                st = entry.stat()
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+    if total <= cap:
+        return
+    for _, size, path in sorted(entries):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            continue
+        total -= size
+        if total <= cap:
+            break
+
+
+def read_cached_text(storage: Any, path: str, checksum: str | None, use_disk: bool = True) -> str:
+    """Lit le contenu texte d'une version de template via le cache à niveaux.
+
+    use_disk=False pour un backend déjà local (le cache disque dupliquerait le fichier).
+    Lève ChecksumMismatchError si le contenu distant ne correspond pas au checksum.
+    """
+    if not checksum:
+        return str(storage.read_text(path))
+    # Le niveau mémoire ne reçoit que des octets déjà vérifiés
+    data = _memory_get(checksum)
+    if data is not None:
+        _record("memory")
+        return data.decode("utf-8")
+    if use_disk:
+        data = _disk_get(checksum)
+        if data is not None:
+            _record("disk")
+            _memory_put(checksum, data)
+            return data.decode("utf-8")
+    text = str(storage.read_text(path))
+    data = text.encode("utf-8")
+    if not _valid(data, checksum):
+        raise ChecksumMismatchError(f"Contenu distant corrompu pour {path}")
+    _record("remote")
+    _memory_put(checksum, data)
+    if use_disk:
+        _disk_put(checksum, data)
+    return text
+
+
+async def aread_cached_text(storage: Any, path: str, checksum: str | None, use_disk: bool = True) -> str:
+    """Variante asynchrone de read_cached_text: mémoire en ligne, disque via to_thread,
+    backend distant via storage.aread_text (sans thread pendant le transfert)."""
+    if not checksum:
+        return str(await storage.aread_text(path))
+    data = _memory_get(checksum)
+    if data is not None:
+        _record("memory")
+        return data.decode("utf-8")
+    if use_disk:
+        data = await asyncio.to_thread(_disk_get, checksum)
+        if data is not None:
+            _record("disk")
+            _memory_put(checksum, data)
+            return data.decode("utf-8")
+    text = str(await storage.aread_text(path))
+    data = text.encode("utf-8")
+    if not _valid(data, checksum):
+        raise ChecksumMismatchError(f"Contenu distant corrompu pour {path}")
+    _record("remote")
+    _memory_put(checksum, data)
+    if use_disk:
+        await asyncio.to_thread(_disk_put, checksum, data)
+    return text
+
+
+def clear() -> None:
+    """Vide le niveau mémoire et remet les statistiques à zéro (tests, maintenance)."""
+    global _memory_bytes
+    with _lock:
+        _memory.clear()
+        _memory_bytes = 0
+        for tier in TIERS:
+            _stats[tier] = 0
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+"""Profil de coût des rendus par template (planification de capacité).
+
+Pour chaque clé de template (ex: "v42" = TemplateVersion 42) on cumule nombre de rendus,
+temps total / maximal et taille de sortie totale / maximale:
+ - Redis (hash template_profile:<clé>) partagé entre process API et workers; maxima tenus
+   par ZADD GT (Redis >= 6.2) dans deux ensembles triés
+ - repli en mémoire du process si Redis est indisponible (tests, dev)
+Les histogrammes Prometheus template_render_seconds / template_render_bytes (par format)
+donnent la distribution globale sans cardinalité par template.
+"""
+import threading
+from typing import Any
+
+from backend.app.core.redis import get_redis
+
+REDIS_PREFIX = "template_profile"
+MAX_SECONDS_KEY = f"{REDIS_PREFIX}:max_seconds"
+MAX_BYTES_KEY = f"{REDIS_PREFIX}:max_bytes"
+
+try:  # pragma: no cover
+    from prometheus_client import Histogram
+    RENDER_SECONDS = Histogram("template_render_seconds", "Durée de rendu des templates", ["format"])
+    RENDER_BYTES = Histogram(
+        "template_render_bytes", "Taille des rendus de templates", ["format"],
+        buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8),
+    )
+except Exception:  # pragma: no cover
+    RENDER_SECONDS = None  # type: ignore
+    RENDER_BYTES = None  # type: ignore
+
+_lock = threading.Lock()
+_local: dict[str, dict[str, float]] = {}
+
+
+def _record_local(key: str, seconds: float, size: int) -> None:
+    with _lock:
+        p = _local.setdefault(key, {"renders": 0, "seconds_total": 0.0, "seconds_max": 0.0, "bytes_total": 0, "bytes_max": 0})
+        p["renders"] += 1
+        p["seconds_total"] += seconds
+        p["seconds_max"] = max(p["seconds_max"], seconds)
+        p["bytes_total"] += size
+        p["bytes_max"] = max(p["bytes_max"], size)
+
+
+def record_render(key: str, fmt: str, seconds: float, size: int) -> None:
+    if RENDER_SECONDS:
+        RENDER_SECONDS.labels(fmt).observe(seconds)
+        RENDER_BYTES.labels(fmt).observe(size)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.hincrby(f"{REDIS_PREFIX}:{key}", "renders", 1)
+        pipe.hincrbyfloat(f"{REDIS_PREFIX}:{key}", "seconds_total", seconds)
+        pipe.hincrby(f"{REDIS_PREFIX}:{key}", "bytes_total", size)
+        pipe.zadd(MAX_SECONDS_KEY, {key: seconds}, gt=True)
+        pipe.zadd(MAX_BYTES_KEY, {key: size}, gt=True)
+        pipe.execute()
+    except Exception:
+        _record_local(key, seconds, size)
+
+
+def get_profile(key: str) -> dict[str, Any] | None:
+    """Profil cumulé (renders, seconds_total/max/avg, bytes_total/max/avg), None si jamais rendu."""
+    try:
+        r = get_redis()
+        raw = r.hgetall(f"{REDIS_PREFIX}:{key}")
+        profile: dict[str, float] | None = None
+        if raw:
+            profile = {
+                "renders": int(raw.get("renders", 0)),
+                "seconds_total": float(raw.get("seconds_total", 0)),
+                "seconds_max": float(r.zscore(MAX_SECONDS_KEY, key) or 0),
+                "bytes_total": int(raw.get("bytes_total", 0)),
+                "bytes_max": int(r.zscore(MAX_BYTES_KEY, key) or 0),
+            }
+    except Exception:
+        with _lock:
+            profile = dict(_local[key]) if key in _local else None
+    if not profile or not profile["renders"]:
+        return None
+    return {
+        **profile,
+        "seconds_avg": profile["seconds_total"] / profile["renders"],
+        "bytes_avg": profile["bytes_total"] / profile["renders"],
+    }
@@ -4,20 +4,60 @@ from __future__ import annotations
 
 Fournit des helpers pour:
  - Enregistrer un fichier de template de manière sûre dans un répertoire dédié
+   (en une fois ou en flux, checksum calculé au fil de l'eau)
  - Charger le contenu texte (UTF-8) d'un template (depuis DB ou fichier)
  - Calculer le checksum SHA-256
+
+Les variantes a* (astore_template_stream, aread_template_text_from_file, aiter_template_file)
+sont destinées aux routes async: aiofiles si installé, sinon asyncio.to_thread.
 """
+import asyncio
 import hashlib
+import os
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
 from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
+
+try:
+    import aiofiles  # type: ignore
+except Exception:  # pragma: no cover
+    aiofiles = None
 
 TEMPLATES_DIR = Path("templates_store")
 TEMPLATES_DIR.mkdir(exist_ok=True)
 
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class StoredObject:
+    """Résultat d'un stockage en flux: chemin/clé/id, checksum SHA-256 et taille."""
+
+    path: str
+    checksum: str
+    size: int
+
+
+class ChecksumMismatchError(ValueError):
+    """Le checksum calculé pendant l'envoi ne correspond pas à celui attendu."""
+
 
 def sha256_hex(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
 
+def iter_chunks(fileobj: BinaryIO, size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    while chunk := fileobj.read(size):
+        yield chunk
+
+
+def check_checksum(actual: str, expected: str | None) -> None:
+    if expected is not None and actual != expected.lower():
+        raise ChecksumMismatchError("Checksum mismatch")
+
+
 def _safe_ext(filename: str | None, content_type: str | None) -> str:
     """Détermine une extension sûre pour stockage.
 
@@ -47,7 +87,36 @@ def store_template_bytes(data: bytes, filename: str | None = None, content_type:
     return str(path)
 
 
-def read_template_text_from_file(path: str) -> str:
+def store_template_stream(
+    fileobj: BinaryIO,
+    filename: str | None = None,
+    content_type: str | None = None,
+    expected_sha256: str | None = None,
+) -> StoredObject:
+    """Variante en flux de store_template_bytes: copie par blocs dans un fichier temporaire
+    du répertoire dédié, puis renommage atomique vers le nom dérivé du checksum.
+
+    Lève ChecksumMismatchError (fichier temporaire supprimé) si expected_sha256 diffère.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp = TEMPLATES_DIR / f".upload_{uuid4().hex}.part"
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in iter_chunks(fileobj):
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        checksum = digest.hexdigest()
+        check_checksum(checksum, expected_sha256)
+        path = TEMPLATES_DIR / f"tpl_{checksum[:12]}{_safe_ext(filename, content_type)}"
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return StoredObject(path=str(path), checksum=checksum, size=size)
+
+
+def _confined(path: str) -> Path:
     p = Path(path)
     # Vérifie confinement dans TEMPLATES_DIR
     try:
@@ -57,6 +126,63 @@ def read_template_text_from_file(path: str) -> str:
         root = str(TEMPLATES_DIR.resolve())
         if not str(p.resolve()).startswith(root):
             raise ValueError("Chemin hors répertoire autorisé")
+    return p
+
+
+def read_template_text_from_file(path: str) -> str:
+    p = _confined(path)
     data = p.read_bytes()
     # On tente UTF-8 strict; si échec -> erreur explicite
     return data.decode("utf-8")
+
+
+async def astore_template_stream(
+    chunks: AsyncIterator[bytes],
+    filename: str | None = None,
+    content_type: str | None = None,
+    expected_sha256: str | None = None,
+) -> StoredObject:
+    """Pendant asynchrone de store_template_stream (fichier temporaire puis renommage atomique)."""
+    digest = hashlib.sha256()
+    size = 0
+    tmp = TEMPLATES_DIR / f".upload_{uuid4().hex}.part"
+    try:
+        if aiofiles is not None:
+            async with aiofiles.open(tmp, "wb") as af:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await af.write(chunk)
+        else:  # pragma: no cover
+            with open(tmp, "wb") as f:
+                async for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+        checksum = digest.hexdigest()
+        check_checksum(checksum, expected_sha256)
+        path = TEMPLATES_DIR / f"tpl_{checksum[:12]}{_safe_ext(filename, content_type)}"
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return StoredObject(path=str(path), checksum=checksum, size=size)
+
+
+async def aread_template_text_from_file(path: str) -> str:
+    p = _confined(path)
+    if aiofiles is None:  # pragma: no cover
+        data = await asyncio.to_thread(p.read_bytes)
+    else:
+        async with aiofiles.open(p, "rb") as af:
+            data = await af.read()
+    return data.decode("utf-8")
+
+
+async def aiter_template_file(path: str, size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    p = _confined(path)
+    if aiofiles is None:  # pragma: no cover
+        yield await asyncio.to_thread(p.read_bytes)
+        return
+    async with aiofiles.open(p, "rb") as af:
+        while chunk := await af.read(size):
+            yield chunk
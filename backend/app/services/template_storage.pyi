@@ -1,5 +1,43 @@
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+TEMPLATES_DIR: Path
+STREAM_CHUNK_SIZE: int
+
+@dataclass(frozen=True)
+class StoredObject:
+    path: str
+    checksum: str
+    size: int
+
+class ChecksumMismatchError(ValueError): ...
+
 def sha256_hex(data: bytes) -> str: ...
 
+def iter_chunks(fileobj: BinaryIO, size: int = ...) -> Iterator[bytes]: ...
+
+def check_checksum(actual: str, expected: str | None) -> None: ...
+
 def store_template_bytes(data: bytes, filename: str | None = ..., content_type: str | None = ...) -> str: ...
 
+def store_template_stream(
+    fileobj: BinaryIO,
+    filename: str | None = ...,
+    content_type: str | None = ...,
+    expected_sha256: str | None = ...,
+) -> StoredObject: ...
+
 def read_template_text_from_file(path: str) -> str: ...
+
+async def astore_template_stream(
+    chunks: AsyncIterator[bytes],
+    filename: str | None = ...,
+    content_type: str | None = ...,
+    expected_sha256: str | None = ...,
+) -> StoredObject: ...
+
+async def aread_template_text_from_file(path: str) -> str: ...
+
+def aiter_template_file(path: str, size: int = ...) -> AsyncIterator[bytes]: ...
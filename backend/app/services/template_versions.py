@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+"""Attribution des numéros de version et cache de résolution des TemplateVersion.
+
+Attribution: templates.latest_version est incrémenté par un UPDATE ... RETURNING dans la
+transaction qui insère la version. La ligne du template reste verrouillée jusqu'au commit
+(PostgreSQL: verrou de ligne; SQLite: verrou d'écriture de la base), si bien que deux
+créations concurrentes obtiennent des numéros distincts sans lire MAX(version).
+
+Cache: les versions sont immuables; une version résolue (métadonnées + template Jinja
+compilé à la demande) est conservée en mémoire du process, indexée par id et par
+(template_id, version). Les templates compilés sont en outre indexés par checksum du
+contenu (sans TTL), ce qui permet au préchargement (services.template_warmup) d'y
+déposer les modules d'un bundle précompilé. Seules les métadonnées du template (format) peuvent changer:
+invalidate_template() est appelé à chaque écriture sur un template (nouvelle version,
+modification, suppression) et les entrées expirent après template_version_cache_ttl
+secondes pour propager ces changements aux autres workers.
+"""
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload
+
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.services.document_renderer import compile_template
+
+try:  # pragma: no cover
+    from prometheus_client import Counter
+    TEMPLATE_VERSION_LOOKUPS = Counter("template_version_lookups_total", "Résolutions de versions de template", ["result"])
+except Exception:  # pragma: no cover
+    TEMPLATE_VERSION_LOOKUPS = None  # type: ignore
+
+
+@dataclass
+class ResolvedVersion:
+    """Instantané d'une TemplateVersion et du format de son template."""
+
+    id: int
+    template_id: int
+    version: int
+    format: str | None
+    content: str | None
+    file_path: str | None
+    checksum: str | None
+    _compiled: Any = field(default=None, repr=False)
+
+    def compiled(self) -> Any:
+        """Template Jinja compilé une seule fois (contenu en base uniquement)."""
+        if self._compiled is None and self.content:
+            self._compiled = compiled_template(self.content, self.checksum)
+        return self._compiled
+
+
+def allocate_version(db: Session, template_id: int) -> int | None:
+    """Réserve le numéro de version suivant (None si le template n'existe pas).
+
+    À appeler dans la transaction qui insère la version: un rollback libère le numéro.
+    """
+    stmt = (
+        update(models.Template)
+        .where(models.Template.id == template_id)
+        .values(latest_version=models.Template.latest_version + 1)
+        .returning(models.Template.latest_version)
+    )
+    number = db.execute(stmt).scalar_one_or_none()
+    return int(number) if number is not None else None
+
+
+_lock = threading.Lock()
+_by_id: OrderedDict[int, tuple[ResolvedVersion, float]] = OrderedDict()  # id -> (version, expiration)
+_by_key: dict[tuple[int, int], int] = {}  # (template_id, version) -> id
+_compiled: OrderedDict[str, Any] = OrderedDict()  # checksum du contenu -> template compilé
+
+
+def _record(result: str) -> None:
+    if TEMPLATE_VERSION_LOOKUPS:
+        TEMPLATE_VERSION_LOOKUPS.labels(result).inc()
+
+
+def _get(version_id: int | None) -> ResolvedVersion | None:
+    if version_id is None:
+        return None
+    with _lock:
+        entry = _by_id.get(version_id)
+        if entry is None:
+            return None
+        resolved, expires = entry
+        if time.monotonic() >= expires:
+            _drop(version_id)
+            return None
+        _by_id.move_to_end(version_id)
+        return resolved
+
+
+def _drop(version_id: int) -> None:
+    entry = _by_id.pop(version_id, None)
+    if entry:
+        _by_key.pop((entry[0].template_id, entry[0].version), None)
+
+
+def register_compiled(checksum: str, template: Any) -> None:
+    with _lock:
+        _compiled[checksum] = template
+        _compiled.move_to_end(checksum)
+        while len(_compiled) > get_settings().template_version_cache_size:
+            _compiled.popitem(last=False)
+
+
+def compiled_template(content: str, checksum: str | None) -> Any:
+    """Template compilé pour ce contenu, partagé entre versions de même checksum."""
+    if checksum is None:
+        return compile_template(content)
+    with _lock:
+        template = _compiled.get(checksum)
+        if template is not None:
+            _compiled.move_to_end(checksum)
+            return template
+    template = compile_template(content)
+    register_compiled(checksum, template)
+    return template
+
+
+def _put(ver: models.TemplateVersion) -> ResolvedVersion:
+    resolved = ResolvedVersion(
+        id=ver.id,
+        template_id=ver.template_id,
+        version=ver.version,
+        format=ver.template.format if ver.template else None,
+        content=ver.content,
+        file_path=ver.file_path,
+        checksum=ver.checksum,
+    )
+    settings = get_settings()
+    with _lock:
+        _by_id[ver.id] = (resolved, time.monotonic() + settings.template_version_cache_ttl)
+        _by_key[(ver.template_id, ver.version)] = ver.id
+        while len(_by_id) > settings.template_version_cache_size:
+            oldest = next(iter(_by_id))
+            _drop(oldest)
+    return resolved
+
+
+def prime(versions: list[models.TemplateVersion]) -> None:
+    """Insère des versions déjà chargées (template joint) dans le cache."""
+    for ver in versions:
+        _put(ver)
+
+
+def _load(db: Session, *criteria: Any) -> ResolvedVersion | None:
+    _record("miss")
+    ver = db.query(models.TemplateVersion).options(joinedload(models.TemplateVersion.template)).filter(*criteria).first()
+    return _put(ver) if ver else None
+
+
+def resolve_version(db: Session, version_id: int) -> ResolvedVersion | None:
+    """Version par id; aucune requête si elle est en cache."""
+    resolved = _get(version_id)
+    if resolved is not None:
+        _record("hit")
+        return resolved
+    return _load(db, models.TemplateVersion.id == version_id)
+
+
+def resolve_version_number(db: Session, template_id: int, version: int) -> ResolvedVersion | None:
+    """Version par (template_id, numéro); aucune requête si elle est en cache."""
+    with _lock:
+        version_id = _by_key.get((template_id, version))
+    resolved = _get(version_id)
+    if resolved is not None:
+        _record("hit")
+        return resolved
+    return _load(db, models.TemplateVersion.template_id == template_id, models.TemplateVersion.version == version)
+
+
+def invalidate_template(template_id: int) -> None:
+    with _lock:
+        for version_id in [vid for (tid, _), vid in _by_key.items() if tid == template_id]:
+            _drop(version_id)
+
+
+def clear() -> None:
+    with _lock:
+        _by_id.clear()
+        _by_key.clear()
+        _compiled.clear()
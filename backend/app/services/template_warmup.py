@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+"""Préchargement des templates au démarrage (API: lifespan FastAPI; Celery: worker_ready /
+worker_process_init).
+
+La dernière version (templates.latest_version) de chaque template actif stocké en base est
+chargée en une requête, puis:
+ - compilée en modules Python par Jinja (compile_templates, environnement sandboxé de
+   document_renderer) dans un bundle versionné: <template_bundle_dir>/<empreinte>,
+   l'empreinte couvrant la version de Jinja, le format du bundle et les checksums des contenus. Un bundle déjà présent (autre process, redémarrage) est
+   réutilisé sans recompilation; il est construit dans un répertoire temporaire puis
+   renommé, si bien que des process concurrents ne voient jamais un bundle partiel.
+ - chargée via ModuleLoader et déposée dans le cache de template_versions (par id de
+   version et par checksum), de sorte que les premières générations après un déploiement
+   ne compilent ni ne requêtent rien.
+
+Les versions stockées en fichier ne sont pas préchargées (la génération n'utilise que le
+contenu en base). Un échec du préchargement est journalisé et n'empêche pas le démarrage.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import jinja2
+from jinja2 import DictLoader, ModuleLoader, TemplateNotFound
+from loguru import logger
+from sqlalchemy.orm import Session, contains_eager
+
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.services import template_versions
+from backend.app.services.document_renderer import make_environment
+
+MANIFEST = "bundle.json"
+BUNDLE_FORMAT = "sandboxed-1"  # à changer si l'environnement de rendu change (invalide les bundles)
+KEEP_BUNDLES = 3  # bundles conservés (déploiements précédents encore en cours d'arrêt)
+
+try:  # pragma: no cover
+    from prometheus_client import Gauge
+    TEMPLATE_WARMUP_SECONDS = Gauge("template_warmup_seconds", "Durée du dernier préchargement des templates", ["process"])
+    TEMPLATE_WARMUP_TEMPLATES = Gauge("template_warmup_templates", "Templates préchargés au dernier démarrage", ["process"])
+except Exception:  # pragma: no cover
+    TEMPLATE_WARMUP_SECONDS = None  # type: ignore
+    TEMPLATE_WARMUP_TEMPLATES = None  # type: ignore
+
+
+@dataclass
+class WarmupStats:
+    templates: int = 0
+    failed: int = 0
+    compiled: bool = False  # bundle construit par ce process (sinon réutilisé)
+    seconds: float = 0.0
+    bundle: str | None = None
+
+
+def active_versions(db: Session, limit: int) -> list[models.TemplateVersion]:
+    """Dernière version, stockée en base, de chaque template actif (template joint)."""
+    return (
+        db.query(models.TemplateVersion)
+        .join(models.TemplateVersion.template)
+        .options(contains_eager(models.TemplateVersion.template))
+        .filter(
+            models.Template.is_active.is_(True),
+            models.TemplateVersion.version == models.Template.latest_version,
+            models.TemplateVersion.content.isnot(None),
+            models.TemplateVersion.checksum.isnot(None),
+        )
+        .order_by(models.Template.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def bundle_path(checksums: list[str]) -> Path:
+    digest = hashlib.sha256("\n".join([jinja2.__version__, BUNDLE_FORMAT, *sorted(checksums)]).encode()).hexdigest()
+    return Path(get_settings().template_bundle_dir) / digest[:16]
+
+
+def build_bundle(sources: dict[str, str], target: Path) -> bool:
+    """Compile les sources (nom = checksum) en modules dans target; False si déjà présent."""
+    if (target / MANIFEST).exists():
+        return False
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=".build-", dir=target.parent))
+    try:
+        # zip=None: un module .py par template; les contenus invalides sont ignorés. Le code
+        # généré dépend de l'environnement (opérateurs interceptés par la sandbox): même
+        # environnement à la compilation et au chargement
+        make_environment(DictLoader(sources)).compile_templates(str(tmp), zip=None, ignore_errors=True)
+        (tmp / MANIFEST).write_text(json.dumps(sorted(sources)))
+        try:
+            os.rename(tmp, target)
+        except OSError:
+            return False  # construit entre-temps par un autre process
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    _prune(target.parent, keep=target)
+    return True
+
+
+def load_bundle(target: Path, names: list[str]) -> dict[str, Any]:
+    env = make_environment(ModuleLoader(str(target)))
+    loaded: dict[str, Any] = {}
+    for name in names:
+        try:
+            loaded[name] = env.get_template(name)
+        except TemplateNotFound:
+            continue
+    return loaded
+
+
+def _prune(root: Path, keep: Path) -> None:
+    bundles = sorted((p for p in root.iterdir() if p.is_dir() and not p.name.startswith(".")), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in bundles[KEEP_BUNDLES:]:
+        if old != keep:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def warm_up(db: Session) -> WarmupStats:
+    start = time.perf_counter()
+    stats = WarmupStats()
+    versions = active_versions(db, get_settings().template_version_cache_size)
+    sources = {v.checksum: v.content for v in versions if v.checksum and v.content}
+    if sources:
+        target = bundle_path(list(sources))
+        stats.compiled = build_bundle(sources, target)
+        stats.bundle = str(target)
+        loaded = load_bundle(target, list(sources))
+        for checksum, template in loaded.items():
+            template_versions.register_compiled(checksum, template)
+        # Les contenus non compilables restent résolus à la demande (erreur au rendu)
+        template_versions.prime([v for v in versions if v.checksum in loaded])
+        stats.templates = len(loaded)
+        stats.failed = len(sources) - len(loaded)
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def warm_up_templates(process: str) -> WarmupStats | None:
+    """Point d'entrée des hooks de démarrage: session dédiée, métriques, jamais d'exception."""
+    if not get_settings().template_warmup_enabled:
+        return None
+    from backend.app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        stats = warm_up(db)
+    except Exception as exc:
+        logger.warning(f"Préchargement des templates ignoré ({process}): {exc}")
+        return None
+    finally:
+        db.close()
+    if TEMPLATE_WARMUP_SECONDS:
+        TEMPLATE_WARMUP_SECONDS.labels(process).set(stats.seconds)
+        TEMPLATE_WARMUP_TEMPLATES.labels(process).set(stats.templates)
+    logger.info(
+        f"Templates préchargés ({process}): {stats.templates} en {stats.seconds:.3f}s"
+        f" (bundle {'compilé' if stats.compiled else 'réutilisé'}, {stats.failed} en échec)"
+    )
+    return stats
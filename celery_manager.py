@@ -14,7 +14,7 @@ import sys
 
 def run_celery_worker(args: list[str]) -> None:
     """Démarre un worker Celery."""
-    queue = args[0] if args else "celery,reports,documents,notifications"
+    queue = args[0] if args else "celery,reports_high,reports,reports_low,documents,notifications,imports"
     concurrency = args[1] if len(args) > 1 else "2"
     
     cmd = [
@@ -77,7 +77,7 @@ class CeleryMonitor:
             
             # Longueurs des queues
             queue_lengths = {}
-            for queue in ['reports', 'documents', 'notifications', 'celery']:
+            for queue in ['reports_high', 'reports', 'reports_low', 'documents', 'notifications', 'celery']:
                 length = redis_client.llen(queue)
                 queue_lengths[queue] = length
             
@@ -105,9 +105,9 @@ class CeleryMonitor:
             total_time = 0
             task_count = 0
             
-            for key in celery_keys[-50:]:  # Analyser les 50 dernières tâches
+            recent = celery_keys[-50:]  # Analyser les 50 dernières tâches (un seul MGET)
+            for result_data in (redis_client.mget(recent) if recent else []):
                 try:
-                    result_data = redis_client.get(key)
                     if result_data:
                         result = json.loads(result_data)
                         status = result.get('status', 'UNKNOWN')
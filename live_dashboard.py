@@ -38,7 +38,7 @@ def get_celery_metrics():
         metrics['redis']['clients'] = redis_info.get('connected_clients', 0)
         
         # Queue lengths
-        for queue in ['reports', 'documents', 'notifications', 'celery']:
+        for queue in ['reports_high', 'reports', 'reports_low', 'documents', 'notifications', 'celery']:
             length = r.llen(queue)
             metrics['queues'][queue] = length
         
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Benchmark: primes par compagnie et devise, boucle ORM vs agrégation vectorisée.
+
+Crée une base SQLite temporaire de N polices (défaut 1 000 000, réparties sur 50 compagnies
+et 3 devises), puis calcule les mêmes totaux:
+ - orm: parcours des entités Policy (yield_per, compagnie chargée par joinedload) et
+   cumul dans un dictionnaire, comme le ferait une route naïve
+ - vectorised: services.analytics.load_policy_frame + group_totals(company)
+Les résultats sont comparés avant affichage des temps.
+
+Usage: python scripts/bench_analytics.py [--policies 1000000] [--db /tmp/bench.db]
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import Session, joinedload  # noqa: E402
+
+from backend.app.db import models  # noqa: E402
+from backend.app.db.base import Base  # noqa: E402
+from backend.app.services import analytics  # noqa: E402
+
+CURRENCIES = ("XAF", "EUR", "USD")
+COMPANIES = 50
+BATCH = 50_000
+
+
+def populate(session: Session, policies: int) -> None:
+    session.execute(insert(models.Company), [{"id": i + 1, "name": f"Compagnie {i + 1}", "code": f"C{i + 1}"} for i in range(COMPANIES)])
+    clients = max(policies // 10, 1)
+    session.execute(insert(models.Client), [{"id": i + 1, "first_name": "P", "last_name": f"N{i}", "owner_id": None} for i in range(clients)])
+    start = datetime(2024, 1, 1, tzinfo=UTC)
+    for offset in range(0, policies, BATCH):
+        session.execute(insert(models.Policy), [
+            {
+                "policy_number": f"B{i:08d}", "client_id": i % clients + 1, "company_id": i % COMPANIES + 1,
+                "product_name": "Auto", "premium_amount": 1000 + (i * 7919) % 50_000, "currency": CURRENCIES[i % 3],
+                "status": "active", "effective_date": start + timedelta(days=i % 365), "expiry_date": start + timedelta(days=365 + i % 365),
+            }
+            for i in range(offset, min(offset + BATCH, policies))
+        ])
+    session.commit()
+
+
+def orm_totals(session: Session) -> dict[tuple[str, str], int]:
+    totals: dict[tuple[str, str], int] = {}
+    for policy in session.query(models.Policy).options(joinedload(models.Policy.company)).yield_per(10_000):
+        key = (policy.company.name if policy.company else "", policy.currency or "XAF")
+        totals[key] = totals.get(key, 0) + (policy.premium_amount or 0)
+    return totals
+
+
+def vectorised_totals(session: Session) -> dict[tuple[str, str], int]:
+    frame = analytics.load_policy_frame(session)
+    return {(row["label"] or "", row["currency"]): row["premium_total"] for row in analytics.group_totals(frame, "company")}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policies", type=int, default=1_000_000)
+    parser.add_argument("--db", default=None, help="Fichier SQLite (défaut: répertoire temporaire)")
+    args = parser.parse_args()
+    if not analytics.NUMPY_AVAILABLE:
+        sys.exit("NumPy requis (pip install numpy)")
+    path = args.db or str(Path(tempfile.mkdtemp()) / "bench_analytics.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        if not session.query(models.Policy.id).limit(1).first():
+            start = time.perf_counter()
+            populate(session, args.policies)
+            print(f"insertion de {args.policies} polices: {time.perf_counter() - start:.1f}s ({path})")
+    results = {}
+    for mode, compute in (("orm       ", orm_totals), ("vectorised", vectorised_totals)):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            results[mode] = compute(session)
+            print(f"{mode}: {time.perf_counter() - start:.2f}s ({len(results[mode])} groupes)")
+    assert len(set(map(lambda r: tuple(sorted(r.items())), results.values()))) == 1, "Résultats divergents"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Microbenchmark: prévisualisations concurrentes, stockage synchrone vs asynchrone.
+
+Simule un backend distant de latence fixe (défaut 50 ms) et lance N lectures de contenu
+de template concurrentes (chemin de lecture des prévisualisations, sans checksum donc
+sans cache):
+ - sync: read_cached_text dans un pool de 40 threads (taille par défaut du pool anyio
+   utilisé par FastAPI pour les routes def)
+ - async: aread_cached_text attendu directement sur la boucle d'événements
+
+Usage: python scripts/bench_async_storage.py [--requests 400] [--latency 0.05] [--threads 40]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from backend.app.services.template_cache import aread_cached_text, read_cached_text  # noqa: E402
+
+CONTENT = "<h1>{{ inline_context.example }}</h1>" * 20
+
+
+class SlowStorage:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def read_text(self, path: str) -> str:
+        time.sleep(self.latency)
+        return CONTENT
+
+    async def aread_text(self, path: str) -> str:
+        await asyncio.sleep(self.latency)
+        return CONTENT
+
+
+async def run_sync(storage: SlowStorage, requests: int, threads: int) -> float:
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        start = time.perf_counter()
+        await asyncio.gather(*(loop.run_in_executor(pool, read_cached_text, storage, f"tpl/{i}", None) for i in range(requests)))
+        return time.perf_counter() - start
+
+
+async def run_async(storage: SlowStorage, requests: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(aread_cached_text(storage, f"tpl/{i}", None) for i in range(requests)))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--threads", type=int, default=40)
+    args = parser.parse_args()
+    storage = SlowStorage(args.latency)
+    for mode, coro in (
+        ("sync ", run_sync(storage, args.requests, args.threads)),
+        ("async", run_async(storage, args.requests)),
+    ):
+        elapsed = asyncio.run(coro)
+        print(f"{mode}: {args.requests} prévisualisations en {elapsed:.2f}s ({args.requests / elapsed:.0f} req/s)")
+
+
+if __name__ == "__main__":
+    main()
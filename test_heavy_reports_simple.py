@@ -41,8 +41,7 @@ def test_heavy_reports():
     try:
         params = {
             "report_type": "pdf",
-            "pages": 10,
-            "processing_time": 5
+            "pages": 10
         }
         
         response = requests.post(
@@ -71,8 +70,12 @@ def test_heavy_reports():
                         
                         if status in ["completed", "failed"]:
                             if status == "completed":
+                                result = status_data.get("result") or {}
                                 print("   ✅ Job terminé avec succès!")
-                                print(f"   📁 Fichier: {status_data.get('result', {}).get('file_path')}")
+                                print(f"   📁 Fichier: {result.get('file_path')}")
+                                # Travail réellement mesuré (agrégation, rendu, stockage)
+                                print(f"   📏 Lignes: {result.get('rows')} | Octets: {result.get('size_bytes')}")
+                                print(f"   ⏱️  Temps: {result.get('timings')}")
                             else:
                                 print(f"   ❌ Job échoué: {status_data.get('error')}")
                             break
@@ -93,8 +96,7 @@ def test_heavy_reports():
     try:
         params = {
             "report_type": "excel",
-            "pages": 5,
-            "processing_time": 3
+            "pages": 5
         }
         
         response = requests.post(
@@ -120,8 +122,7 @@ def test_heavy_reports():
     try:
         params = {
             "report_type": "analysis",
-            "pages": 15,
-            "processing_time": 8
+            "pages": 15
         }
         
         response = requests.post(
@@ -147,8 +148,7 @@ def test_heavy_reports():
     try:
         params = {
             "report_type": "invalid",
-            "pages": 1,
-            "processing_time": 1
+            "pages": 1
         }
         
         response = requests.post(
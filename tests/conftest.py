@@ -64,3 +64,44 @@ def admin_headers_factory() -> Callable[[str], dict[str, str]]:
 def admin_headers(admin_headers_factory: Callable[[str], dict[str, str]]) -> dict[str, str]:
     """Headers pour un admin par défaut (email stable)."""
     return admin_headers_factory()
+
+
+# --- Budget de requêtes SQL par route (voir tests/query_budget.py) ---
+@pytest.fixture(scope="session", autouse=True)
+def query_budget_tracker() -> Any:
+    from backend.app.db.session import engine, get_db
+    from backend.app.main import app
+    from tests.query_budget import QueryBudgetTracker
+
+    tracker = QueryBudgetTracker()
+    tracker.install(engine)
+    app.dependency_overrides[get_db] = tracker.get_db_override()
+    yield tracker
+    app.dependency_overrides.pop(get_db, None)
+    tracker.uninstall(engine)
+    if os.environ.get("QUERY_BUDGET_REPORT"):
+        for key, count in sorted(tracker.observed.items()):
+            print(f"{count:3d}  {key}")
+
+
+@pytest.fixture(autouse=True)
+def query_budget(query_budget_tracker: Any) -> Any:
+    """Fait échouer le test si une requête HTTP dépasse le budget SQL de sa route."""
+    query_budget_tracker.violations.clear()
+    yield query_budget_tracker
+    if query_budget_tracker.violations:
+        pytest.fail("Budget de requêtes SQL dépassé:\n" + "\n".join(query_budget_tracker.violations))
+
+
+# --- Clients Redis réels pour kombu ---
+@pytest.fixture(autouse=True)
+def real_redis_classes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """test_celery_fakeredis.py (racine) remplace redis.Redis par une fonction à l'import.
+
+    Le transport redis de kombu (importé par AsyncResult, chord, revoke) hérite de redis.Redis:
+    les classes d'origine sont rétablies pour chaque test de tests/ (make test collecte tout).
+    """
+    import redis
+
+    monkeypatch.setattr(redis, "Redis", redis.client.Redis)
+    monkeypatch.setattr(redis, "StrictRedis", redis.client.StrictRedis)
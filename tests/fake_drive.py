@@ -0,0 +1,154 @@
+"""Service Google Drive factice (API v3, sous-ensemble utilisé par GoogleDriveStorageBackend).
+
+Permet de tester et de mesurer le backend hors ligne:
+ - latency: délai simulé par appel HTTP (upload de bloc, plage téléchargée, métadonnées)
+ - fail(op, n): les n prochains appels de l'opération op ("create", "get_media", "get",
+   "list", "delete") répondent 429 rateLimitExceeded
+ - max_parallel: nombre maximal de requêtes observées simultanément
+"""
+import re
+import threading
+import time
+from datetime import UTC, datetime
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+RATE_LIMIT_BODY = b'{"error": {"errors": [{"reason": "rateLimitExceeded"}], "code": 429}}'
+
+
+def http_error(status: int, content: bytes = b"{}") -> HttpError:
+    return HttpError(httplib2.Response({"status": str(status)}), content)
+
+
+class _Request:
+    def __init__(self, drive: "FakeDrive", op: str, fn):
+        self.drive = drive
+        self.op = op
+        self.fn = fn
+        self.headers: dict[str, str] = {}
+
+    def execute(self, http=None, num_retries=0):
+        with self.drive.calling(self.op):
+            return self.fn(self.headers)
+
+
+class _UploadRequest:
+    """Upload résumable: un appel HTTP par bloc de media.chunksize() octets."""
+
+    def __init__(self, drive: "FakeDrive", name: str, media, properties=None):
+        self.drive = drive
+        self.name = name
+        self.media = media
+        self.properties = properties or {}
+        self.offset = 0
+        self.parts: list[bytes] = []
+
+    def next_chunk(self, http=None, num_retries=0):
+        with self.drive.calling("create"):
+            chunk = self.media.getbytes(self.offset, self.media.chunksize())
+            self.parts.append(chunk)
+            self.offset += len(chunk)
+            self.drive.upload_chunks += 1
+            if self.offset < self.media.size():
+                return None, None
+            return None, {"id": self.drive.add(self.name, b"".join(self.parts), self.properties)}
+
+
+class FakeDrive:
+    def __init__(self, latency: float = 0.0, page_size: int = 100):
+        self.latency = latency
+        self.page_size = page_size
+        self.files_content: dict[str, bytes] = {}
+        self.names: dict[str, str] = {}
+        self.modified: dict[str, str] = {}
+        self.properties: dict[str, dict[str, str]] = {}
+        self.upload_chunks = 0
+        self.calls: dict[str, int] = {}
+        self.max_parallel = 0
+        self._failures: dict[str, int] = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    # --- instrumentation ---
+    def fail(self, op: str, times: int) -> None:
+        self._failures[op] = times
+
+    def calling(self, op: str):
+        drive = self
+
+        class _Ctx:
+            def __enter__(self_inner):
+                with drive._lock:
+                    drive.calls[op] = drive.calls.get(op, 0) + 1
+                    if drive._failures.get(op, 0) > 0:
+                        drive._failures[op] -= 1
+                        raise http_error(429, RATE_LIMIT_BODY)
+                    drive._active += 1
+                    drive.max_parallel = max(drive.max_parallel, drive._active)
+                if drive.latency:
+                    time.sleep(drive.latency)
+
+            def __exit__(self_inner, *exc):
+                with drive._lock:
+                    drive._active -= 1
+                return False
+
+        return _Ctx()
+
+    def add(self, name: str, data: bytes, properties: dict[str, str] | None = None) -> str:
+        with self._lock:
+            file_id = f"fake-{len(self.names) + 1}"
+            self.files_content[file_id] = data
+            self.names[file_id] = name
+            self.properties[file_id] = dict(properties or {})
+            self.modified[file_id] = datetime.now(UTC).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        return file_id
+
+    def _content(self, file_id: str) -> bytes:
+        if file_id not in self.files_content:
+            raise http_error(404)
+        return self.files_content[file_id]
+
+    # --- API Drive v3 ---
+    def files(self):
+        return self
+
+    def create(self, body, media_body, fields):
+        return _UploadRequest(self, body["name"], media_body, body.get("appProperties"))
+
+    def get(self, fileId, fields):
+        return _Request(self, "get", lambda headers: {"size": str(len(self._content(fileId)))})
+
+    def get_media(self, fileId):
+        def _read(headers):
+            data = self._content(fileId)
+            m = re.fullmatch(r"bytes=(\d+)-(\d+)", headers.get("Range", ""))
+            return data[int(m.group(1)):int(m.group(2)) + 1] if m else data
+
+        return _Request(self, "get_media", _read)
+
+    def list(self, q, orderBy, fields, pageToken=None):
+        # Seul le filtre appProperties has { key='k' and value='v' } est interprété
+        wanted = dict(re.findall(r"appProperties has \{ key='([^']*)' and value='([^']*)' \}", q))
+
+        def _list(headers):
+            ids = sorted(
+                (i for i in self.names if all(self.properties[i].get(k) == v for k, v in wanted.items())),
+                key=lambda i: (self.names[i], i),
+            )
+            start = int(pageToken or 0)
+            page = ids[start:start + self.page_size]
+            resp = {"files": [{"id": i, "name": self.names[i], "createdTime": self.modified[i], "modifiedTime": self.modified[i]} for i in page]}
+            if start + self.page_size < len(ids):
+                resp["nextPageToken"] = str(start + self.page_size)
+            return resp
+
+        return _Request(self, "list", _list)
+
+    def delete(self, fileId):
+        def _delete(headers):
+            self._content(fileId)
+            del self.files_content[fileId], self.names[fileId], self.modified[fileId], self.properties[fileId]
+
+        return _Request(self, "delete", _delete)
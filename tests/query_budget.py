@@ -0,0 +1,150 @@
+"""Budget de requêtes SQL par route (détection des régressions N+1).
+
+Chaque route de backend/app/api/routes doit déclarer ici le nombre maximal de requêtes
+SQL qu'elle émet pour une requête HTTP (authentification comprise). Le suivi est activé
+pour toute la session de tests (voir conftest.py): un test échoue si une requête dépasse
+le budget de sa route. Un budget s'entend indépendamment du volume de données:
+une route qui boucle sur des lignes avec un chargement paresseux le dépassera.
+
+QUERY_BUDGET_REPORT=1 affiche en fin de session le maximum observé par route.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.app.db.session import SessionLocal, engine
+
+# "METHODE chemin" -> nombre maximal de requêtes SQL
+QUERY_BUDGETS: dict[str, int] = {
+    # auth
+    "POST /api/v1/auth/register": 3,
+    "POST /api/v1/auth/login": 3,
+    "POST /api/v1/auth/refresh": 5,
+    "POST /api/v1/auth/logout": 2,
+    "POST /api/v1/auth/revoke": 3,
+    "POST /api/v1/auth/revoke-all": 3,
+    "GET /api/v1/auth/devices": 2,
+    "DELETE /api/v1/auth/devices/{device_id}": 3,
+    # clients
+    "POST /api/v1/clients": 3,
+    "GET /api/v1/clients": 2,
+    "GET /api/v1/clients/{client_id}": 2,
+    "PUT /api/v1/clients/{client_id}": 4,
+    "DELETE /api/v1/clients/{client_id}": 3,
+    # companies (liste servie depuis le cache: 0 en régime établi)
+    "POST /api/v1/companies": 4,
+    "GET /api/v1/companies": 1,
+    "GET /api/v1/companies/{company_id}": 1,
+    "PUT /api/v1/companies/{company_id}": 4,
+    "DELETE /api/v1/companies/{company_id}": 4,
+    # policies
+    "POST /api/v1/policies": 8,  # dont upserts des tables de synthèse du portefeuille
+    "GET /api/v1/policies": 2,
+    "GET /api/v1/policies/{policy_id}": 2,
+    "PUT /api/v1/policies/{policy_id}": 6,  # idem
+    "DELETE /api/v1/policies/{policy_id}": 5,  # idem
+    # reports
+    "POST /api/v1/reports/dummy": 5,  # dont recherche d'un job identique
+    "POST /api/v1/reports/heavy": 7,  # dont job identique, coût estimé et rapports en cours (choix de la voie)
+    "GET /api/v1/reports/jobs/{job_id}": 3,  # dont mise à jour du statut final
+    "GET /api/v1/reports/jobs/{job_id}/events": 2,
+    "POST /api/v1/reports/jobs/status": 2,
+    # documents
+    "POST /api/v1/documents/generate": 8,  # dont création initiale de storage_config
+    "GET /api/v1/documents/": 3,
+    "GET /api/v1/documents/{doc_id}": 2,
+    "POST /api/v1/documents/{doc_id}/signed-url": 2,
+    "GET /api/v1/documents/{doc_id}/download": 6,  # idem
+    "POST /api/v1/documents/purge-orphans": 6,
+    "GET /api/v1/documents/purge-orphans/{report_job_id}": 2,
+    # templates
+    "POST /api/v1/templates/": 5,
+    "GET /api/v1/templates/": 2,
+    "GET /api/v1/templates/{template_id}": 2,
+    "PATCH /api/v1/templates/{template_id}": 4,
+    "POST /api/v1/templates/{template_id}/versions": 5,
+    "GET /api/v1/templates/{template_id}/versions/{version}": 2,
+    "GET /api/v1/templates/{template_id}/versions/{version}/profile": 2,
+    "DELETE /api/v1/templates/{template_id}": 4,  # dont suppression des versions
+    "POST /api/v1/templates/{template_id}/upload": 8,  # dont création initiale de storage_config
+    "GET /api/v1/templates/{template_id}/versions/{version}/preview": 2,
+    "GET /api/v1/templates/{template_id}/versions/{version}/preview.pdf": 2,
+    # admin / audit / recherche / analytique / imports
+    "GET /api/v1/admin/storage-config": 4,  # dont création initiale de storage_config
+    "PUT /api/v1/admin/storage-config": 6,  # dont création initiale de storage_config
+    "GET /api/v1/audit-logs/": 3,
+    "GET /api/v1/audit-logs/export": 2,
+    "GET /api/v1/search": 3,
+    "GET /api/v1/analytics/premiums": 2,
+    "GET /api/v1/analytics/expiries": 2,
+    "GET /api/v1/analytics/percentiles": 2,
+    "GET /api/v1/analytics/summary": 3,
+    "POST /api/v1/imports/{kind}": 8,  # inclut la tâche exécutée inline par test_imports
+    "GET /api/v1/imports/{report_job_id}": 2,
+}
+
+
+@dataclass
+class QueryBudgetTracker:
+    """Compte les requêtes émises sur l'engine pendant chaque requête HTTP.
+
+    Le TestClient traite les requêtes séquentiellement: un compteur global suffit,
+    ouvert à l'entrée de la dépendance get_db et relevé à sa sortie.
+    """
+
+    current: int | None = None
+    observed: dict[str, int] = field(default_factory=dict)
+    violations: list[str] = field(default_factory=list)
+
+    def on_execute(self, *args: Any, **kwargs: Any) -> None:
+        if self.current is not None:
+            self.current += 1
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self.on_execute)
+
+    def uninstall(self, engine: Engine) -> None:
+        event.remove(engine, "before_cursor_execute", self.on_execute)
+
+    def record(self, key: str, count: int) -> None:
+        self.observed[key] = max(count, self.observed.get(key, 0))
+        budget = QUERY_BUDGETS.get(key)
+        if budget is not None and count > budget:
+            self.violations.append(f"{key}: {count} requêtes SQL (budget {budget})")
+
+    def get_db_override(self) -> Any:
+        def _get_db(request: Request) -> Iterator[Any]:
+            db = SessionLocal()
+            self.current = 0
+            try:
+                yield db
+            finally:
+                db.close()
+                count, self.current = self.current, None
+                route = request.scope.get("route")
+                if route is not None and count is not None:
+                    self.record(f"{request.method} {route.path}", count)
+
+        return _get_db
+
+
+@contextmanager
+def capture_sql() -> Iterator[list[str]]:
+    """Instructions SQL émises sur l'engine pendant le bloc (forme des requêtes d'un test)."""
+    statements: list[str] = []
+
+    def _record(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
@@ -0,0 +1,51 @@
+import pytest
+
+from backend.app.db.session import SessionLocal
+from backend.app.services import analytics
+from backend.app.services.report_engine import ReportFilters, aggregate_portfolio
+from tests.test_report_engine import _portfolio
+from tests.utils import auth_headers, client
+
+pytest.importorskip("numpy")
+
+
+def _company() -> int:
+    db = SessionLocal()
+    try:
+        return _portfolio(db)
+    finally:
+        db.close()
+
+
+def test_analytics_endpoints_group_bucket_and_percentiles():
+    company_id = _company()
+    headers = auth_headers("analytics.admin@example.com")
+
+    r = client.get(f"/api/v1/analytics/premiums?group_by=currency&company_id={company_id}", headers=headers)
+    assert r.status_code == 200, r.text
+    assert {(row["key"], row["policies"], row["premium_total"]) for row in r.json()["rows"]} == {("EUR", 1, 300), ("XAF", 2, 3500)}
+    rows = client.get(f"/api/v1/analytics/premiums?company_id={company_id}", headers=headers).json()["rows"]
+    assert {row["key"] for row in rows} == {company_id} and rows[0]["label"].startswith("Engine ")
+
+    pipeline = client.get(f"/api/v1/analytics/expiries?company_id={company_id}", headers=headers).json()["rows"]
+    assert {(row["bucket"], row["currency"], row["premium_total"]) for row in pipeline} == {("expired", "XAF", 1000), ("0-30", "XAF", 2500), (">90", "EUR", 300)}
+
+    r = client.get(f"/api/v1/analytics/percentiles?company_id={company_id}&quantiles=50&quantiles=100", headers=headers)
+    assert r.json()["by_currency"]["XAF"] == {"p50": 1750.0, "p100": 2500.0}
+    assert client.get("/api/v1/analytics/premiums?group_by=policy", headers=headers).status_code == 422
+
+    # Hors admin: limité aux clients de l'utilisateur
+    user_headers = auth_headers("analytics.user@example.com", role="user")
+    assert client.get(f"/api/v1/analytics/premiums?company_id={company_id}", headers=user_headers).json()["rows"] == []
+
+
+def test_vectorised_aggregate_matches_row_by_row(monkeypatch):
+    company_id = _company()
+    db = SessionLocal()
+    try:
+        filters = ReportFilters(company_id=company_id)
+        vectorised = aggregate_portfolio(db, filters).as_dict()
+        monkeypatch.setattr(analytics, "NUMPY_AVAILABLE", False)
+        assert aggregate_portfolio(db, filters).as_dict() == vectorised
+    finally:
+        db.close()
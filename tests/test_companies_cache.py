@@ -0,0 +1,41 @@
+from uuid import uuid4
+
+from backend.app.services import company_cache
+from tests.query_budget import capture_sql
+from tests.utils import auth_headers, client
+
+
+def test_company_list_served_from_cache_with_etag():
+    headers = auth_headers("companies.cache@example.com")
+    company_cache.invalidate_catalogue()
+    r = client.get("/api/v1/companies")
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    assert "max-age" in r.headers["cache-control"]
+
+    with capture_sql() as statements:
+        r = client.get("/api/v1/companies")
+        assert r.headers["etag"] == etag
+        r = client.get("/api/v1/companies", headers={"If-None-Match": etag})
+        assert r.status_code == 304
+        assert r.content == b""
+    assert statements == []
+
+    # Une écriture invalide le catalogue
+    suffix = uuid4().hex[:6]
+    r = client.post("/api/v1/companies", json={"name": f"Cache_{suffix}", "code": f"K{suffix}"}, headers=headers)
+    assert r.status_code == 201
+    comp_id = r.json()["id"]
+    r = client.get("/api/v1/companies", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert any(c["id"] == comp_id for c in r.json())
+
+    etag = r.headers["etag"]
+    client.put(f"/api/v1/companies/{comp_id}", json={"name": f"Cache2_{suffix}"}, headers=headers)
+    r = client.get("/api/v1/companies", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert any(c["name"] == f"Cache2_{suffix}" for c in r.json())
+
+    client.delete(f"/api/v1/companies/{comp_id}", headers=headers)
+    assert all(c["id"] != comp_id for c in client.get("/api/v1/companies").json())
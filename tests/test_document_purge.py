@@ -0,0 +1,63 @@
+import time
+
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services.document_purge import purge_orphans
+from backend.app.services.document_storage import StoredDocument
+
+
+class FakeStorage:
+    """Stockage en mémoire: références triées, date de modification par référence."""
+
+    name = "fake"
+
+    def __init__(self, docs: dict[str, float]) -> None:
+        self.docs = docs
+        self.deleted: list[str] = []
+
+    def list_documents(self, start_after=None):
+        for ref in sorted(self.docs):
+            if start_after is None or ref > start_after:
+                yield StoredDocument(ref=ref, modified=self.docs[ref])
+
+    def delete_document(self, ref):
+        self.deleted.append(ref)
+        del self.docs[ref]
+
+
+def _known(db, ref: str) -> None:
+    db.add(models.GeneratedDocument(document_type="purge_test", file_path=ref, status="generated"))
+    db.commit()
+
+
+def test_purge_batches_grace_and_dry_run():
+    old = time.time() - 7200
+    docs = {f"purge-test/doc_{i:02d}": old for i in range(7)}
+    docs["purge-test/doc_99"] = time.time()  # écriture récente, ligne pas encore commitée
+    db = SessionLocal()
+    try:
+        _known(db, "purge-test/doc_03")
+        storage = FakeStorage(docs)
+        progress = []
+        stats = purge_orphans(db, storage, batch_size=3, grace_seconds=3600, dry_run=True, on_progress=lambda s: progress.append(s.cursor))
+        assert (stats.scanned, stats.orphans, stats.recent, stats.removed) == (8, 6, 1, 0)
+        assert progress == ["purge-test/doc_02", "purge-test/doc_05", "purge-test/doc_99"]
+        assert storage.deleted == []
+
+        stats = purge_orphans(db, storage, batch_size=3, grace_seconds=3600)
+        assert stats.removed == 6
+        assert sorted(storage.docs) == ["purge-test/doc_03", "purge-test/doc_99"]
+    finally:
+        db.close()
+
+
+def test_purge_resumes_after_cursor():
+    old = time.time() - 7200
+    storage = FakeStorage({f"purge-resume/doc_{i}": old for i in range(5)})
+    db = SessionLocal()
+    try:
+        stats = purge_orphans(db, storage, batch_size=2, grace_seconds=0, cursor="purge-resume/doc_2")
+        assert storage.deleted == ["purge-resume/doc_3", "purge-resume/doc_4"]
+        assert stats.scanned == 2 and stats.cursor == "purge-resume/doc_4"
+    finally:
+        db.close()
@@ -0,0 +1,95 @@
+import hashlib
+import io
+from datetime import UTC, datetime
+
+import pytest
+
+from backend.app.services.document_renderer import OUTPUT_DIR, store_output
+from backend.app.services.document_storage import document_key
+from backend.app.services.storage_provider import LocalStorageBackend, S3StorageBackend
+
+
+class FakeS3:
+    """Bouchon S3 en mémoire limité aux appels utilisés pour les documents générés."""
+
+    class NoSuchKey(Exception):
+        response = {"Error": {"Code": "NoSuchKey"}}
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.presigned: list[dict] = []
+
+    def put_object(self, Bucket, Key, Body, **kw):
+        self.objects[Key] = Body
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.NoSuchKey()
+        return {"Body": io.BytesIO(self.objects[Key])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def generate_presigned_url(self, op, Params, ExpiresIn):
+        self.presigned.append(Params)
+        return f"https://s3.example/{Params['Key']}?exp={ExpiresIn}"
+
+    def get_paginator(self, op):
+        fake = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix, StartAfter=""):
+                keys = [k for k in sorted(fake.objects) if k.startswith(Prefix) and k > StartAfter]
+                yield {"Contents": [{"Key": k, "LastModified": datetime.now(UTC)} for k in keys]}
+
+        return Paginator()
+
+
+def test_document_key_is_sharded_by_checksum_prefix():
+    checksum = hashlib.sha256(b"x").hexdigest()
+    assert document_key(checksum, "pdf") == f"generated/{checksum[:2]}/{checksum[2:4]}/doc_{checksum[:12]}.pdf"
+
+
+def test_local_store_output_sharded_roundtrip():
+    data = b"<p>document local</p>"
+    storage = LocalStorageBackend()
+    result = store_output(data, "html", storage)
+    checksum = hashlib.sha256(data).hexdigest()
+    assert result.checksum == checksum
+    assert result.file_path == str(OUTPUT_DIR / checksum[:2] / checksum[2:4] / f"doc_{checksum[:12]}.html")
+    assert b"".join(storage.open_document(result.file_path)) == data
+    assert result.file_path in {d.ref for d in storage.list_documents()}
+    assert storage.document_url(result.file_path, "doc.html", "text/html", 60) is None
+    storage.delete_document(result.file_path)
+    with pytest.raises(FileNotFoundError):
+        storage.open_document(result.file_path)
+
+
+def test_local_reads_legacy_flat_documents_and_rejects_escape():
+    storage = LocalStorageBackend()
+    legacy = OUTPUT_DIR / "doc_legacyflat.html"
+    legacy.write_bytes(b"ancien")
+    try:
+        assert b"".join(storage.open_document(str(legacy))) == b"ancien"
+    finally:
+        legacy.unlink()
+    with pytest.raises(ValueError):
+        storage.open_document("pyproject.toml")
+
+
+def test_s3_documents_use_key_and_presigned_url():
+    fake = FakeS3()
+    storage = S3StorageBackend("bucket", None, None, client=fake)
+    data = b"%PDF contenu"
+    result = store_output(data, "pdf", storage)
+    assert result.file_path == document_key(result.checksum, "pdf")
+    assert fake.objects[result.file_path] == data
+    url = storage.document_url(result.file_path, "doc.pdf", result.mime_type, 120)
+    assert url == f"https://s3.example/{result.file_path}?exp=120"
+    assert fake.presigned[-1]["ResponseContentType"] == "application/pdf"
+    assert b"".join(storage.open_document(result.file_path)) == data
+    assert [d.ref for d in storage.list_documents()] == [result.file_path]
+    assert list(storage.list_documents(start_after=result.file_path)) == []
+    storage.delete_document(result.file_path)
+    with pytest.raises(FileNotFoundError):
+        storage.open_document(result.file_path)
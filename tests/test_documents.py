@@ -117,11 +117,31 @@ def test_generate_encrypted_and_compressed():
     assert meta["compressed"] is True
     assert meta["encrypted"] is True
 
-def test_purge_orphans_requires_admin():
-    token = auth_headers("docadmin@example.com")["Authorization"].split()[1]
+def test_purge_orphans_requires_admin(monkeypatch):
+    import os
+    import time
+    from types import SimpleNamespace
+
+    from backend.app.services import document_tasks
     from backend.app.services.document_renderer import OUTPUT_DIR
+    launched = []
+    monkeypatch.setattr(document_tasks.purge_orphan_documents, "apply_async", lambda args, task_id: launched.append(args) or SimpleNamespace(id=task_id))
+    token = auth_headers("docadmin@example.com")["Authorization"].split()[1]
     orphan = OUTPUT_DIR / "doc_orphan.txt"
     orphan.write_text("orphan")
+    old = time.time() - 2 * 3600  # au-delà du délai de grâce
+    os.utime(orphan, (old, old))
     r = client.post("/api/v1/documents/purge-orphans", headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 202, r.text
+    job_id = r.json()["report_job_id"]
+    assert launched == [(job_id,)]
+    document_tasks.purge_orphan_documents.run(job_id)
+    r = client.get(f"/api/v1/documents/purge-orphans/{job_id}", headers={"Authorization": f"Bearer {token}"})
     assert r.status_code == 200
-    assert "doc_orphan.txt" in r.json()["removed"] or orphan.exists() is False
+    body = r.json()
+    assert body["status"] == "completed"
+    assert str(orphan) in body["progress"]["sample"]
+    assert not orphan.exists()
+    user_token = bearer(auth_headers("docuser@example.com", role="user"))
+    r = client.post("/api/v1/documents/purge-orphans", headers={"Authorization": f"Bearer {user_token}"})
+    assert r.status_code == 403
@@ -1,68 +1,120 @@
+import io
+import os
+import time
+
 import pytest
 
-from backend.app.services.gdrive_backend import GoogleDriveStorageBackend
-
-
-class DummyDrive:
-    def __init__(self):
-        self.files_created = []
-        self.files_content = {}
-    def files(self):
-        return self
-    def create(self, body, media_body, fields):
-        # Simule la création d’un fichier
-        file_id = f"dummy_{body['name']}"
-        self.files_created.append(file_id)
-        self.files_content[file_id] = media_body._fd.getvalue()
-        # Correction : Resp hérite de dict, possède status et content-location
-        class Resp(dict):
-            def __init__(self):
-                super().__init__()
-                self.status = 200
-                self["content-location"] = f"mock://{file_id}"
-            def execute(self_inner):
-                return {"id": file_id}
-        return Resp()
-    def get_media(self, fileId):
-        # Mock complet pour MediaIoBaseDownload
-        class DummyProgress:
-            def __init__(self):
-                self.progress = 1.0
-        class DummyHttp:
-            def request(self_inner, uri, method, *args, **kwargs):
-                class Resp(dict):
-                    def __init__(self):
-                        super().__init__()
-                        self.status = 200
-                        self["content-location"] = uri
-                return Resp(), self.files_content[fileId]
-        class Req:
-            def __init__(self_inner):
-                self_inner.fileId = fileId
-                self_inner.uri = f"mock://{fileId}"
-                self_inner.headers = {}
-                self_inner.http = DummyHttp()
-            def next_chunk(self_inner):
-                # Simule un chunk téléchargé (status, done)
-                return (DummyProgress(), True)
-            def read(self_inner):
-                return self.files_content[fileId]
-        return Req()
+from backend.app.db.session import SessionLocal
+from backend.app.services import gdrive_backend
+from backend.app.services.document_purge import purge_orphans
+from backend.app.services.gdrive_backend import DriveClient, GoogleDriveStorageBackend
+from tests.fake_drive import FakeDrive, http_error
+
+CHUNK = 256 * 1024  # plus petit bloc résumable accepté par Drive
+
+
+def _backend(fake: FakeDrive, **kw) -> GoogleDriveStorageBackend:
+    opts = {"chunk_size": CHUNK, "download_workers": 4, "max_retries": 3, "retry_base_delay": 0.0, **kw}
+    return GoogleDriveStorageBackend("/tmp/dummy.json", "dummy_folder", client=DriveClient(fake), **opts)
+
 
 @pytest.fixture
-def gdrive_backend(monkeypatch):
-    # Patch le build pour retourner DummyDrive
-    monkeypatch.setattr("backend.app.services.gdrive_backend.build", lambda *a, **kw: DummyDrive())
-    # Patch Credentials
-    monkeypatch.setattr("backend.app.services.gdrive_backend.service_account.Credentials", type("DummyCreds", (), {"from_service_account_file": lambda *a, **kw: None}))
-    # Patch Path.exists pour toujours retourner True
-    monkeypatch.setattr("backend.app.services.gdrive_backend.Path.exists", lambda self: True)
-    return GoogleDriveStorageBackend("/tmp/dummy.json", "dummy_folder")
-
-def test_store_and_read_text(gdrive_backend):
+def drive_backend():
+    return _backend(FakeDrive())
+
+
+def test_store_and_read_text(drive_backend):
     data = b"<h1>GDrive Test</h1>"
-    file_id = gdrive_backend.store_bytes(data, filename="test.html", content_type="text/html")
-    assert file_id.startswith("dummy_test.html")
-    text = gdrive_backend.read_text(file_id)
+    file_id = drive_backend.store_bytes(data, filename="test.html", content_type="text/html")
+    assert drive_backend._drive.names[file_id] == "test.html"
+    text = drive_backend.read_text(file_id)
     assert "GDrive Test" in text
     # Vérifie que le texte est bien lu depuis le mock
+    assert text == data.decode("utf-8")
+
+
+def test_client_shared_per_service_account(monkeypatch):
+    built = []
+    monkeypatch.setattr(gdrive_backend, "build", lambda *a, **kw: built.append(kw) or FakeDrive())
+    monkeypatch.setattr(gdrive_backend.service_account.Credentials, "from_service_account_file", lambda *a, **kw: None)
+    monkeypatch.setattr(gdrive_backend.Path, "exists", lambda self: True)
+    monkeypatch.setattr(gdrive_backend, "_clients", {})
+    first = GoogleDriveStorageBackend("/tmp/shared.json", "f1")
+    second = GoogleDriveStorageBackend("/tmp/shared.json", "f2")
+    assert first._client is second._client
+    assert len(built) == 1
+    assert first._client.http() is first._client.http()
+
+
+def test_resumable_upload_and_parallel_ranged_download():
+    fake = FakeDrive(latency=0.01)
+    backend = _backend(fake)
+    data = os.urandom(5 * CHUNK + 123)
+    stored = backend.store_stream(io.BytesIO(data), filename="big.bin")
+    assert fake.upload_chunks == 6
+    assert stored.size == len(data)
+    assert b"".join(backend.open_document(stored.path)) == data
+    assert fake.calls["get_media"] == 6
+    assert fake.max_parallel > 1
+
+
+def test_rate_limited_calls_are_retried():
+    fake = FakeDrive()
+    backend = _backend(fake)
+    fake.fail("create", 2)
+    file_id = backend.store_bytes(b"abc", filename="a.txt")
+    fake.fail("get_media", 1)
+    assert backend.read_text(file_id) == "abc"
+    fake.fail("get", 5)
+    with pytest.raises(gdrive_backend.HttpError):
+        backend.read_text(file_id)
+
+
+def test_missing_document_and_non_retryable_errors():
+    backend = _backend(FakeDrive())
+    with pytest.raises(FileNotFoundError):
+        backend.open_document("absent")
+    assert not gdrive_backend._is_retryable(http_error(403, b'{"error": {"errors": [{"reason": "insufficientPermissions"}]}}'))
+    assert gdrive_backend._is_retryable(http_error(503))
+
+
+def test_list_and_delete_documents_paginated():
+    fake = FakeDrive(page_size=2)
+    backend = _backend(fake)
+    ids = [backend.store_document(b"x", f"generated/aa/bb/doc_{i}.html") for i in range(5)]
+    docs = list(backend.list_documents())
+    assert [d.ref for d in docs] == ids
+    assert [d.ref for d in backend.list_documents(start_after=docs[2].cursor)] == ids[3:]
+    backend.delete_document(ids[0])
+    assert ids[0] not in fake.files_content
+    # Reprise après un document supprimé entre-temps (purge): le curseur reste une position
+    backend.delete_document(ids[2])
+    assert [d.ref for d in backend.list_documents(start_after=docs[2].cursor)] == ids[3:]
+
+
+def test_purge_spares_templates_sharing_the_folder():
+    fake = FakeDrive()
+    backend = _backend(fake)
+    template_id = backend.store_bytes(b"<p>{{ x }}</p>", filename="doc_contrat.html", content_type="text/html")
+    orphan_id = backend.store_document(b"x", "generated/aa/bb/doc_orphan.html")
+    assert [d.ref for d in backend.list_documents()] == [orphan_id]
+    db = SessionLocal()
+    try:
+        stats = purge_orphans(db, backend, batch_size=10, grace_seconds=0)
+    finally:
+        db.close()
+    assert stats.removed == 1 and orphan_id not in fake.files_content
+    assert template_id in fake.files_content
+
+
+@pytest.mark.skipif(not os.environ.get("GDRIVE_BENCH"), reason="benchmark: GDRIVE_BENCH=1")
+def test_gdrive_throughput_benchmark():
+    data = os.urandom(32 * CHUNK)
+    for workers in (1, 4, 8):
+        fake = FakeDrive(latency=0.02)
+        backend = _backend(fake, download_workers=workers)
+        file_id = backend.store_bytes(data, filename="bench.bin")
+        start = time.perf_counter()
+        assert len(b"".join(backend.open_document(file_id))) == len(data)
+        elapsed = time.perf_counter() - start
+        print(f"workers={workers}: {len(data) / elapsed / 1e6:.1f} Mo/s")
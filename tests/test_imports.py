@@ -0,0 +1,104 @@
+import io
+from types import SimpleNamespace
+from uuid import uuid4
+
+from openpyxl import Workbook
+
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services import import_tasks
+from backend.app.services.bulk_import import run_import
+from tests.utils import auth_headers, client, ensure_admin
+
+
+def _write_csv(tmp_path, content: str):
+    p = tmp_path / "data.csv"
+    p.write_text(content, encoding="utf-8")
+    return p
+
+
+def test_run_import_clients_csv_reports_invalid_lines(tmp_path):
+    owner = ensure_admin(f"import.csv.{uuid4().hex[:6]}@example.com")
+    tag = uuid4().hex[:6]
+    path = _write_csv(tmp_path, (
+        "first_name,last_name,email\n"
+        f"Ana,Imp{tag},ana{tag}@example.com\n"
+        f"Bob,,bob{tag}@example.com\n"
+        f"Cyd,Imp{tag},pas-un-email\n"
+        f"Dan,Imp{tag},\n"
+    ))
+    db = SessionLocal()
+    try:
+        progress = []
+        stats = run_import(db, "clients", path, owner.id, batch_size=2, on_progress=lambda s: progress.append(s.processed))
+        assert (stats.processed, stats.inserted, stats.error_count) == (4, 2, 2)
+        assert [e["line"] for e in stats.errors] == [3, 4]
+        assert progress == [2, 4]
+        assert db.query(models.Client).filter(models.Client.owner_id == owner.id).count() == 2
+    finally:
+        db.close()
+
+
+def test_run_import_policies_xlsx_checks_duplicates_and_ownership(tmp_path):
+    owner = ensure_admin(f"import.xlsx.{uuid4().hex[:6]}@example.com")
+    other = ensure_admin(f"import.other.{uuid4().hex[:6]}@example.com")
+    tag = uuid4().hex[:6]
+    db = SessionLocal()
+    try:
+        mine = models.Client(first_name="A", last_name="B", owner_id=owner.id)
+        theirs = models.Client(first_name="C", last_name="D", owner_id=other.id)
+        db.add_all([mine, theirs])
+        db.commit()
+        wb = Workbook()
+        ws = wb.active
+        ws.append(["policy_number", "client_id", "product_name", "premium_amount", "effective_date", "expiry_date", "company_id"])
+        ws.append([f"IMP-{tag}-1", mine.id, "AUTO", 100, "2025-01-01", "2026-01-01", None])
+        ws.append([f"IMP-{tag}-1", mine.id, "AUTO", 100, "2025-01-01", "2026-01-01", None])  # doublon fichier
+        ws.append([f"IMP-{tag}-2", theirs.id, "AUTO", 100, "2025-01-01", "2026-01-01", None])  # client d'un autre
+        ws.append([f"IMP-{tag}-3", mine.id, "AUTO", 100, "2025-01-01", "2026-01-01", 999999])  # company inconnue
+        ws.append([f"IMP-{tag}-4", mine.id, "AUTO", "abc", "2025-01-01", "2026-01-01", None])  # montant invalide
+        path = tmp_path / "data.xlsx"
+        wb.save(path)
+
+        stats = run_import(db, "policies", path, owner.id, batch_size=10)
+        assert (stats.inserted, stats.error_count) == (1, 4)
+        assert [e["line"] for e in stats.errors] == [6, 3, 4, 5]
+        # Réimport: le numéro existe désormais en base
+        stats = run_import(db, "policies", path, owner.id)
+        assert stats.inserted == 0
+        assert "déjà existant" in stats.errors[1]["error"]
+    finally:
+        db.close()
+
+
+def test_import_endpoint_runs_task_and_exposes_report(monkeypatch):
+    headers = auth_headers("import.api@example.com")
+    tag = uuid4().hex[:6]
+
+    def _inline(args, task_id):
+        import_tasks.import_portfolio.run(*args)
+        return SimpleNamespace(id=task_id)
+
+    monkeypatch.setattr(import_tasks.import_portfolio, "apply_async", _inline)
+    csv_bytes = f"first_name,last_name\nEve,Api{tag}\nFoo,\n".encode()
+    r = client.post("/api/v1/imports/clients", files={"file": ("c.csv", io.BytesIO(csv_bytes), "text/csv")}, headers=headers)
+    assert r.status_code == 202, r.text
+    job_id = r.json()["report_job_id"]
+
+    r = client.get(f"/api/v1/imports/{job_id}", headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["status"] == "completed"
+    assert body["progress"] == {"processed": 2, "inserted": 1, "error_count": 1}
+    assert body["errors"][0]["line"] == 3
+
+    other = auth_headers("import.api.other@example.com")
+    assert client.get(f"/api/v1/imports/{job_id}", headers=other).status_code == 404
+
+
+def test_import_endpoint_rejects_bad_input():
+    headers = auth_headers("import.api@example.com")
+    r = client.post("/api/v1/imports/clients", files={"file": ("c.txt", io.BytesIO(b"x"), "text/plain")}, headers=headers)
+    assert r.status_code == 400
+    r = client.post("/api/v1/imports/users", files={"file": ("c.csv", io.BytesIO(b"x"), "text/csv")}, headers=headers)
+    assert r.status_code == 404
@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+import uuid
+
+from backend.app.api.routes import celery_reports
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services import job_events
+from tests.utils import auth_headers, client, ensure_admin
+
+
+def _job(status: str) -> str:
+    task_id = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        db.add(models.ReportJob(job_type="dummy", status=status, celery_task_id=task_id, queue="reports", result={"ok": True} if status == "completed" else None))
+        db.commit()
+    finally:
+        db.close()
+    return task_id
+
+
+def _events(body: str) -> list[dict]:
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+
+def test_stream_pushes_progress_until_terminal_event():
+    headers = auth_headers("events.admin@example.com")
+    task_id = _job("queued")
+
+    def _publish():
+        # Publié une fois le client abonné (sans Redis: remise directe aux abonnés du process)
+        while not job_events.hub.subscriber_count():
+            threading.Event().wait(0.01)
+        job_events.publish_job_event(task_id, {"status": "progress", "progress": 50.0})
+        job_events.publish_job_event(task_id, {"status": "completed", "progress": 100, "result": {"rows": 3}})
+
+    publisher = threading.Thread(target=_publish)
+    publisher.start()
+    r = client.get(f"/api/v1/reports/jobs/{task_id}/events", headers=headers)
+    publisher.join(timeout=5)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _events(r.text)
+    assert [e["status"] for e in events] == ["queued", "progress", "completed"]
+    assert events[-1]["result"] == {"rows": 3}
+    assert job_events.hub.subscriber_count() == 0
+
+
+def test_stream_of_finished_job_closes_immediately():
+    headers = auth_headers("events.admin@example.com")
+    task_id = _job("completed")
+    events = _events(client.get(f"/api/v1/reports/jobs/{task_id}/events", headers=headers).text)
+    assert events == [{"status": "completed", "report_job_id": events[0]["report_job_id"], "progress": 100, "result": {"ok": True}}]
+    assert client.get("/api/v1/reports/jobs/absent/events", headers=headers).status_code == 404
+
+
+def test_terminal_status_in_database_wins_over_cached_event(monkeypatch):
+    headers = auth_headers("events.admin@example.com")
+    task_id = _job("cancelled")
+    monkeypatch.setattr(job_events, "last_job_event", lambda tid: {"status": "progress", "progress": 40.0})
+    events = _events(client.get(f"/api/v1/reports/jobs/{task_id}/events", headers=headers).text)
+    assert [e["status"] for e in events] == ["cancelled"]
+
+
+def test_stream_closes_after_max_lifetime(monkeypatch):
+    headers = auth_headers("events.admin@example.com")
+    task_id = _job("queued")
+    monkeypatch.setattr(get_settings(), "job_events_max_stream", 0.3)
+    monkeypatch.setattr(get_settings(), "job_events_heartbeat", 0.1)
+    r = client.get(f"/api/v1/reports/jobs/{task_id}/events", headers=headers)
+    assert [e["status"] for e in _events(r.text)] == ["queued"] and ": keep-alive" in r.text
+    assert job_events.hub.subscriber_count() == 0
+
+
+def test_cancel_publishes_terminal_event(monkeypatch):
+    from celery.result import AsyncResult
+
+    task_id = _job("queued")
+    published: list[tuple[str, dict]] = []
+    monkeypatch.setattr(AsyncResult, "revoke", lambda self, **kw: None)
+    monkeypatch.setattr(celery_reports, "publish_job_event", lambda tid, event: published.append((tid, event)))
+    db = SessionLocal()
+    try:
+        celery_reports.cancel_job(task_id, current_user=ensure_admin("events.admin@example.com"), db=db)
+    finally:
+        db.close()
+    assert published == [(task_id, {"status": "cancelled"})]
+
+
+def test_hub_keeps_latest_events_for_slow_consumers():
+    async def _run():
+        async with job_events.hub.subscribe("slow") as queue:
+            for i in range(job_events.QUEUE_SIZE + 5):
+                job_events.hub.dispatch("slow", {"status": "progress", "progress": i})
+            await asyncio.sleep(0)
+            return queue.qsize(), queue.get_nowait()["progress"]
+
+    size, first = asyncio.run(_run())
+    assert size == job_events.QUEUE_SIZE
+    assert first == 5
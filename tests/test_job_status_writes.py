@@ -0,0 +1,86 @@
+import pytest
+
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services import job_status_buffer
+from backend.app.services.celery_report_tasks import update_job_status
+from tests.query_budget import capture_sql
+
+
+def _job(status: str = "queued") -> int:
+    db = SessionLocal()
+    try:
+        rj = models.ReportJob(job_type="heavy", status=status, queue="reports")
+        db.add(rj)
+        db.commit()
+        return rj.id
+    finally:
+        db.close()
+
+
+def _get(job_id: int) -> models.ReportJob:
+    db = SessionLocal()
+    try:
+        return db.get(models.ReportJob, job_id)
+    finally:
+        db.close()
+
+
+def test_transition_is_a_single_update_without_select():
+    job_id = _job()
+    with capture_sql() as statements:
+        update_job_status(job_id, "started")
+        update_job_status(job_id, "completed", {"rows": 3})
+    assert len(statements) == 2 and all(s.lstrip().upper().startswith("UPDATE REPORT_JOBS") for s in statements)
+    job = _get(job_id)
+    assert job.status == "completed" and job.result == {"rows": 3}
+    assert job.started_at is not None and job.finished_at is not None
+
+
+def test_coalesced_transitions_are_flushed_in_one_batch(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(job_status_buffer, "get_redis", lambda: redis_client)
+    monkeypatch.setattr(get_settings(), "job_status_coalesce", True)
+    monkeypatch.setattr(get_settings(), "job_status_flush_size", 1000)
+    first, second, done = _job(), _job(), _job()
+
+    update_job_status(first, "started")
+    update_job_status(first, "retry_1")
+    update_job_status(second, "started")
+    update_job_status(done, "started")
+    update_job_status(done, "completed", {"ok": True})  # terminal: écrit immédiatement
+    assert redis_client.llen(job_status_buffer.BUFFER_KEY) == 4
+    assert _get(first).status == "queued" and _get(done).status == "completed"
+
+    db = SessionLocal()
+    try:
+        with capture_sql() as statements:
+            assert job_status_buffer.flush_all(db) == 3
+    finally:
+        db.close()
+    assert len(statements) == 1  # une forme de transition -> un executemany
+    assert redis_client.llen(job_status_buffer.BUFFER_KEY) == 0
+    assert _get(first).status == "retry_1" and _get(first).started_at is not None
+    assert _get(second).status == "started"
+    # La transition intermédiaire tardive ne remplace pas le statut terminal
+    assert _get(done).status == "completed" and _get(done).started_at is not None
+
+
+def test_same_shape_transitions_share_one_executemany():
+    jobs = [_job(), _job(), _job("cancelled")]
+    db = SessionLocal()
+    try:
+        values = job_status_buffer.transition_values("retry_1")
+        assert job_status_buffer.write_transitions(db, [(job_id, dict(values)) for job_id in jobs]) == 3
+        db.commit()
+    finally:
+        db.close()
+    assert [_get(job_id).status for job_id in jobs] == ["retry_1", "retry_1", "cancelled"]
+
+
+def test_flush_beat_entry_follows_coalesce_setting():
+    from backend.app.core.celery_app import celery_app
+
+    assert ("flush-job-status" in celery_app.conf.beat_schedule) is get_settings().job_status_coalesce
@@ -0,0 +1,63 @@
+from uuid import uuid4
+
+from tests.utils import auth_headers, client
+
+
+def test_clients_cursor_pagination_no_duplicates():
+    headers = auth_headers("pager@example.com")
+    tag = uuid4().hex[:6]
+    created = set()
+    for i in range(5):
+        r = client.post("/api/v1/clients", json={"first_name": f"Page{tag}", "last_name": f"N{i}"}, headers=headers)
+        assert r.status_code == 201, r.text
+        created.add(r.json()["id"])
+    seen: list[int] = []
+    cursor = None
+    while True:
+        params: dict[str, str | int] = {"limit": 2, "q": f"Page{tag}"}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/api/v1/clients", params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        body = r.json()
+        assert len(body["items"]) <= 2
+        seen.extend(c["id"] for c in body["items"])
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen))
+    assert set(seen) == created
+    # Plus récent d'abord
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_clients_invalid_cursor_and_limit_bounds():
+    headers = auth_headers("pager@example.com")
+    r = client.get("/api/v1/clients", params={"cursor": "%%%"}, headers=headers)
+    assert r.status_code == 400
+    r = client.get("/api/v1/clients", params={"limit": 10_000}, headers=headers)
+    assert r.status_code == 422
+
+
+def test_policies_filters():
+    headers = auth_headers("pager@example.com")
+    r = client.post("/api/v1/clients", json={"first_name": "Filtre", "last_name": "Police"}, headers=headers)
+    client_id = r.json()["id"]
+    suffix = uuid4().hex[:8]
+    for n, expiry in (("A", "2026-01-01T00:00:00Z"), ("B", "2030-01-01T00:00:00Z")):
+        r = client.post("/api/v1/policies", json={
+            "policy_number": f"PG{n}{suffix}",
+            "client_id": client_id,
+            "product_name": "HABITATION",
+            "premium_amount": 5000,
+            "effective_date": "2025-01-01T00:00:00Z",
+            "expiry_date": expiry,
+        }, headers=headers)
+        assert r.status_code == 201, r.text
+    r = client.get("/api/v1/policies", params={"q": suffix}, headers=headers)
+    assert r.status_code == 200
+    assert {p["policy_number"] for p in r.json()["items"]} == {f"PGA{suffix}", f"PGB{suffix}"}
+    r = client.get("/api/v1/policies", params={"q": suffix, "expiry_from": "2029-01-01T00:00:00Z"}, headers=headers)
+    assert [p["policy_number"] for p in r.json()["items"]] == [f"PGB{suffix}"]
+    r = client.get("/api/v1/policies", params={"client_id": client_id, "status": "cancelled"}, headers=headers)
+    assert r.json()["items"] == []
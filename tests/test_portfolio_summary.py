@@ -0,0 +1,73 @@
+import uuid
+from datetime import UTC, date, datetime, timedelta
+
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services import portfolio_summary
+from tests.utils import auth_headers, client, ensure_user
+
+
+def _policy_payload(client_id: int, company_id: int, number: str, premium: int, expiry_days: int) -> dict[str, object]:
+    now = datetime.now(UTC)
+    return {
+        "policy_number": number, "client_id": client_id, "company_id": company_id, "product_name": "Auto",
+        "premium_amount": premium, "effective_date": (now - timedelta(days=30)).isoformat(),
+        "expiry_date": (now + timedelta(days=expiry_days)).isoformat(),
+    }
+
+
+def test_summary_follows_policy_writes_and_reconciliation():
+    suffix = uuid.uuid4().hex[:8]
+    email = f"summary.{suffix}@example.com"
+    headers = auth_headers(email, role="user")
+    owner_id = ensure_user(email).id
+    db = SessionLocal()
+    try:
+        company = models.Company(name=f"Summary {suffix}", code=f"SUM{suffix}")
+        db.add(company)
+        db.commit()
+        company_id = company.id
+    finally:
+        db.close()
+    client_id = client.post("/api/v1/clients", json={"first_name": "Awa", "last_name": "Diop"}, headers=headers).json()["id"]
+
+    soon = client.post("/api/v1/policies", json=_policy_payload(client_id, company_id, f"S-{suffix}-1", 1000, 10), headers=headers)
+    later = client.post("/api/v1/policies", json=_policy_payload(client_id, company_id, f"S-{suffix}-2", 400, 400), headers=headers)
+    assert soon.status_code == later.status_code == 201, soon.text
+    assert client.put(f"/api/v1/policies/{soon.json()['id']}", json={"premium_amount": 1500}, headers=headers).status_code == 200
+
+    data = client.get("/api/v1/analytics/summary?months=3", headers=headers).json()
+    assert data["owner_id"] == owner_id and data["policies"] == 2
+    assert data["by_status"] == [{"status": "active", "currency": "XAF", "policies": 2, "premium_total": 1900}]
+    # Échéancier: seule la police expirant dans 10 jours tombe dans la fenêtre
+    assert [(row["policies"], row["premium_total"]) for row in data["upcoming_expiries"]] == [(1, 1500)]
+
+    assert client.delete(f"/api/v1/policies/{later.json()['id']}", headers=headers).status_code == 204
+    assert client.get("/api/v1/analytics/summary", headers=headers).json()["premium_by_currency"] == {"XAF": 1500}
+
+    # Écriture hors des routes: rattrapée par la réconciliation
+    db = SessionLocal()
+    try:
+        now = datetime.now(UTC)
+        db.add(models.Policy(
+            policy_number=f"S-{suffix}-3", client_id=client_id, company_id=company_id, product_name="Vie", premium_amount=200,
+            currency="EUR", status="active", effective_date=now, expiry_date=now + timedelta(days=5),
+        ))
+        db.commit()
+        assert portfolio_summary.reconcile(db)["portfolio_summaries"] >= 1
+        assert portfolio_summary.reconcile(db) == {"portfolio_summaries": 0, "portfolio_expiries": 0}
+    finally:
+        db.close()
+    data = client.get(f"/api/v1/analytics/summary?company_id={company_id}", headers=headers).json()
+    assert data["premium_by_currency"] == {"EUR": 200, "XAF": 1500} and data["policies"] == 2
+
+
+def test_delta_nets_unchanged_keys_and_month_span():
+    before = portfolio_summary.contribution(1, None, None, None, 100, datetime(2026, 3, 31, 23, 30, tzinfo=UTC))
+    assert before.company_id == 0 and before.status == "active" and before.expiry_month == "2026-03"
+    assert portfolio_summary._deltas([before], [before]) == ({}, {})
+    cancelled = portfolio_summary.contribution(1, None, "cancelled", None, 100, None)
+    summaries, expiries = portfolio_summary._deltas([before], [cancelled])
+    assert summaries == {(1, 0, "active", "XAF"): (-1, -100), (1, 0, "cancelled", "XAF"): (1, 100)}
+    assert expiries == {(1, 0, "2026-03", "XAF"): (-1, -100)}
+    assert portfolio_summary.month_span(date(2026, 11, 5), 3) == ("2026-11", "2027-01")
@@ -0,0 +1,24 @@
+from fastapi.routing import APIRoute
+
+from backend.app.main import app
+from tests.query_budget import QUERY_BUDGETS
+from tests.utils import auth_headers, client
+
+
+def test_every_api_route_declares_a_query_budget():
+    keys = {
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute) and route.endpoint.__module__.startswith("backend.app.api.routes.")
+        for method in route.methods
+    }
+    assert sorted(keys - QUERY_BUDGETS.keys()) == []
+    assert sorted(QUERY_BUDGETS.keys() - keys) == []
+
+
+def test_budget_violation_is_reported(query_budget, monkeypatch):
+    headers = auth_headers("budget.check@example.com")
+    monkeypatch.setitem(QUERY_BUDGETS, "GET /api/v1/templates/", 0)
+    client.get("/api/v1/templates/", headers=headers)
+    assert query_budget.violations and "GET /api/v1/templates/" in query_budget.violations[0]
+    query_budget.violations.clear()
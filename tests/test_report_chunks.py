@@ -0,0 +1,60 @@
+import pytest
+
+from backend.app.core.celery_app import celery_app
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services.celery_report_tasks import generate_heavy_report
+from backend.app.services.report_engine import (
+    PortfolioAggregate,
+    ReportFilters,
+    aggregate_chunk,
+    aggregate_portfolio,
+    plan_chunks,
+)
+from tests.test_report_engine import _portfolio
+
+
+def test_chunks_cover_portfolio_and_reduce_to_same_aggregate():
+    db = SessionLocal()
+    try:
+        company_id = _portfolio(db)
+        params = {"company_id": company_id}
+        chunks = plan_chunks(db, params, chunk_size=2)
+        assert len(chunks) == 3 and chunks[-1] == {"declarations": True}
+        assert chunks[0]["id_to"] == chunks[1]["id_from"] and chunks[1]["id_to"] is None
+        assert plan_chunks(db, params, chunk_size=10) == []
+
+        reduced = PortfolioAggregate()
+        for chunk in chunks:
+            reduced.merge(PortfolioAggregate.from_dict(aggregate_chunk(db, params, chunk).as_dict()))
+        assert reduced.as_dict() == aggregate_portfolio(db, ReportFilters(company_id=company_id)).as_dict()
+    finally:
+        db.close()
+
+
+def test_heavy_report_runs_as_chord_above_chunk_size(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    # États de tâche (update_state) et compteur du chord: backend de résultats en mémoire
+    monkeypatch.setattr(celery_app.backend, "client", fakeredis.FakeRedis())
+    monkeypatch.setattr(get_settings(), "report_chunk_size", 2)
+    db = SessionLocal()
+    try:
+        company_id = _portfolio(db)
+        job = models.ReportJob(job_type="heavy", status="queued", queue="reports")
+        db.add(job)
+        db.commit()
+        job_id = job.id
+    finally:
+        db.close()
+
+    result = generate_heavy_report.apply(args=("analysis", {"company_id": company_id}, job_id)).get()
+    assert result["chunks"] == 3 and result["rows"]["policies"] == 3
+    assert result["totals"]["premium_by_currency"] == {"XAF": 3500, "EUR": 300}
+
+    db = SessionLocal()
+    try:
+        job = db.get(models.ReportJob, job_id)
+        assert job.status == "completed" and job.result["document_id"] == result["document_id"]
+    finally:
+        db.close()
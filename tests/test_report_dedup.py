@@ -0,0 +1,97 @@
+import uuid
+from datetime import UTC, datetime, timedelta
+from types import SimpleNamespace
+
+from backend.app.api.routes import reports as reports_module
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services import report_dedup, report_scheduling
+from tests.utils import auth_headers, client
+
+
+class _FakeRedis:
+    """SET NX / GET en mémoire (indépendant des remplacements globaux de redis.Redis)."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, str] = {}
+
+    def set(self, key: str, value: str, nx: bool = False, ex: int | None = None) -> bool | None:
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    def get(self, key: str) -> str | None:
+        return self.values.get(key)
+
+
+def test_dedup_key_normalises_params(monkeypatch):
+    key = report_dedup.dedup_key("heavy", {"report_type": "pdf", "pages": 10, "company_id": 3, "status": None})
+    assert key == report_dedup.dedup_key("heavy", {"company_id": 3, "pages": 10, "report_type": "pdf"})
+    assert key != report_dedup.dedup_key("heavy", {"report_type": "pdf", "pages": 20, "company_id": 3})
+    assert key != report_dedup.dedup_key("dummy", {"report_type": "pdf", "pages": 10, "company_id": 3})
+    # Analyse: les pages de détail n'influent pas sur le document
+    assert report_dedup.dedup_key("heavy", {"report_type": "analysis", "pages": 5}) == report_dedup.dedup_key("heavy", {"report_type": "analysis", "pages": 50})
+    monkeypatch.setattr(get_settings(), "report_dedup_ttl", 0)
+    assert report_dedup.dedup_key("heavy", {"report_type": "pdf"}) is None
+
+
+def test_identical_heavy_reports_share_one_job(monkeypatch):
+    headers = auth_headers(f"dedup.{uuid.uuid4().hex[:8]}@example.com")
+    url = f"/api/v1/reports/heavy?report_type=excel&company_id={uuid.uuid4().int % 10**9}"
+    launched: list[str] = []
+
+    def _apply_async(args, queue, task_id):
+        launched.append(task_id)
+        return SimpleNamespace(id=task_id)
+
+    monkeypatch.setattr(reports_module, "CELERY_AVAILABLE", True)
+    monkeypatch.setattr(reports_module, "generate_heavy_report", SimpleNamespace(apply_async=_apply_async), raising=False)
+    monkeypatch.setattr(report_scheduling, "estimate_rows", lambda db, params: 50)
+
+    first = client.post(url, headers=headers).json()
+    second = client.post(url, headers=headers).json()
+    assert first["deduplicated"] is False and second["deduplicated"] is True
+    assert second["job_id"] == first["job_id"] and second["report_job_id"] == first["report_job_id"]
+    assert launched == [first["job_id"]]
+    forced = client.post(f"{url}&force=true", headers=headers).json()
+    assert forced["deduplicated"] is False and len(launched) == 2
+
+    # Job terminé récemment: son document est rendu; au-delà du TTL, nouveau rapport
+    db = SessionLocal()
+    try:
+        for job in db.query(models.ReportJob).filter(models.ReportJob.id.in_([first["report_job_id"], forced["report_job_id"]])):
+            job.status, job.finished_at, job.result = "completed", datetime.now(UTC), {"document_id": 42}
+        db.commit()
+        reused = client.post(url, headers=headers).json()
+        assert reused["status"] == "completed" and reused["document_id"] == 42 and len(launched) == 2
+        stale = datetime.now(UTC) - timedelta(seconds=get_settings().report_dedup_ttl + 60)
+        db.query(models.ReportJob).filter(models.ReportJob.id.in_([first["report_job_id"], forced["report_job_id"]])).update(
+            {"finished_at": stale}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    fresh = client.post(url, headers=headers).json()
+    assert fresh["deduplicated"] is False and len(launched) == 3
+
+
+def test_claim_hands_concurrent_request_to_winner(monkeypatch):
+    redis_client = _FakeRedis()
+    monkeypatch.setattr(report_dedup, "get_redis", lambda: redis_client)
+    key = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        winner = models.ReportJob(job_type="heavy", status="queued", params={}, celery_task_id=uuid.uuid4().hex, dedup_key=key)
+        db.add(winner)
+        db.commit()
+        assert report_dedup.claim(db, key, winner.celery_task_id) is None
+        assert report_dedup.claim(db, key, "late").id == winner.id
+        # Job gagnant en échec: la réservation est reprise
+        winner.status = "failed"
+        db.commit()
+        assert report_dedup.claim(db, key, "late") is None
+        assert redis_client.get(f"{report_dedup.KEY_PREFIX}{key}") == "late"
+    finally:
+        db.close()
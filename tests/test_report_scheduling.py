@@ -0,0 +1,66 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from backend.app.api.routes import reports as reports_module
+from backend.app.core.config import get_settings
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services import report_scheduling
+from backend.app.services.report_scheduling import ReportQuotaExceeded, choose_lane, task_queue
+from tests.utils import auth_headers, client, ensure_admin
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    settings = get_settings()
+    for name, value in (("report_quick_rows", 10), ("report_heavy_rows", 100), ("report_user_fair_share", 2), ("report_user_max_active", 3)):
+        monkeypatch.setattr(settings, name, value)
+    return settings
+
+
+def test_lane_follows_priority_cost_and_fair_share(limits):
+    assert choose_lane("normal", 5, 0) == "high"  # rapport court: voie rapide
+    assert choose_lane("low", 5, 0) == "low"
+    assert choose_lane("high", 50, 0) == "high"
+    assert choose_lane("high", 500, 0) == "normal"  # volumineux: une voie plus bas
+    assert choose_lane("normal", 500, 0) == "low"
+    assert choose_lane("high", 5, 2) == "low"  # part équitable atteinte
+    with pytest.raises(ReportQuotaExceeded):
+        choose_lane("normal", 5, 3)
+    assert task_queue(SimpleNamespace(request=SimpleNamespace(delivery_info={"routing_key": "reports_low"}))) == "reports_low"
+    assert task_queue(SimpleNamespace(request=SimpleNamespace(delivery_info=None))) == "reports"
+
+
+def test_heavy_report_routed_to_lane_and_capped_per_user(monkeypatch, limits):
+    email = f"lanes.{uuid.uuid4().hex[:8]}@example.com"
+    headers = auth_headers(email)
+    user_id = ensure_admin(email).id
+    launched: list[str] = []
+
+    def _apply_async(args, queue, task_id):
+        launched.append(queue)
+        return SimpleNamespace(id=task_id)
+
+    monkeypatch.setattr(reports_module, "CELERY_AVAILABLE", True)
+    monkeypatch.setattr(reports_module, "generate_heavy_report", SimpleNamespace(apply_async=_apply_async), raising=False)
+    monkeypatch.setattr(report_scheduling, "estimate_rows", lambda db, params: 50)
+
+    # force: demandes identiques lancées chacune (pas de regroupement, services.report_dedup)
+    r = client.post("/api/v1/reports/heavy?report_type=pdf&priority=high&force=true", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["queue"] == "reports_high" and launched == ["reports_high"]
+    db = SessionLocal()
+    try:
+        job = db.get(models.ReportJob, r.json()["report_job_id"])
+        assert job.requested_by == user_id and job.queue == "reports_high"
+    finally:
+        db.close()
+
+    # Deuxième job en file: le suivant est relégué en voie basse, puis refusé au plafond
+    assert client.post("/api/v1/reports/heavy?report_type=pdf&force=true", headers=headers).json()["queue"] == "reports"
+    assert client.post("/api/v1/reports/heavy?report_type=pdf&priority=high&force=true", headers=headers).json()["queue"] == "reports_low"
+    r = client.post("/api/v1/reports/heavy?report_type=pdf&force=true", headers=headers)
+    assert r.status_code == 429 and launched == ["reports_high", "reports", "reports_low"]
+    assert client.post("/api/v1/reports/heavy?report_type=pdf&priority=urgent", headers=headers).status_code == 422
@@ -0,0 +1,60 @@
+import uuid
+
+from backend.app.api.routes import reports as reports_module
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from tests.query_budget import capture_sql
+from tests.utils import auth_headers, client
+
+
+def test_bulk_status_uses_one_in_query_and_task_meta(monkeypatch):
+    headers = auth_headers("bulk.status@example.com")
+    running, queued = uuid.uuid4().hex, uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        jobs = [
+            models.ReportJob(job_type="heavy", status="running", params={}, celery_task_id=running, queue="reports"),
+            models.ReportJob(job_type="heavy", status="queued", params={}, celery_task_id=queued, queue="reports"),
+        ]
+        db.add_all(jobs)
+        db.commit()
+        running_pk, queued_pk = jobs[0].id, jobs[1].id
+    finally:
+        db.close()
+
+    calls: list[list[str]] = []
+
+    def _statuses(task_ids):
+        calls.append(list(task_ids))
+        return {running: {"task_id": running, "state": "PROGRESS", "status": "progress", "progress": 40.0}}
+
+    monkeypatch.setattr(reports_module, "CELERY_AVAILABLE", True)
+    monkeypatch.setattr(reports_module, "get_task_statuses", _statuses, raising=False)
+
+    with capture_sql() as statements:
+        r = client.post("/api/v1/reports/jobs/status", json={"job_ids": [running, queued, running, "inconnu"]}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert calls == [[running, queued, "inconnu"]]
+    lookups = [s for s in statements if "FROM report_jobs" in s]
+    assert len(lookups) == 1 and " IN " in lookups[0]
+    assert r.json()["jobs"] == {
+        running: {"status": "progress", "report_job_id": running_pk, "progress": 40.0},
+        queued: {"status": "queued", "report_job_id": queued_pk},
+        "inconnu": {"status": "unknown"},
+    }
+
+
+def test_bulk_status_falls_back_to_database_and_bounds_batch(monkeypatch):
+    headers = auth_headers("bulk.status2@example.com")
+
+    def _down(task_ids):
+        raise ConnectionError("redis indisponible")
+
+    monkeypatch.setattr(reports_module, "CELERY_AVAILABLE", True)
+    monkeypatch.setattr(reports_module, "get_task_statuses", _down, raising=False)
+    r = client.post("/api/v1/reports/jobs/status", json={"job_ids": ["absent"]}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["jobs"] == {"absent": {"status": "unknown"}}
+
+    too_many = [str(i) for i in range(501)]
+    assert client.post("/api/v1/reports/jobs/status", json={"job_ids": too_many}, headers=headers).status_code == 422
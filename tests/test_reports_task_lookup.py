@@ -0,0 +1,36 @@
+import uuid
+
+from backend.app.api.routes import reports as reports_module
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from tests.query_budget import capture_sql
+from tests.utils import auth_headers, client
+
+
+def test_job_status_looks_up_celery_task_id_column(monkeypatch):
+    headers = auth_headers("status.indexed@example.com")
+    task_id = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        rj = models.ReportJob(job_type="dummy", status="queued", params={"report_id": "idx"}, celery_task_id=task_id, queue="reports")
+        db.add(rj)
+        db.commit()
+        job_pk = rj.id
+    finally:
+        db.close()
+    monkeypatch.setattr(reports_module, "CELERY_AVAILABLE", True)
+    monkeypatch.setattr(reports_module, "get_task_status", lambda tid: {"status": "finished", "result": {"ok": True}}, raising=False)
+
+    with capture_sql() as statements:
+        r = client.get(f"/api/v1/reports/jobs/{task_id}", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["report_job_id"] == job_pk
+    lookups = [s for s in statements if "FROM report_jobs" in s]
+    assert lookups and all("report_jobs.celery_task_id = " in s and "->>" not in s for s in lookups)
+
+    db = SessionLocal()
+    try:
+        job = db.get(models.ReportJob, job_pk)
+        assert job.status == "completed" and job.finished_at is not None
+    finally:
+        db.close()
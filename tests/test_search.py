@@ -0,0 +1,46 @@
+from uuid import uuid4
+
+from tests.utils import auth_headers, client
+
+
+def test_search_clients_and_policies_accent_insensitive():
+    headers = auth_headers("search.owner@example.com")
+    tag = uuid4().hex[:6]
+    r = client.post("/api/v1/clients", json={"first_name": "Hélène", "last_name": f"Lefèvre{tag}"}, headers=headers)
+    assert r.status_code == 201, r.text
+    client_id = r.json()["id"]
+    r = client.post("/api/v1/policies", json={
+        "policy_number": f"SRCH-{tag}",
+        "client_id": client_id,
+        "product_name": "SANTE",
+        "premium_amount": 1000,
+        "effective_date": "2025-01-01T00:00:00Z",
+        "expiry_date": "2026-01-01T00:00:00Z",
+    }, headers=headers)
+    assert r.status_code == 201, r.text
+
+    r = client.get("/api/v1/search", params={"q": f"helene lefevre{tag}"}, headers=headers)
+    assert r.status_code == 200, r.text
+    hits = r.json()["items"]
+    assert [(h["type"], h["id"]) for h in hits] == [("client", client_id)]
+
+    # Préfixe sur numéro de police
+    r = client.get("/api/v1/search", params={"q": f"SRCH-{tag[:4]}"}, headers=headers)
+    assert any(h["type"] == "policy" and tag in h["label"] for h in r.json()["items"])
+
+    # Mise à jour répercutée dans l'index
+    client.put(f"/api/v1/clients/{client_id}", json={"last_name": f"Renamed{tag}"}, headers=headers)
+    r = client.get("/api/v1/search", params={"q": f"lefevre{tag}"}, headers=headers)
+    assert r.json()["items"] == []
+
+
+def test_search_scoped_to_owner():
+    owner = auth_headers("search.owner2@example.com")
+    other = auth_headers("search.other@example.com")
+    tag = uuid4().hex[:8]
+    client.post("/api/v1/clients", json={"first_name": "Prive", "last_name": tag}, headers=owner)
+    r = client.get("/api/v1/search", params={"q": tag}, headers=other)
+    assert r.status_code == 200
+    assert r.json()["items"] == []
+    r = client.get("/api/v1/search", params={"q": tag}, headers=owner)
+    assert len(r.json()["items"]) == 1
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from backend.app.services import template_cache
+from backend.app.services.async_storage import aiter_bytes
+from backend.app.services.storage_provider import LocalStorageBackend, S3StorageBackend
+from backend.app.services.template_storage import ChecksumMismatchError
+
+
+class FakeBody:
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.closed = False
+
+    async def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = len(self.data)
+        chunk, self.data = self.data[:size], self.data[size:]
+        return chunk
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeAsyncS3:
+    """Bouchon aiobotocore en mémoire (coroutines de l'API bas niveau S3)."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.aborted: list[str] = []
+
+    async def put_object(self, Bucket, Key, Body, **kw):
+        self.objects[Key] = Body
+
+    async def get_object(self, Bucket, Key):
+        return {"Body": FakeBody(self.objects[Key])}
+
+    async def create_multipart_upload(self, Bucket, Key, **kw):
+        upload_id = f"up-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    async def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        await asyncio.sleep(0)
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    async def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[Key] = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+
+    async def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        self.aborted.append(UploadId)
+
+
+def _s3(fake: FakeAsyncS3) -> S3StorageBackend:
+    return S3StorageBackend("bucket", None, None, client=object(), part_size=16, max_concurrency=2, aclient=fake)
+
+
+def test_local_async_roundtrip():
+    storage = LocalStorageBackend()
+    data = b"<p>async local</p>"
+
+    async def _run():
+        stored = await storage.astore_stream(aiter_bytes(data, size=4), filename="a.html", expected_sha256=hashlib.sha256(data).hexdigest())
+        text = await storage.aread_text(stored.path)
+        chunks = [c async for c in storage.astream(stored.path)]
+        return stored, text, b"".join(chunks)
+
+    stored, text, streamed = asyncio.run(_run())
+    assert stored.size == len(data)
+    assert text == data.decode()
+    assert streamed == data
+    assert storage.read_text(stored.path) == text
+
+
+def test_local_async_checksum_mismatch_leaves_nothing():
+    with pytest.raises(ChecksumMismatchError):
+        asyncio.run(LocalStorageBackend().astore_stream(aiter_bytes(b"x"), filename="b.txt", expected_sha256="0" * 64))
+
+
+def test_s3_async_multipart_and_reads():
+    fake = FakeAsyncS3()
+    storage = _s3(fake)
+    data = bytes(range(256)) * 2  # 32 parts de 16 octets
+
+    async def _run():
+        stored = await storage.astore_stream(aiter_bytes(data, size=7), filename="big.bin")
+        small = await storage.astore_bytes(b"petit", filename="small.txt")
+        streamed = b"".join([c async for c in storage.astream(stored.path)])
+        return stored, small, streamed, await storage.aread_text(small)
+
+    stored, small, streamed, text = asyncio.run(_run())
+    assert fake.objects["big.bin"] == data
+    assert stored.checksum == hashlib.sha256(data).hexdigest()
+    assert streamed == data
+    assert text == "petit"
+
+
+def test_s3_async_checksum_mismatch_aborts():
+    fake = FakeAsyncS3()
+    with pytest.raises(ChecksumMismatchError):
+        asyncio.run(_s3(fake).astore_stream(aiter_bytes(b"y" * 100), filename="bad.bin", expected_sha256="0" * 64))
+    assert fake.aborted and "bad.bin" not in fake.objects
+
+
+def test_aread_cached_text_uses_async_storage(tmp_path, monkeypatch):
+    from backend.app.core.config import get_settings
+
+    class AsyncStorage:
+        reads = 0
+
+        async def aread_text(self, path):
+            AsyncStorage.reads += 1
+            return "<h1>async</h1>"
+
+    monkeypatch.setattr(get_settings(), "template_cache_dir", str(tmp_path))
+    template_cache.clear()
+    checksum = hashlib.sha256(b"<h1>async</h1>").hexdigest()
+    for _ in range(2):
+        assert asyncio.run(template_cache.aread_cached_text(AsyncStorage(), "k", checksum)) == "<h1>async</h1>"
+    assert AsyncStorage.reads == 1
+    template_cache.clear()
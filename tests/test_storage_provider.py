@@ -0,0 +1,48 @@
+
+from backend.app.db.session import SessionLocal
+from backend.app.services import storage_provider
+from tests.query_budget import capture_sql
+from tests.utils import auth_headers, client
+
+
+class _FakeRedis:
+    def __init__(self) -> None:
+        self.published: list[tuple[str, str]] = []
+
+    def publish(self, channel: str, message: str) -> None:
+        self.published.append((channel, message))
+
+
+def test_backend_reused_until_config_changes(monkeypatch):
+    headers = auth_headers("storage.cache@example.com")
+    fake = _FakeRedis()
+    monkeypatch.setattr(storage_provider, "get_redis", lambda: fake)
+    r = client.put("/api/v1/admin/storage-config", headers=headers, json={"backend": "local"})
+    assert r.status_code == 200
+    version = r.json()["version"]
+    assert fake.published == [(storage_provider.STORAGE_CHANNEL, "1")]
+
+    db = SessionLocal()
+    try:
+        first = storage_provider.get_storage(db)
+        with capture_sql() as statements:
+            assert storage_provider.get_storage(db) is first
+        assert statements == []
+
+        r = client.put("/api/v1/admin/storage-config", headers=headers, json={"backend": "local"})
+        assert r.json()["version"] == version + 1
+        assert storage_provider.get_storage(db) is not first
+    finally:
+        db.close()
+
+
+def test_remote_invalidation_drops_local_cache():
+    db = SessionLocal()
+    try:
+        backend = storage_provider.get_storage(db)
+        # Effet d'un message reçu sur STORAGE_CHANNEL
+        storage_provider._drop_local()
+        assert storage_provider._current_version is None
+        assert storage_provider.get_storage(db) is not backend
+    finally:
+        db.close()
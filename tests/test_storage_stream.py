@@ -0,0 +1,88 @@
+import hashlib
+import io
+import threading
+
+import pytest
+
+from backend.app.services.storage_provider import LocalStorageBackend, S3StorageBackend
+from backend.app.services.template_storage import TEMPLATES_DIR, ChecksumMismatchError
+
+
+class FakeS3:
+    """Bouchon S3 en mémoire (API bas niveau utilisée par S3StorageBackend)."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.uploads: dict[str, dict[int, bytes]] = {}
+        self.aborted: list[str] = []
+        self.put_calls = 0
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, **kw):
+        self.put_calls += 1
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key, **kw):
+        upload_id = f"up-{len(self.uploads) + 1}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self._lock:
+            self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f'"{hashlib.md5(Body).hexdigest()}"'}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        numbers = [p["PartNumber"] for p in MultipartUpload["Parts"]]
+        assert numbers == sorted(parts)
+        self.objects[Key] = b"".join(parts[n] for n in numbers)
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        self.aborted.append(UploadId)
+
+
+class TrickleReader(io.BytesIO):
+    """Flux renvoyant des lectures courtes (comme un socket / SpooledTemporaryFile)."""
+
+    def read(self, size=-1):
+        return super().read(min(size, 3) if size and size > 0 else size)
+
+
+def _backend(fake: FakeS3) -> S3StorageBackend:
+    return S3StorageBackend("bucket", None, None, client=fake, part_size=16, max_concurrency=2)
+
+
+def test_s3_small_object_single_put():
+    fake = FakeS3()
+    data = b"petit contenu"
+    stored = _backend(fake).store_stream(io.BytesIO(data), filename="a.txt")
+    assert fake.put_calls == 1 and not fake.uploads
+    assert stored.checksum == hashlib.sha256(data).hexdigest()
+    assert fake.objects["a.txt"] == data
+
+
+def test_s3_multipart_reassembles_parts_in_order():
+    fake = FakeS3()
+    data = bytes(range(256)) * 3  # 768 octets -> 48 parts de 16
+    stored = _backend(fake).store_stream(TrickleReader(data), filename="big.bin", expected_sha256=hashlib.sha256(data).hexdigest())
+    assert fake.put_calls == 0
+    assert fake.objects["big.bin"] == data
+    assert (stored.size, stored.checksum) == (len(data), hashlib.sha256(data).hexdigest())
+
+
+def test_s3_multipart_checksum_mismatch_aborts():
+    fake = FakeS3()
+    with pytest.raises(ChecksumMismatchError):
+        _backend(fake).store_stream(io.BytesIO(b"x" * 100), filename="bad.bin", expected_sha256="00")
+    assert fake.aborted and "bad.bin" not in fake.objects
+
+
+def test_local_stream_mismatch_leaves_nothing():
+    before = set(TEMPLATES_DIR.iterdir())
+    with pytest.raises(ChecksumMismatchError):
+        LocalStorageBackend().store_stream(io.BytesIO(b"<p>x</p>"), filename="t.html", expected_sha256="00")
+    assert set(TEMPLATES_DIR.iterdir()) == before
+    stored = LocalStorageBackend().store_stream(io.BytesIO(b"<p>x</p>"), filename="t.html")
+    assert stored.path.endswith(".html") and stored.size == 8
@@ -0,0 +1,67 @@
+import hashlib
+
+import pytest
+
+from backend.app.core.config import get_settings
+from backend.app.services import template_cache
+from backend.app.services.template_storage import ChecksumMismatchError
+
+
+class CountingStorage:
+    def __init__(self, files: dict[str, str]) -> None:
+        self.files = files
+        self.reads = 0
+
+    def read_text(self, path: str) -> str:
+        self.reads += 1
+        return self.files[path]
+
+
+def _sum(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "template_cache_dir", str(tmp_path))
+    template_cache.clear()
+    yield tmp_path
+    template_cache.clear()
+
+
+def test_tiers_memory_then_disk_then_remote(cache_dir):
+    storage = CountingStorage({"k1": "<h1>Bonjour</h1>"})
+    checksum = _sum("<h1>Bonjour</h1>")
+    for _ in range(3):
+        assert template_cache.read_cached_text(storage, "k1", checksum) == "<h1>Bonjour</h1>"
+    assert storage.reads == 1
+    assert (cache_dir / checksum).exists()
+
+    # Nouveau process simulé: mémoire vide, le disque sert la lecture
+    template_cache.clear()
+    assert template_cache.read_cached_text(storage, "k1", checksum) == "<h1>Bonjour</h1>"
+    assert storage.reads == 1
+    assert template_cache.stats()["disk"] == 1
+
+    # Entrée disque corrompue: écartée, relecture distante
+    template_cache.clear()
+    (cache_dir / checksum).write_bytes(b"corrompu")
+    assert template_cache.read_cached_text(storage, "k1", checksum) == "<h1>Bonjour</h1>"
+    assert storage.reads == 2
+    assert template_cache.hit_ratio() == 0.0
+
+
+def test_remote_checksum_mismatch_not_cached(cache_dir):
+    storage = CountingStorage({"k": "contenu modifié"})
+    with pytest.raises(ChecksumMismatchError):
+        template_cache.read_cached_text(storage, "k", _sum("contenu original"))
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_disk_tier_evicts_least_recently_used(cache_dir, monkeypatch):
+    monkeypatch.setattr(get_settings(), "template_cache_disk_mb", 0)
+    storage = CountingStorage({"a": "a" * 10})
+    template_cache.read_cached_text(storage, "a", _sum("a" * 10))
+    assert list(cache_dir.iterdir()) == []  # plafond nul: rien ne reste sur disque
+    assert template_cache.read_cached_text(storage, "a", _sum("a" * 10)) == "a" * 10
+    assert storage.reads == 1  # toujours servi par la mémoire
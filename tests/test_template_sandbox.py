@@ -0,0 +1,80 @@
+import time
+import uuid
+
+import pytest
+from jinja2.exceptions import SecurityError
+
+from backend.app.core.config import get_settings
+from backend.app.services.document_renderer import RenderLimitError, render_template
+from tests.utils import auth_headers, bearer, client
+
+
+def _html(content: str, **ctx) -> str:
+    return render_template(content, ctx, "html").decode()
+
+
+def test_regular_templates_still_render():
+    assert _html("{% for i in range(3) %}{{ loop.index }}{% endfor %}|{{ range(4)|length }}|{{ range(3)|reverse|join(',') }}") == "123|4|2,1,0"
+    assert _html("{{ 'ab' * 2 }} {{ 2 ** 10 }} {{ name|center(7) }}", name="x") == "abab 1024    x   "
+    assert _html("{{ '%05d' % 42 }} {{ '{:>4}'.format('a') }} {{ 'x'.zfill(3) }} {{ '%s-%s'|format(1, 2) }} {{ 'aa'.replace('a', 'b') }}") == "00042    a 00x 1-2 bb"
+
+
+@pytest.mark.parametrize("content", [
+    "{{ range(10 ** 7)|length }}",
+    "{{ 'x' * 10 ** 9 }}",
+    "{{ 2 ** 1000000 }}",
+    "{{ 'a'|center(10 ** 9) }}",
+    "{{ 'a'.ljust(300000000) }}",
+    "{{ '%0300000000d' % 1 }}",
+    "{{ '{:0300000000}'.format(1) }}",
+    "{{ '%*d' % (300000000, 1) }}",
+    "{{ '%0300000000d'|format(1) }}",
+    "{{ '{:{w}}'.format(1, w=300000000) }}",
+    "{{ ('ab' * 1000).replace('', 'x' * 10000) }}",
+    "{% macro f(n) %}{{ f(n + 1) }}{% endmacro %}{{ f(0) }}",
+])
+def test_costly_constructs_are_refused(content):
+    with pytest.raises(RenderLimitError):
+        _html(content)
+
+
+def test_internal_attributes_are_sandboxed():
+    with pytest.raises(SecurityError):
+        _html("{{ ''.__class__.__mro__[1].__subclasses__() }}")
+
+
+def test_output_size_is_bounded(monkeypatch):
+    monkeypatch.setattr(get_settings(), "render_max_output_mb", 1)
+    assert len(_html("{% for i in range(500) %}{{ 'x' * 1000 }}{% endfor %}")) == 500_000
+    with pytest.raises(RenderLimitError):
+        _html("{% for i in range(2000) %}{{ 'x' * 1000 }}{% endfor %}")
+
+
+def test_render_time_budget_interrupts_busy_loop(monkeypatch):
+    monkeypatch.setattr(get_settings(), "render_timeout_seconds", 0.2)
+    start = time.perf_counter()
+    with pytest.raises(RenderLimitError):
+        _html("{% for i in range(100000) %}{% for j in range(100000) %}{% endfor %}{% endfor %}")
+    assert time.perf_counter() - start < 5
+    # Le thread reste utilisable après interruption
+    assert _html("{{ 1 + 1 }}") == "2"
+
+
+def test_generation_rejects_bad_template_and_records_profile():
+    headers = {"Authorization": f"Bearer {bearer(auth_headers('sandbox@example.com'))}"}
+    r = client.post("/api/v1/templates/", json={"name": f"sb-{uuid.uuid4()}", "type": "generic", "format": "html", "content": "<p>{{ inline_context.v }}</p>"}, headers=headers)
+    tpl_id = r.json()["id"]
+    good = client.get(f"/api/v1/templates/{tpl_id}", headers=headers).json()["versions"][0]["id"]
+    bad = client.post(f"/api/v1/templates/{tpl_id}/versions", json={"content": "{{ range(10 ** 8)|list }}"}, headers=headers).json()["id"]
+
+    r = client.post("/api/v1/documents/generate", json={"document_type": "sb", "template_version_id": bad}, headers=headers)
+    assert r.status_code == 422
+    assert client.get(f"/api/v1/templates/{tpl_id}/versions/2/preview", headers=headers).status_code == 422
+
+    for _ in range(2):
+        r = client.post("/api/v1/documents/generate", json={"document_type": "sb", "template_version_id": good, "inline_context": {"v": 1}}, headers=headers)
+        assert r.status_code == 201, r.text
+    profile = client.get(f"/api/v1/templates/{tpl_id}/versions/1/profile", headers=headers).json()
+    assert profile["renders"] >= 2
+    assert profile["bytes_max"] >= len("<p>1</p>") and profile["seconds_avg"] > 0
+    assert client.get(f"/api/v1/templates/{tpl_id}/versions/9/profile", headers=headers).status_code == 404
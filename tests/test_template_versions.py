@@ -0,0 +1,71 @@
+import uuid
+
+from backend.app.db import models
+from backend.app.db.session import SessionLocal
+from backend.app.services import template_versions
+from tests.query_budget import capture_sql
+from tests.utils import auth_headers, bearer, client
+
+
+def _headers() -> dict[str, str]:
+    return {"Authorization": f"Bearer {bearer(auth_headers('tplversions@example.com'))}"}
+
+
+def test_version_numbers_come_from_latest_version_pointer():
+    headers = _headers()
+    r = client.post("/api/v1/templates/", json={"name": f"ptr-{uuid.uuid4()}", "type": "generic", "format": "html", "content": "v1"}, headers=headers)
+    assert r.status_code == 201, r.text
+    tpl_id = r.json()["id"]
+    assert r.json()["latest_version"] == 1
+    for expected in (2, 3):
+        r = client.post(f"/api/v1/templates/{tpl_id}/versions", json={"content": f"v{expected}"}, headers=headers)
+        assert r.json()["version"] == expected
+    # Un numéro réservé dans une transaction annulée est libéré
+    db = SessionLocal()
+    try:
+        assert template_versions.allocate_version(db, tpl_id) == 4
+        db.rollback()
+        assert template_versions.allocate_version(db, tpl_id) == 4
+        db.rollback()
+        assert template_versions.allocate_version(db, 10**9) is None
+    finally:
+        db.close()
+    assert client.get(f"/api/v1/templates/{tpl_id}", headers=headers).json()["latest_version"] == 3
+    assert client.post(f"/api/v1/templates/{10**9}/versions", json={"content": "x"}, headers=headers).status_code == 404
+
+
+def test_generation_with_warm_cache_issues_no_template_query():
+    headers = _headers()
+    r = client.post("/api/v1/templates/", json={"name": f"warm-{uuid.uuid4()}", "type": "generic", "format": "html", "content": "<p>{{ inline_context.v }}</p>"}, headers=headers)
+    tpl_id = r.json()["id"]
+    version_id = client.get(f"/api/v1/templates/{tpl_id}", headers=headers).json()["versions"][0]["id"]
+    payload = {"document_type": "warm", "template_version_id": version_id, "inline_context": {"v": 1}}
+    template_versions.clear()
+
+    with capture_sql() as statements:
+        assert client.post("/api/v1/documents/generate", json=payload, headers=headers).status_code == 201
+        assert any("template_versions" in s for s in statements)
+        statements.clear()
+        r = client.post("/api/v1/documents/generate", json=payload, headers=headers)
+        assert r.status_code == 201
+        assert not any("template_versions" in s or "FROM templates" in s for s in statements)
+    assert r.json()["mime_type"] == "text/html"
+    # Changement de format: le cache du template est invalidé
+    client.patch(f"/api/v1/templates/{tpl_id}", json={"format": "pdf"}, headers=headers)
+    r = client.post("/api/v1/documents/generate", json=payload, headers=headers)
+    assert r.json()["mime_type"] == "application/pdf"
+
+
+def test_cache_is_bounded(monkeypatch):
+    from backend.app.core.config import get_settings
+
+    monkeypatch.setattr(get_settings(), "template_version_cache_size", 2)
+    template_versions.clear()
+    db = SessionLocal()
+    try:
+        ids = [v.id for v in db.query(models.TemplateVersion).limit(3)]
+        for vid in ids:
+            template_versions.resolve_version(db, vid)
+    finally:
+        db.close()
+    assert len(template_versions._by_id) == min(2, len(ids))
@@ -0,0 +1,45 @@
+import uuid
+from pathlib import Path
+
+from jinja2 import ModuleLoader
+
+from backend.app.core.config import get_settings
+from backend.app.db.session import SessionLocal
+from backend.app.services import template_versions, template_warmup
+from tests.utils import auth_headers, bearer, client
+
+
+def _create(headers: dict[str, str], content: str, **extra) -> int:
+    body = {"name": f"warmup-{uuid.uuid4()}", "type": "generic", "format": "html", "content": content, **extra}
+    r = client.post("/api/v1/templates/", json=body, headers=headers)
+    assert r.status_code == 201, r.text
+    return r.json()["id"]
+
+
+def test_warm_up_compiles_bundle_once_and_primes_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "template_bundle_dir", str(tmp_path / "bundles"))
+    headers = {"Authorization": f"Bearer {bearer(auth_headers('warmup@example.com'))}"}
+    active = _create(headers, "<p>{{ inline_context.v }} v1</p>")
+    client.post(f"/api/v1/templates/{active}/versions", json={"content": "<p>{{ inline_context.v }} v2</p>"}, headers=headers)
+    inactive = _create(headers, "<p>inactif</p>", is_active=False)
+    broken = _create(headers, "{% if %}")
+    template_versions.clear()
+
+    db = SessionLocal()
+    try:
+        loaded = {v.template_id: v for v in template_warmup.active_versions(db, 1000)}
+        assert loaded[active].version == 2
+        assert inactive not in loaded
+        stats = template_warmup.warm_up(db)
+        assert stats.compiled and stats.templates >= 1 and stats.failed >= 1
+        assert (Path(stats.bundle) / template_warmup.MANIFEST).exists()
+        # Redémarrage: le bundle est réutilisé sans recompilation
+        template_versions.clear()
+        assert not template_warmup.warm_up(db).compiled
+    finally:
+        db.close()
+
+    resolved = template_versions.resolve_version(None, loaded[active].id)  # type: ignore[arg-type]
+    assert resolved is not None and resolved.version == 2
+    assert isinstance(resolved.compiled().environment.loader, ModuleLoader)
+    assert all(tid != broken for tid, _ in template_versions._by_key)
@@ -29,7 +29,7 @@ def ensure_admin(email: str) -> models.User:
 
 
 def ensure_user(email: str) -> models.User:
-    return _ensure_user(email, models.UserRole.USER)
+    return _ensure_user(email, models.UserRole.AGENT)
 
 
 def auth_headers(email: str, role: str | None = None):